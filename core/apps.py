@@ -2,4 +2,12 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'core'
\ No newline at end of file
+    name = 'core'
+
+    def ready(self):
+        from django.core import checks
+
+        from . import signals  # noqa: F401
+        from .utils.cache import check_shared_cache
+
+        checks.register(check_shared_cache, checks.Tags.caches, deploy=True)
@@ -0,0 +1,118 @@
+# core/benchmarks/db_pool.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.testing import WebsocketCommunicator
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from core.models import ChatRoom, Message, User
+from .harness import percentile
+from .scenarios import user_headers
+
+BENCH_MESSAGE_PREFIX = '[bench-db-pool]'
+
+
+def _latency_summary(timings, wall):
+    timings_ms = [t * 1000 for t in timings]
+    if not timings_ms:
+        return {'operations': 0}
+    return {
+        'operations': len(timings_ms),
+        'p50_ms': percentile(timings_ms, 50),
+        'p95_ms': percentile(timings_ms, 95),
+        'p99_ms': percentile(timings_ms, 99),
+        'mean_ms': sum(timings_ms) / len(timings_ms),
+        'throughput_ops': len(timings_ms) / wall if wall else None,
+    }
+
+
+class MixedLoad:
+    """
+    Concurrent REST and chat traffic shaped like production under Daphne.
+
+    REST clients call the profile endpoint (one short query) and release their
+    connection after every request, as the request_finished handler does. Chat
+    sessions drive the real ChatConsumer through WebSocket communicators, so each
+    message makes three database_sync_to_async hops.
+    """
+
+    def __init__(self, rest_clients=8, requests_per_client=50, chat_sessions=8, messages_per_session=20):
+        self.rest_clients = rest_clients
+        self.requests_per_client = requests_per_client
+        self.chat_sessions = chat_sessions
+        self.messages_per_session = messages_per_session
+        self.connects = 0
+        self._connects_lock = threading.Lock()
+
+    def _count_connect(self, sender, connection, **kwargs):
+        with self._connects_lock:
+            self.connects += 1
+
+    def _rest_worker(self, headers):
+        client = Client(raise_request_exception=False)
+        timings = []
+        try:
+            for _ in range(self.requests_per_client):
+                started = time.perf_counter()
+                client.get('/api/users/profile/', **headers)
+                close_old_connections()
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        return timings
+
+    async def _chat_session(self, application, room, timings):
+        communicator = WebsocketCommunicator(application, f'/ws/chat/{room.id.hex}/')
+        connected, _ = await communicator.connect()
+        if not connected:
+            return
+        try:
+            for i in range(self.messages_per_session):
+                started = time.perf_counter()
+                await communicator.send_json_to({
+                    'message': f'{BENCH_MESSAGE_PREFIX} {i}',
+                    'sender_id': str(room.donor_id),
+                })
+                await communicator.receive_json_from(timeout=30)
+                timings.append(time.perf_counter() - started)
+        finally:
+            await communicator.disconnect()
+
+    def _chat_load(self, rooms, timings):
+        from project_red.asgi import application
+
+        async def run():
+            await asyncio.gather(*(self._chat_session(application, room, timings) for room in rooms))
+
+        asyncio.run(run())
+
+    def run(self):
+        users = list(User.objects.filter(is_active=True).order_by('pk')[:self.rest_clients])
+        rooms = list(ChatRoom.objects.order_by('pk')[:self.chat_sessions])
+        headers = [user_headers(user) for user in users]
+        connection.close()
+
+        connection_created.connect(self._count_connect)
+        chat_timings = []
+        try:
+            started = time.perf_counter()
+            chat_thread = threading.Thread(target=self._chat_load, args=(rooms, chat_timings))
+            chat_thread.start()
+            with ThreadPoolExecutor(max_workers=max(len(headers), 1)) as executor:
+                rest_timings = [t for worker in executor.map(self._rest_worker, headers) for t in worker]
+            chat_thread.join()
+            wall = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(self._count_connect)
+            Message.objects.filter(content__startswith=BENCH_MESSAGE_PREFIX).delete()
+
+        return {
+            'wall_s': wall,
+            'rest': _latency_summary(rest_timings, wall),
+            'chat': _latency_summary(chat_timings, wall),
+            'connection_checkouts': self.connects,
+        }
@@ -0,0 +1,79 @@
+# core/benchmarks/fake_openai.py
+import json
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import override_settings
+
+FAKE_ANALYSIS = (
+    "HEALTH ASSESSMENT: All measured values are within their normal ranges. "
+    "RISK FACTORS: No significant risk factors were identified. "
+    "RECOMMENDATIONS: Keep a balanced diet, stay hydrated and exercise regularly. "
+    "FOLLOW-UP: Repeat the check-up in twelve months."
+)
+
+FAKE_ANALYSIS_JSON = json.dumps({
+    'summary': 'All measured values are within their normal ranges.',
+    'findings': [],
+    'conditions': [],
+    'recommendations': ['Keep a balanced diet, stay hydrated and exercise regularly.',
+                        'Repeat the check-up in twelve months.'],
+    'notification': 'Your blood test results are within normal ranges.',
+})
+
+_HOSPITAL_ID = re.compile(r'"id":\s*"([0-9a-f-]{36})"')
+
+
+def _completion_text(prompt):
+    # find_best_hospital_with_ai expects a bare hospital id back; pick the closest one offered
+    match = _HOSPITAL_ID.search(prompt)
+    return match.group(1) if match else FAKE_ANALYSIS
+
+
+class FakeOpenAI:
+    """Stand-in for the OpenAI chat completions API with a fixed response latency"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _reply(self, messages, json_mode=False):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if json_mode:
+            return FAKE_ANALYSIS_JSON
+        return _completion_text(messages[-1]['content'])
+
+    def _create(self, model=None, messages=None, stream=False, response_format=None, **kwargs):
+        json_mode = (response_format or {}).get('type') == 'json_object'
+        content = self._reply(messages or [{'content': ''}], json_mode)
+        if stream:
+            return self._stream(content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def _stream(self, content):
+        for token in re.findall(r'\S+\s*', content):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    def client(self, *args, **kwargs):
+        return self
+
+    def with_options(self, **kwargs):
+        return self
+
+
+@contextmanager
+def fake_openai_backend(latency=0.0):
+    """Route every OpenAI call made by the app to a local FakeOpenAI instance"""
+    fake = FakeOpenAI(latency=latency)
+    with ExitStack() as stack:
+        # The fake has no account limits to protect, so the shared rate limiter is off
+        stack.enter_context(override_settings(OPENAI_API_KEY='sk-fake-benchmark-key',
+                                              OPENAI_RATE_LIMIT={'requests_per_minute': 0}))
+        stack.enter_context(mock.patch('core.utils.http_gateway.openai_client', fake.client))
+        yield fake
@@ -0,0 +1,189 @@
+# core/benchmarks/harness.py
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+Call = namedtuple('Call', ['method', 'path', 'data', 'headers'])
+
+
+class _Rollback(Exception):
+    pass
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(int(math.ceil(pct / 100.0 * len(ordered))), 1)
+    return ordered[rank - 1]
+
+
+class BenchmarkRunner:
+    """
+    Replay prepared calls through Django's test client and collect latency and query counts.
+
+    Every call runs inside a transaction that is rolled back afterwards, so mutating
+    endpoints (accept, submit_blood_test) can be measured repeatedly against the same rows.
+    """
+
+    def __init__(self, iterations=50, warmup=5, concurrency=1, log=None):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.concurrency = concurrency
+        self.log = log or (lambda message: None)
+
+    def _execute(self, client, call):
+        method = getattr(client, call.method.lower())
+        kwargs = dict(call.headers or {})
+        if call.data is not None:
+            kwargs['data'] = json.dumps(call.data)
+            kwargs['content_type'] = 'application/json'
+
+        outcome = {}
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = method(call.path, **kwargs)
+                    outcome['elapsed'] = time.perf_counter() - started
+                outcome['queries'] = len(queries.captured_queries)
+                outcome['status'] = response.status_code
+                outcome['bytes'] = len(response.content) if not response.streaming else 0
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return outcome
+
+    def _worker(self, calls):
+        client = Client(raise_request_exception=False)
+        try:
+            return [self._execute(client, call) for call in calls]
+        finally:
+            connection.close()
+
+    def run(self, name, calls):
+        if not calls:
+            self.log(f"  {name}: skipped (no candidate rows in the dataset)")
+            return {'name': name, 'skipped': True}
+
+        warmup_calls = [calls[i % len(calls)] for i in range(self.warmup)]
+        if warmup_calls:
+            self._worker(warmup_calls)
+
+        measured = [calls[i % len(calls)] for i in range(self.iterations)]
+        shards = [measured[i::self.concurrency] for i in range(self.concurrency)]
+
+        started = time.perf_counter()
+        if self.concurrency == 1:
+            outcomes = self._worker(measured)
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                outcomes = [o for shard in executor.map(self._worker, shards) for o in shard]
+        wall = time.perf_counter() - started
+
+        result = summarize(name, outcomes, wall, self.concurrency)
+        self.log(
+            f"  {name}: p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms "
+            f"p99={result['p99_ms']:.1f}ms rps={result['throughput_rps']:.1f} "
+            f"queries={result['queries_mean']:.1f} (max {result['queries_max']})"
+        )
+        return result
+
+
+def summarize(name, outcomes, wall, concurrency=1):
+    timings = [o['elapsed'] * 1000 for o in outcomes]
+    queries = [o['queries'] for o in outcomes]
+    statuses = {}
+    for o in outcomes:
+        statuses[str(o['status'])] = statuses.get(str(o['status']), 0) + 1
+    return {
+        'name': name,
+        'iterations': len(outcomes),
+        'concurrency': concurrency,
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'mean_ms': sum(timings) / len(timings),
+        'max_ms': max(timings),
+        'throughput_rps': len(outcomes) / wall if wall else None,
+        'queries_mean': sum(queries) / len(queries),
+        'queries_max': max(queries),
+        'response_bytes_mean': sum(o['bytes'] for o in outcomes) / len(outcomes),
+        'status_codes': statuses,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def environment_metadata():
+    from core.models import User, Hospital, BloodRequest, Donation, DonorHospitalAssignment, BloodTest
+
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'dataset': {
+            'users': User.objects.count(),
+            'hospitals': Hospital.objects.count(),
+            'blood_requests': BloodRequest.objects.count(),
+            'donations': Donation.objects.count(),
+            'hospital_assignments': DonorHospitalAssignment.objects.count(),
+            'blood_tests': BloodTest.objects.count(),
+        },
+    }
+
+
+def save_results(path, metadata, results):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as fh:
+        json.dump({'metadata': metadata, 'results': results}, fh, indent=2, default=str)
+
+
+def load_results(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare_results(current, baseline, threshold=10.0):
+    """
+    Compare two result files. Returns (lines, regressions) where a regression is a
+    p95 latency increase above `threshold` percent or any growth in max query count.
+    """
+    previous = {r['name']: r for r in baseline['results'] if not r.get('skipped')}
+    lines, regressions = [], []
+    for result in current['results']:
+        before = previous.get(result['name'])
+        if result.get('skipped') or not before:
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+        query_change = result['queries_max'] - before['queries_max']
+        line = (
+            f"{result['name']}: p95 {before['p95_ms']:.1f}ms -> {result['p95_ms']:.1f}ms ({change:+.1f}%), "
+            f"queries {before['queries_max']} -> {result['queries_max']}"
+        )
+        lines.append(line)
+        if change > threshold or query_change > 0:
+            regressions.append(line)
+    return lines, regressions
@@ -0,0 +1,113 @@
+# core/benchmarks/scenarios.py
+import random
+from urllib.parse import urlencode
+
+from django.db.models import Count
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import User, Donation, DonorHospitalAssignment, HospitalUser
+from core.views import get_hospital_user_tokens
+from .harness import Call
+
+CANDIDATE_POOL = 200
+
+
+def user_headers(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def hospital_headers(hospital_user):
+    return {'HTTP_AUTHORIZATION': f"Bearer {get_hospital_user_tokens(hospital_user)['access']}"}
+
+
+def _located_donors():
+    return User.objects.filter(
+        is_donor=True, location_lat__isnull=False, location_long__isnull=False
+    ).order_by('pk')[:CANDIDATE_POOL]
+
+
+def nearby_donors(rng, count):
+    calls = []
+    for user in _located_donors():
+        query = urlencode({
+            'lat': user.location_lat, 'lng': user.location_long,
+            'blood_group': user.blood_group, 'max_distance': 50,
+        })
+        calls.append(Call('GET', f'/api/users/nearby_donors/?{query}', None, user_headers(user)))
+    rng.shuffle(calls)
+    return calls[:count]
+
+
+def available_blood_requests(rng, count):
+    calls = [
+        Call('GET', '/api/available-blood-requests/', None, user_headers(user))
+        for user in _located_donors()
+    ]
+    rng.shuffle(calls)
+    return calls[:count]
+
+
+def accept(rng, count):
+    donations = Donation.objects.filter(status='pending').select_related('donor').order_by('pk')[:CANDIDATE_POOL]
+    calls = []
+    for donation in donations:
+        lat = donation.donor.location_lat or 27.7172
+        lng = donation.donor.location_long or 85.3240
+        calls.append(Call(
+            'POST', f'/api/donations/{donation.id}/accept/',
+            {'donor_lat': lat, 'donor_lng': lng},
+            user_headers(donation.donor),
+        ))
+    rng.shuffle(calls)
+    return calls[:count]
+
+
+def submit_blood_test(rng, count):
+    assignments = DonorHospitalAssignment.objects.filter(
+        status='scheduled', hospital__auth_account__isnull=False
+    ).select_related('hospital__auth_account').order_by('pk')[:CANDIDATE_POOL]
+    calls = []
+    for assignment in assignments:
+        data = {
+            'sugar_level': round(rng.gauss(92, 14), 1),
+            'uric_acid_level': round(rng.gauss(5.0, 1.0), 1),
+            'wbc_count': round(rng.gauss(7500, 1600)),
+            'rbc_count': round(rng.gauss(5.0, 0.4), 2),
+            'hemoglobin': round(rng.gauss(14.0, 1.2), 1),
+            'platelet_count': round(rng.gauss(260000, 55000)),
+        }
+        calls.append(Call(
+            'POST', f'/api/hospital-dashboard/assignments/{assignment.id}/submit_blood_test/',
+            data, hospital_headers(assignment.hospital.auth_account),
+        ))
+    rng.shuffle(calls)
+    return calls[:count]
+
+
+def dashboard_stats(rng, count):
+    return [Call('GET', '/api/dashboard-stats/', None, {})]
+
+
+def hospital_dashboard_list(rng, count):
+    # The busiest hospitals are the interesting case for the dashboard listing
+    hospital_users = HospitalUser.objects.annotate(
+        assignment_count=Count('hospital__donor_assignments')
+    ).order_by('-assignment_count')[:10]
+    return [
+        Call('GET', '/api/hospital-dashboard/donors/', None, hospital_headers(hospital_user))
+        for hospital_user in hospital_users
+    ]
+
+
+SCENARIOS = {
+    'nearby_donors': nearby_donors,
+    'available_blood_requests': available_blood_requests,
+    'accept': accept,
+    'submit_blood_test': submit_blood_test,
+    'dashboard_stats': dashboard_stats,
+    'hospital_dashboard_list': hospital_dashboard_list,
+}
+
+
+def build_calls(name, seed=42, count=CANDIDATE_POOL):
+    return SCENARIOS[name](random.Random(seed), count)
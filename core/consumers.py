@@ -1,8 +1,12 @@
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
 from core.models import ChatRoom, Message, User
+from core.utils.donor_location import parse_location, record_location
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -81,4 +85,47 @@ class ChatConsumer(AsyncWebsocketConsumer):
             chat_room=chat_room,
             sender=sender,
             content=content
-        )
\ No newline at end of file
+        )
+
+
+class LocationConsumer(AsyncWebsocketConsumer):
+    """
+    Location pings over a websocket: {"type": "location", "lat": ..., "lng": ...}.
+    Authenticates with the session or an access token in ?token=; only donors may
+    connect. Each ping is answered with {"type": "location", "status": ...}
+    (core/utils/donor_location.py).
+    """
+
+    async def connect(self):
+        self.user = await self.get_user()
+        if self.user is None or not self.user.is_donor:
+            await self.close()
+            return
+        await self.accept()
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+            if data.get('type') != 'location':
+                raise ValueError('Unsupported message type')
+            lat, lng = parse_location(data.get('lat'), data.get('lng'))
+        except (TypeError, ValueError) as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'error': str(e)}))
+            return
+
+        result = await database_sync_to_async(record_location)(self.user, lat, lng)
+        await self.send(text_data=json.dumps({'type': 'location', 'status': result}))
+
+    @database_sync_to_async
+    def get_user(self):
+        user = self.scope.get('user')
+        if user is not None and user.is_authenticated:
+            return user
+        token = parse_qs(self.scope.get('query_string', b'').decode()).get('token')
+        if not token:
+            return None
+        auth = JWTAuthentication()
+        try:
+            return auth.get_user(auth.get_validated_token(token[0]))
+        except (InvalidToken, AuthenticationFailed):
+            return None
@@ -0,0 +1,42 @@
+# core/db/backends/postgresql_pool/base.py
+"""
+PostgreSQL backend that borrows connections from a bounded in-process pool.
+
+Use it with CONN_MAX_AGE = 0: Django then "closes" the connection at the end of
+every request and database_sync_to_async call, which hands it back to the pool
+instead of tearing down the TCP/TLS session and backend process.
+"""
+from functools import partial
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from core.db.pool import close_pools, get_pool, pool_key
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the test database in use
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def _pool(self, conn_params):
+        connect = partial(base.DatabaseWrapper.get_new_connection, self, conn_params)
+        return get_pool(pool_key(self.alias, self.settings_dict), connect, self.settings_dict.get('POOL', {}))
+
+    def get_new_connection(self, conn_params):
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        self.connection_pool = self._pool(conn_params)
+        return self.connection_pool.getconn()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.connection_pool.putconn(self.connection)
@@ -0,0 +1,255 @@
+# core/db/pool.py
+import logging
+import threading
+import time
+from collections import deque
+
+from core.utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of DB-API connections.
+
+    At most `max_size` connections are open at once; callers beyond that wait up to
+    `timeout` seconds for one to be returned. Idle connections are reused most
+    recently returned first, checked with a round trip when they have been idle for
+    `check_after` seconds, and closed after `max_idle` seconds idle or
+    `max_lifetime` seconds in total.
+    """
+
+    def __init__(self, connect, max_size=20, min_size=0, timeout=10.0,
+                 max_idle=300.0, max_lifetime=3600.0, check_after=30.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.min_size = min_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, opened_at, returned_at), oldest return first
+        self._in_use = {}     # id(connection) -> opened_at
+        self._size = 0
+        self._waiting = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'health_checks': 0,
+            'health_check_failures': 0,
+        }
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, opened_at, now):
+        return self.max_lifetime and now - opened_at > self.max_lifetime
+
+    def _prune_idle(self, now):
+        # Called with the lock held; returns connections to close outside it
+        stale = []
+        while self._idle and self._size > self.min_size:
+            conn, opened_at, returned_at = self._idle[0]
+            if now - returned_at <= self.max_idle and not self._expired(opened_at, now):
+                break
+            self._idle.popleft()
+            self._size -= 1
+            stale.append(conn)
+        return stale
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _healthy(self, conn):
+        self._count('health_checks')
+        try:
+            if conn.closed:
+                raise ConnectionError('connection closed')
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except Exception as e:
+            self._count('health_check_failures')
+            logger.warning(f"Discarding pooled connection that failed its health check: {str(e)}")
+            return False
+
+    def getconn(self):
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._lock:
+                stale = self._prune_idle(time.monotonic())
+                entry = None
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout}s "
+                            f"({self._size} open, all in use)"
+                        )
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+            for conn in stale:
+                self._close_quietly(conn)
+            if stale:
+                self._count('connections_closed', len(stale))
+
+            now = time.monotonic()
+            if entry is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                opened_at = now
+                self._count('connections_opened')
+            else:
+                conn, opened_at, returned_at = entry
+                if now - returned_at > self.check_after and not self._healthy(conn):
+                    self._discard(conn)
+                    continue
+            break
+
+        wait = time.monotonic() - started
+        with self._lock:
+            self._in_use[id(conn)] = opened_at
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait)
+        return conn
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._lock:
+            self._size -= 1
+            self._stats['connections_closed'] += 1
+            self._lock.notify()
+
+    def putconn(self, conn, discard=False):
+        """Return a connection, rolling back anything left open on it"""
+        import psycopg2.extensions as extensions
+
+        with self._lock:
+            opened_at = self._in_use.pop(id(conn), None)
+        if opened_at is None:
+            # Not ours (opened before the pool existed); just close it
+            self._close_quietly(conn)
+            return
+
+        if not discard and not conn.closed and not self._expired(opened_at, time.monotonic()):
+            try:
+                status = conn.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        else:
+            discard = True
+
+        if discard:
+            self._discard(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, opened_at, time.monotonic()))
+            self._lock.notify()
+
+    def close(self):
+        """Close every idle connection; connections in use are closed when returned"""
+        with self._lock:
+            idle = [conn for conn, _, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._in_use.clear()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+            })
+        stats['wait_time_mean'] = stats['wait_time_total'] / stats['waits'] if stats['waits'] else 0.0
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_key(alias, settings_dict):
+    return (alias, settings_dict['NAME'], settings_dict['HOST'], settings_dict['PORT'], settings_dict['USER'])
+
+
+def get_pool(key, connect, options):
+    """The pool for one database, created from its POOL settings on first use"""
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    connect,
+                    max_size=options.get('MAX_SIZE', 20),
+                    min_size=options.get('MIN_SIZE', 0),
+                    timeout=options.get('TIMEOUT', 10.0),
+                    max_idle=options.get('MAX_IDLE', 300.0),
+                    max_lifetime=options.get('MAX_LIFETIME', 3600.0),
+                    check_after=options.get('CHECK_AFTER', 30.0),
+                )
+    return pool
+
+
+def close_pools(name=None):
+    """Close idle pooled connections, for every database or only those to `name`"""
+    with _pools_lock:
+        keys = [key for key in _pools if name is None or key[1] == name]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    return {f'{key[0]}:{key[1]}': pool.stats() for key, pool in list(_pools.items())}
+
+
+register_metrics('db_pool', pool_stats)
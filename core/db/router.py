@@ -0,0 +1,227 @@
+# core/db/router.py
+"""
+Send safe reads to read replicas.
+
+Reads go to a replica only while serving a GET/HEAD/OPTIONS request (see
+ReplicaRoutingMiddleware), outside a transaction, and only for clients that
+have not written recently: a request that writes pins its client to the primary
+for READ_YOUR_WRITES_SECONDS, so the client sees its own changes even if the
+replicas lag. The pin is a signed, timestamped cookie, so it holds whichever
+process serves the client's next request. Views that read in order to write
+call use_primary(). Everything else (writes, non-safe requests, tasks,
+management commands, websocket consumers) uses the primary.
+
+Replicas are health checked at most every REPLICA_CHECK_SECONDS per process; a
+replica that cannot be reached or that lags more than REPLICA_MAX_LAG_SECONDS
+is skipped, and with no healthy replica reads fall back to the primary.
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from math import ceil
+
+from django.conf import settings
+from django.core.signing import BadSignature, TimestampSigner
+from django.db import connections
+
+from core.utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Read-your-writes pin; the value is only a signed timestamp
+PIN_COOKIE = 'db_pin'
+
+# Replay lag in seconds; 0 when the replica has replayed everything it received
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+class _Routing:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_routing = ContextVar('db_routing', default=None)
+
+_stats_lock = threading.Lock()
+_stats = {'replica_reads': 0, 'pinned_requests': 0, 'fallbacks': 0}
+
+
+def replica_aliases():
+    return settings.DATABASE_REPLICAS
+
+
+class ReplicaHealth:
+    """Per-process view of which replicas are usable, refreshed lazily"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}  # alias -> {'healthy', 'lag', 'checked_at', 'error'}
+        self._checking = set()
+
+    def _check(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+            healthy, error = lag <= settings.REPLICA_MAX_LAG_SECONDS, None
+        except Exception as e:
+            lag, healthy, error = None, False, str(e)
+            # Drop the broken connection so the next check reconnects
+            connections[alias].close()
+        if not healthy:
+            logger.warning(f"Replica {alias} unhealthy (lag={lag}, error={error})")
+        return {'healthy': healthy, 'lag': lag, 'checked_at': time.monotonic(), 'error': error}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(alias)
+            stale = state is None or now - state['checked_at'] >= settings.REPLICA_CHECK_SECONDS
+            # One thread refreshes a stale entry; the others use the old verdict meanwhile
+            check = stale and alias not in self._checking
+            if check:
+                self._checking.add(alias)
+        if check:
+            try:
+                state = self._check(alias)
+                with self._lock:
+                    self._state[alias] = state
+            finally:
+                with self._lock:
+                    self._checking.discard(alias)
+        return bool(state and state['healthy'])
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                alias: {
+                    'healthy': state['healthy'],
+                    'lag': state['lag'],
+                    'error': state['error'],
+                    'checked_seconds_ago': round(now - state['checked_at'], 1),
+                }
+                for alias, state in self._state.items()
+            }
+
+
+replica_health = ReplicaHealth()
+
+
+def healthy_replica():
+    """A healthy replica alias, or None"""
+    healthy = [alias for alias in replica_aliases() if replica_health.is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+def use_primary():
+    """Send the rest of the current request's reads to the primary"""
+    routing = _routing.get()
+    if routing is not None:
+        routing.use_replica = False
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.use_replica or routing.wrote:
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            # Reads inside a transaction must see its own writes
+            return PRIMARY
+        alias = healthy_replica()
+        if alias is None:
+            _count('fallbacks')
+            return PRIMARY
+        _count('replica_reads')
+        return alias
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+_pin_signer = TimestampSigner(salt='core.db.router.pin')
+
+
+def _is_pinned(request):
+    value = request.COOKIES.get(PIN_COOKIE)
+    if not value:
+        return False
+    try:
+        # Expired pins fail too (SignatureExpired is a BadSignature)
+        _pin_signer.unsign(value, max_age=settings.READ_YOUR_WRITES_SECONDS)
+    except BadSignature:
+        return False
+    return True
+
+
+def _pin(response):
+    response.set_cookie(
+        PIN_COOKIE, _pin_signer.sign('1'), max_age=ceil(settings.READ_YOUR_WRITES_SECONDS),
+        httponly=True, samesite='Lax',
+    )
+
+
+class ReplicaRoutingMiddleware:
+    """Let safe requests read from replicas unless their client wrote recently"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        use_replica = request.method in SAFE_METHODS
+        if use_replica and _is_pinned(request):
+            use_replica = False
+            _count('pinned_requests')
+
+        routing = _Routing(use_replica)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if routing.wrote:
+            _pin(response)
+        return response
+
+
+def router_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['replicas'] = replica_health.snapshot()
+    return stats
+
+
+register_metrics('db_replicas', router_stats)
@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+from core.benchmarks.harness import environment_metadata, save_results
+
+MODES = ['direct', 'pooled']
+
+class Command(BaseCommand):
+    help = 'Compare per-request PostgreSQL connects against the connection pool under concurrent chat and REST load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rest-clients', type=int, default=8, help='Concurrent REST client threads')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per REST client')
+        parser.add_argument('--chat-sessions', type=int, default=8, help='Concurrent WebSocket chat sessions')
+        parser.add_argument('--messages', type=int, default=20, help='Messages sent per chat session')
+        parser.add_argument('--pool-size', type=int, default=None, help='DB_POOL_MAX_SIZE for the pooled run')
+        parser.add_argument('--output', default=None,
+                            help='Where to write JSON results (default: bench_results/db_pool-<revision>.json)')
+        parser.add_argument('--mode', choices=MODES, help='Run a single mode in this process and print JSON')
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self.run_mode(options)))
+            return
+
+        results = []
+        for mode in MODES:
+            self.stdout.write(f"Running {mode} connections...")
+            results.append(self.spawn(mode, options))
+
+        for result in results:
+            self.stdout.write(
+                f"  {result['mode']}: REST p50={result['rest']['p50_ms']:.1f}ms p95={result['rest']['p95_ms']:.1f}ms "
+                f"({result['rest']['throughput_ops']:.0f} req/s), chat p50={result['chat']['p50_ms']:.1f}ms "
+                f"p95={result['chat']['p95_ms']:.1f}ms ({result['chat']['throughput_ops']:.0f} msg/s), "
+                f"{result['connections']} connections opened"
+            )
+            if result.get('pool'):
+                pool = result['pool']
+                self.stdout.write(
+                    f"    pool: max_size={pool['max_size']} waits={pool['waits']} "
+                    f"wait_mean={pool['wait_time_mean'] * 1000:.1f}ms wait_max={pool['wait_time_max'] * 1000:.1f}ms "
+                    f"timeouts={pool['timeouts']}"
+                )
+
+        setup_test_environment()
+        try:
+            metadata = environment_metadata()
+        finally:
+            teardown_test_environment()
+        output = options['output'] or os.path.join('bench_results', f"db_pool-{metadata['revision']}.json")
+        save_results(output, metadata, results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def spawn(self, mode, options):
+        env = dict(os.environ, DB_POOL='1' if mode == 'pooled' else '0')
+        if options['pool_size']:
+            env['DB_POOL_MAX_SIZE'] = str(options['pool_size'])
+        command = [
+            sys.executable, sys.argv[0], 'benchmark_db_pool', '--mode', mode,
+            '--rest-clients', str(options['rest_clients']), '--requests', str(options['requests']),
+            '--chat-sessions', str(options['chat_sessions']), '--messages', str(options['messages']),
+        ]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise CommandError(f"{mode} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_mode(self, options):
+        from core.benchmarks.db_pool import MixedLoad
+
+        pooled = options['mode'] == 'pooled'
+        if pooled != settings.DB_POOL:
+            raise CommandError(f"--mode {options['mode']} needs DB_POOL={'1' if pooled else '0'}")
+
+        setup_test_environment()
+        try:
+            load = MixedLoad(
+                rest_clients=options['rest_clients'],
+                requests_per_client=options['requests'],
+                chat_sessions=options['chat_sessions'],
+                messages_per_session=options['messages'],
+            )
+            result = load.run()
+        finally:
+            teardown_test_environment()
+
+        result['mode'] = options['mode']
+        if pooled:
+            from core.db.pool import pool_stats
+            result['pool'] = next(iter(pool_stats().values()), None)
+            result['connections'] = result['pool']['connections_opened'] if result['pool'] else 0
+        else:
+            result['connections'] = result['connection_checkouts']
+        return result
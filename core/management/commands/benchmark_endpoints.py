@@ -0,0 +1,66 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+from core.benchmarks.fake_openai import fake_openai_backend
+from core.benchmarks.harness import (
+    BenchmarkRunner, environment_metadata, save_results, load_results, compare_results
+)
+from core.benchmarks.scenarios import SCENARIOS, build_calls
+
+class Command(BaseCommand):
+    help = 'Benchmark the main REST endpoints against the current (generated) dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('endpoints', nargs='*', help=f"Endpoints to run (default: all of {', '.join(SCENARIOS)})")
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured warm-up requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=1, help='Concurrent client threads')
+        parser.add_argument('--openai-latency', type=float, default=0.0,
+                            help='Simulated OpenAI response time in seconds')
+        parser.add_argument('--seed', type=int, default=42, help='Seed used to pick request targets')
+        parser.add_argument('--output', default=None,
+                            help='Where to write JSON results (default: bench_results/<revision>.json)')
+        parser.add_argument('--compare', default=None, help='Baseline JSON file to compare against')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='p95 increase (percent) reported as a regression by --compare')
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'] or list(SCENARIOS)
+        unknown = [name for name in endpoints if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(unknown)}")
+
+        runner = BenchmarkRunner(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            concurrency=options['concurrency'],
+            log=self.stdout.write,
+        )
+
+        setup_test_environment()
+        try:
+            metadata = environment_metadata()
+            metadata['openai_latency'] = options['openai_latency']
+            self.stdout.write(f"Dataset: {metadata['dataset']}")
+
+            results = []
+            with fake_openai_backend(latency=options['openai_latency']) as fake:
+                for name in endpoints:
+                    results.append(runner.run(name, build_calls(name, seed=options['seed'])))
+                metadata['openai_calls'] = fake.calls
+        finally:
+            teardown_test_environment()
+
+        output = options['output'] or os.path.join('bench_results', f"{metadata['revision']}.json")
+        save_results(output, metadata, results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if options['compare']:
+            lines, regressions = compare_results(load_results(output), load_results(options['compare']),
+                                                 threshold=options['threshold'])
+            for line in lines:
+                self.stdout.write(f"  {line}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} endpoint(s) regressed against {options['compare']}")
+            self.stdout.write(self.style.SUCCESS('No regressions'))
@@ -0,0 +1,86 @@
+import os
+import time
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmarks.harness import environment_metadata, percentile, save_results
+from core.models import BloodRequest, Hospital, User
+from core.serializers import (
+    BloodRequestSerializer, CompiledBloodRequestSerializer, CompiledHospitalSerializer, CompiledUserSerializer,
+    HospitalSerializer, UserSerializer,
+)
+
+# name -> (queryset, DRF serializer, compiled serializer, serializer context), as the list endpoints use them
+CASES = {
+    'nearby_donors': (lambda: User.objects.filter(is_donor=True), UserSerializer, CompiledUserSerializer, True),
+    'nearby_hospitals': (lambda: Hospital.objects.all(), HospitalSerializer, CompiledHospitalSerializer, False),
+    'available_blood_requests': (lambda: BloodRequest.objects.all(), BloodRequestSerializer,
+                                 CompiledBloodRequestSerializer, False),
+}
+
+
+def _repeat(items, rows):
+    """`rows` items, cycling through `items` when the table is smaller"""
+    return list(islice(cycle(items), rows)) if items else []
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF ModelSerializers with the compiled .values() serializers on large lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('cases', nargs='*', help=f"Cases to run (default: all of {', '.join(CASES)})")
+        parser.add_argument('--rows', type=int, default=10000, help='Rows serialized per run')
+        parser.add_argument('--iterations', type=int, default=3, help='Measured runs per serializer')
+        parser.add_argument('--output', default=None,
+                            help='Where to write JSON results (default: bench_results/serializers-<revision>.json)')
+
+    def handle(self, *args, **options):
+        cases = options['cases'] or list(CASES)
+        unknown = [name for name in cases if name not in CASES]
+        if unknown:
+            raise CommandError(f"Unknown cases: {', '.join(unknown)}")
+
+        request = Request(APIRequestFactory().get('/api/users/nearby_donors/', HTTP_HOST='localhost'))
+        metadata = environment_metadata()
+        metadata['rows'] = options['rows']
+        results = []
+        for name in cases:
+            queryset, drf_class, compiled_class, with_request = CASES[name]
+            context = {'request': request, 'picture_size': 'thumb'} if with_request else {}
+            queryset = queryset().order_by('pk')[:options['rows']]
+
+            def drf():
+                instances = _repeat(list(queryset), options['rows'])
+                return [drf_class(instance, context=context).data for instance in instances]
+
+            def compiled():
+                serializer = compiled_class(context=context)
+                rows = _repeat(list(serializer.values(queryset)), options['rows'])
+                return [serializer.to_representation(row) for row in rows]
+
+            if JSONRenderer().render(drf()) != JSONRenderer().render(compiled()):
+                raise CommandError(f"{name}: compiled serializer output differs from {drf_class.__name__}")
+
+            result = {'name': name, 'rows': options['rows']}
+            for label, run in (('drf', drf), ('compiled', compiled)):
+                timings = []
+                for _ in range(options['iterations']):
+                    started = time.perf_counter()
+                    run()
+                    timings.append((time.perf_counter() - started) * 1000)
+                result[f'{label}_p50_ms'] = percentile(timings, 50)
+                result[f'{label}_min_ms'] = min(timings)
+            result['speedup'] = result['drf_p50_ms'] / result['compiled_p50_ms']
+            results.append(result)
+            self.stdout.write(
+                f"  {name}: {options['rows']} rows, DRF p50={result['drf_p50_ms']:.1f}ms, "
+                f"compiled p50={result['compiled_p50_ms']:.1f}ms ({result['speedup']:.1f}x)"
+            )
+
+        output = options['output'] or os.path.join('bench_results', f"serializers-{metadata['revision']}.json")
+        save_results(output, metadata, results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
@@ -1,41 +1,50 @@
 from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
 from core.models import Donation, Hospital
-import traceback
+from core.utils.reconciliation import AssignmentReconciler
 
 class Command(BaseCommand):
-    help = 'Check donation status and fix any issues'
+    help = 'Check donation status and hospital assignment drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hospital', metavar='HOSPITAL_NAME', help='Also break down donations for this hospital')
+        parser.add_argument('--verbose', action='store_true', help='List every donation')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per round trip when listing')
 
     def handle(self, *args, **options):
-        # Check all donations
-        donations = Donation.objects.all()
-        
-        self.stdout.write(f"Total donations: {donations.count()}")
-        
-        for donation in donations:
+        self.stdout.write(f"Total donations: {Donation.objects.count()}")
+        by_status = Donation.objects.order_by().values('status').annotate(
+            total=Count('id'),
+            with_hospital=Count('id', filter=Q(hospital__isnull=False)),
+            ai_recommended=Count('id', filter=Q(ai_recommended_hospital=True)),
+        )
+        for row in by_status.order_by('status'):
             self.stdout.write(
-                f"Donation {donation.id}: "
-                f"Donor={donation.donor.username}, "
-                f"Hospital={donation.hospital.name if donation.hospital else 'None'}, "
-                f"Status={donation.status}, "
-                f"AI Recommended={donation.ai_recommended_hospital}"
+                f"  {row['status']}: {row['total']} "
+                f"(with hospital={row['with_hospital']}, AI recommended={row['ai_recommended']})"
+            )
+
+        if options['verbose']:
+            rows = Donation.objects.order_by().values_list(
+                'id', 'donor__username', 'hospital__name', 'status', 'ai_recommended_hospital'
             )
-        
-        # Check cmc specifically
-        try:
-            cmc = Hospital.objects.get(name="CMC")
-            self.stdout.write(f"\ncmc found: ID={cmc.id}")
-            
-            # Check donations for cmc
-            hospital_donations = Donation.objects.filter(hospital=cmc)
-            self.stdout.write(f"Donations for CMC: {hospital_donations.count()}")
-            
-            for donation in hospital_donations:
+            for donation_id, donor, hospital, status, ai in rows.iterator(chunk_size=options['chunk_size']):
                 self.stdout.write(
-                    f"  Donation {donation.id}: "
-                    f"Status={donation.status}, "
-                    f"AI Recommended={donation.ai_recommended_hospital}, "
-                    f"Donor={donation.donor.username}"
+                    f"Donation {donation_id}: Donor={donor}, Hospital={hospital or 'None'}, "
+                    f"Status={status}, AI Recommended={ai}"
                 )
-                
-        except Hospital.DoesNotExist:
-            self.stdout.write("CMC not found in database")
\ No newline at end of file
+
+        if options['hospital']:
+            try:
+                hospital = Hospital.objects.get(name=options['hospital'])
+            except Hospital.DoesNotExist:
+                self.stdout.write(f"\n{options['hospital']} not found in database")
+            else:
+                counts = Donation.objects.filter(hospital=hospital).order_by().values('status').annotate(total=Count('id'))
+                self.stdout.write(f"\n{hospital.name} found: ID={hospital.id}")
+                for row in counts.order_by('status'):
+                    self.stdout.write(f"  {row['status']}: {row['total']}")
+
+        self.stdout.write("\nAssignment drift:")
+        for kind, count in AssignmentReconciler().counts().items():
+            self.stdout.write(f"  {kind}: {count}")
@@ -1,34 +1,33 @@
 from django.core.management.base import BaseCommand
-from core.models import Donation, Hospital
+from core.models import Hospital
+from core.utils.reconciliation import AssignmentReconciler
 
 class Command(BaseCommand):
     help = 'Fix hospital assignments for donations'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--assign-to', metavar='HOSPITAL_NAME',
+                            help='Also assign scheduled donations without a hospital to this hospital')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows written per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def progress(self, label, done, total):
+        self.stdout.write(f"  {label}: {done}/{total}")
+
     def handle(self, *args, **options):
-        # Find Hello Hospital
-        try:
-            hello_hospital = Hospital.objects.get(name="Hello Hospital")
-            self.stdout.write(f"Found Hello Hospital: ID={hello_hospital.id}")
-        except Hospital.DoesNotExist:
-            self.stdout.write("Hello Hospital not found")
-            return
-        
-        # Find donations that should be assigned to Hello Hospital
-        # First, check donations with no hospital
-        donations_no_hospital = Donation.objects.filter(hospital__isnull=True, status='scheduled')
-        self.stdout.write(f"Found {donations_no_hospital.count()} scheduled donations without hospital assignment")
-        
-        for donation in donations_no_hospital:
-            self.stdout.write(f"Fixing donation {donation.id} - assigning to Hello Hospital")
-            donation.hospital = hello_hospital
-            donation.ai_recommended_hospital = True
-            donation.save()
-            self.stdout.write(f"  Assigned to Hello Hospital, AI Recommended: {donation.ai_recommended_hospital}")
-        
-        # Check donations with other hospitals but should be with Hello Hospital
-        donations_other_hospital = Donation.objects.exclude(hospital=hello_hospital).filter(status='scheduled')
-        self.stdout.write(f"Found {donations_other_hospital.count()} scheduled donations with other hospitals")
-        
-        for donation in donations_other_hospital:
-            self.stdout.write(f"Checking donation {donation.id} with hospital {donation.hospital.name}")
-            # You might want to add specific logic here to determine if should be reassigned
\ No newline at end of file
+        reconciler = AssignmentReconciler(
+            chunk_size=options['chunk_size'], dry_run=options['dry_run'], progress=self.progress
+        )
+        verb = 'Would fix' if options['dry_run'] else 'Fixed'
+
+        if options['assign_to']:
+            try:
+                hospital = Hospital.objects.get(name=options['assign_to'])
+            except Hospital.DoesNotExist:
+                self.stdout.write(f"{options['assign_to']} not found")
+                return
+            assigned = reconciler.assign_unassigned(hospital)
+            self.stdout.write(f"{verb} {assigned} scheduled donations without hospital -> {hospital.name}")
+
+        for kind, count in reconciler.reconcile().items():
+            self.stdout.write(f"{verb} {count} {kind} assignments")
@@ -0,0 +1,61 @@
+import csv
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Hospital
+from core.utils.lab_import import IMPORT_FORMATS, LabImportError, LabResultImporter, guess_format
+
+class Command(BaseCommand):
+    help = 'Import blood test results for a hospital from a CSV or JSONL lab export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Lab export file')
+        parser.add_argument('--hospital', required=True, help='Hospital id or exact name')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='File format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows validated and written per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and match rows without writing')
+        parser.add_argument('--errors', metavar='PATH', help='Write the per-row error report to this CSV file')
+
+    def get_hospital(self, value):
+        try:
+            hospital = Hospital.objects.filter(id=uuid.UUID(value)).first()
+        except ValueError:
+            hospital = Hospital.objects.filter(name=value).first()
+        if hospital is None:
+            raise CommandError(f"Hospital '{value}' not found")
+        return hospital
+
+    def handle(self, *args, **options):
+        hospital = self.get_hospital(options['hospital'])
+        fmt = options['format'] or guess_format(options['path'])
+
+        def progress(report):
+            self.stdout.write(
+                f"  {report['rows']} rows: {report['created']} created, "
+                f"{report['updated']} updated, {report['failed']} failed"
+            )
+
+        importer = LabResultImporter(
+            hospital, chunk_size=options['chunk_size'], dry_run=options['dry_run'], progress=progress
+        )
+        with open(options['path'], 'rb') as fh:
+            try:
+                report = importer.run(fh, fmt)
+            except (LabImportError, UnicodeDecodeError, csv.Error) as e:
+                raise CommandError(f"Import stopped after {importer.report['rows']} rows: {str(e)}")
+
+        if options['errors'] and report['errors']:
+            with open(options['errors'], 'w', newline='') as fh:
+                writer = csv.DictWriter(fh, fieldnames=['line', 'error'])
+                writer.writeheader()
+                writer.writerows(report['errors'])
+            self.stdout.write(f"Wrote {len(report['errors'])} errors to {options['errors']}")
+        else:
+            for error in report['errors'][:20]:
+                self.stdout.write(f"  line {error['line']}: {error['error']}")
+
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['created'] + report['updated']} blood tests for {hospital.name} "
+            f"({report['created']} new, {report['updated']} updated, {report['failed']} rows failed)"
+        ))
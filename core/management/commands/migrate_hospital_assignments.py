@@ -1,26 +1,23 @@
 from django.core.management.base import BaseCommand
-from core.models import Donation, DonorHospitalAssignment
+from core.utils.reconciliation import AssignmentReconciler
 
 class Command(BaseCommand):
     help = 'Migrate existing hospital assignments to the new table'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows written per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be created without writing')
+
+    def progress(self, label, done, total):
+        self.stdout.write(f"  {label}: {done}/{total}")
+
     def handle(self, *args, **options):
-        # Get all donations with hospitals assigned
-        donations_with_hospitals = Donation.objects.filter(hospital__isnull=False)
-        
-        self.stdout.write(f"Found {donations_with_hospitals.count()} donations with hospitals")
-        
-        created_count = 0
-        for donation in donations_with_hospitals:
-            # Check if assignment already exists
-            if not DonorHospitalAssignment.objects.filter(donation=donation, hospital=donation.hospital).exists():
-                DonorHospitalAssignment.objects.create(
-                    donor=donation.donor,
-                    hospital=donation.hospital,
-                    donation=donation,
-                    status=donation.status,
-                    ai_recommended=donation.ai_recommended_hospital
-                )
-                created_count += 1
-        
-        self.stdout.write(f"Created {created_count} new hospital assignments")
\ No newline at end of file
+        reconciler = AssignmentReconciler(
+            chunk_size=options['chunk_size'], dry_run=options['dry_run'], progress=self.progress
+        )
+        self.stdout.write(f"Found {reconciler.missing().count()} donations with hospitals but no assignment")
+
+        created_count = reconciler.create_missing()
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(f"{verb} {created_count} new hospital assignments")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.utils.partitions import (
+    PARTITIONED_TABLES, add_months, convert_to_partitioned, detach_partitions, ensure_partitions, month_start,
+)
+
+
+class Command(BaseCommand):
+    help = 'Partition core_message and core_notification by month, create upcoming partitions, detach old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', choices=sorted(PARTITIONED_TABLES), action='append',
+                            help='Limit to this table (repeatable); default is both')
+        parser.add_argument('--convert', action='store_true',
+                            help='Rebuild unpartitioned tables as partitioned ones, copying existing rows')
+        parser.add_argument('--months-ahead', type=int, help='Months of partitions to keep ready')
+        parser.add_argument('--detach-older-than', type=int, metavar='MONTHS',
+                            help='Detach monthly partitions that ended more than MONTHS months ago')
+        parser.add_argument('--drop', action='store_true', help='Drop detached partitions instead of keeping them')
+
+    def handle(self, *args, **options):
+        tables = options['table'] or list(PARTITIONED_TABLES)
+
+        if options['convert']:
+            for table in tables:
+                try:
+                    copied = convert_to_partitioned(table, options['months_ahead'])
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f"{table}: {copied} rows copied into monthly partitions")
+
+        created = ensure_partitions(options['months_ahead'], tables)
+        self.stdout.write(f"Created {len(created)} partitions")
+
+        if options['detach_older_than'] is not None:
+            cutoff = add_months(month_start(timezone.now()), -options['detach_older_than'])
+            for table in tables:
+                detached = detach_partitions(table, cutoff, drop=options['drop'])
+                self.stdout.write(f"{table}: {'dropped' if options['drop'] else 'detached'} {len(detached)} partitions")
+
+        self.stdout.write(self.style.SUCCESS('Done'))
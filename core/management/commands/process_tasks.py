@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core.tasks import PRIORITY_LOW, enqueue, process_tasks, release_stale_tasks
+
+class Command(BaseCommand):
+    help = 'Run the background task worker (profile pictures, predictions, notification fan-out)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Tasks claimed per poll')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the due tasks once and exit')
+
+    def handle(self, *args, **options):
+        released = release_stale_tasks()
+        if released:
+            self.stdout.write(f"Re-queued {released} stale running tasks")
+        # Daily upkeep that reschedules itself; the dedupe key keeps one in the queue
+        enqueue('maintain_partitions', priority=PRIORITY_LOW, dedupe_key='maintain-partitions')
+        enqueue('lift_expired_deferrals', priority=PRIORITY_LOW, dedupe_key='lift-expired-deferrals')
+
+        total = 0
+        while True:
+            close_old_connections()
+            processed = process_tasks(limit=options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} tasks"))
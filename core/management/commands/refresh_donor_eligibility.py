@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core.utils.eligibility import lift_expired_deferrals, rebuild_donor_eligibility
+
+class Command(BaseCommand):
+    help = 'Lift expired donor deferrals (run daily), or rebuild all donor eligibility from history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute every donor from their donations and blood tests')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            changed = rebuild_donor_eligibility()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt eligibility, {changed} users changed"))
+            return
+
+        lifted = lift_expired_deferrals()
+        self.stdout.write(self.style.SUCCESS(f"Lifted {lifted} expired deferrals"))
@@ -1,35 +1,41 @@
 from django.core.management.base import BaseCommand
-from core.models import Donation, Hospital
+from core.utils.reconciliation import AssignmentReconciler, DRIFT_KINDS
+
+DESCRIPTIONS = {
+    'missing': 'Donations with a hospital but no assignment',
+    'stale': 'Assignments out of step with their donation',
+    'orphaned': 'Open assignments for a hospital the donation no longer uses',
+    'unassigned': 'Donations without hospitals (that should have them)',
+}
 
 class Command(BaseCommand):
     help = 'Verify hospital assignments for donations'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose', action='store_true', help='List every drifted row')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per round trip when listing')
+
     def handle(self, *args, **options):
-        # Check all donations with hospitals
-        donations_with_hospitals = Donation.objects.filter(hospital__isnull=False)
-        
-        self.stdout.write(f"Total donations with hospitals: {donations_with_hospitals.count()}")
-        
-        for donation in donations_with_hospitals:
-            self.stdout.write(
-                f"Donation {donation.id}: "
-                f"Donor={donation.donor.username}, "
-                f"Hospital={donation.hospital.name}, "
-                f"Status={donation.status}, "
-                f"AI Recommended={donation.ai_recommended_hospital}"
-            )
-        
-        # Check donations without hospitals that should have them
-        donations_without_hospitals = Donation.objects.filter(
-            hospital__isnull=True, 
-            status__in=['scheduled', 'completed']
-        )
-        
-        self.stdout.write(f"\nDonations without hospitals (that should have them): {donations_without_hospitals.count()}")
-        
-        for donation in donations_without_hospitals:
-            self.stdout.write(
-                f"Donation {donation.id}: "
-                f"Donor={donation.donor.username}, "
-                f"Status={donation.status}"
-            )
\ No newline at end of file
+        reconciler = AssignmentReconciler(chunk_size=options['chunk_size'])
+        counts = reconciler.counts()
+
+        for kind in DRIFT_KINDS:
+            self.stdout.write(f"{DESCRIPTIONS[kind]}: {counts[kind]}")
+            if options['verbose'] and counts[kind]:
+                self.list_rows(reconciler, kind)
+
+        if any(counts.values()):
+            self.stdout.write(self.style.WARNING("Run fix_hospital_assignments to repair the drift above"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Hospital assignments are consistent"))
+
+    def list_rows(self, reconciler, kind):
+        queryset = reconciler.queryset(kind).order_by()
+        if kind in ('missing', 'unassigned'):
+            rows = queryset.values_list('id', 'donor__username', 'hospital__name', 'status')
+            template = "  Donation {}: Donor={}, Hospital={}, Status={}"
+        else:
+            rows = queryset.values_list('donation_id', 'donor__username', 'hospital__name', 'status')
+            template = "  Donation {}: Donor={}, Assigned hospital={}, Assignment status={}"
+        for row in rows.iterator(chunk_size=reconciler.chunk_size):
+            self.stdout.write(template.format(*row))
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import BloodRequest
+from core.utils.eligibility import matchable_donors
+from core.utils.travel_time import (
+    hospital_pairs, purge_expired, stale_pairs, travel_cell, travel_time_provider, warm,
+)
+
+
+class Command(BaseCommand):
+    help = 'Fetch travel times from donor and pending request locations to nearby hospitals (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Fetch every pair again, not only missing and expired ones')
+        parser.add_argument('--purge', action='store_true',
+                            help='Delete expired travel times first')
+        parser.add_argument('--radius', type=float, default=settings.TRAVEL_TIME['warm_radius_km'],
+                            help='Only warm hospitals within this many km of a cell')
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            self.stdout.write(f"Purged {purge_expired()} expired travel times")
+
+        origins = {travel_cell(lat, lng) for lat, lng in
+                   matchable_donors().values_list('location_lat', 'location_long')}
+        origins |= {travel_cell(lat, lng) for lat, lng in
+                    BloodRequest.objects.filter(status='pending').values_list('location_lat', 'location_long')}
+        pairs = hospital_pairs(origins, options['radius'])
+        if not options['force']:
+            pairs = stale_pairs(pairs)
+
+        provider = travel_time_provider()
+        hospitals = {hospital for _, hospital in pairs}
+        self.stdout.write(f"Warming {len(pairs)} cell pairs ({len(origins)} origin cells, "
+                          f"{len(hospitals)} hospital cells) with {provider.name}")
+        written = warm(pairs, provider)
+        self.stdout.write(self.style.SUCCESS(f"Stored {written} travel times"))
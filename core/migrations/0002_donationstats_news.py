@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:26
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField(unique=True)),
+                ('total_donations', models.PositiveIntegerField(default=0)),
+                ('total_requests', models.PositiveIntegerField(default=0)),
+                ('lives_saved', models.PositiveIntegerField(default=0)),
+                ('active_donors', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Donation Stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='News',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('summary', models.CharField(max_length=500)),
+                ('content', models.TextField()),
+                ('category', models.CharField(choices=[('announcement', 'Announcement'), ('health_tip', 'Health Tip'), ('success_story', 'Success Story'), ('event', 'Event'), ('urgent', 'Urgent'), ('campaign', 'Campaign')], default='announcement', max_length=20)),
+                ('image_url', models.URLField(blank=True, null=True)),
+                ('is_featured', models.BooleanField(default=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('author', models.CharField(default='Project RED Team', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'News',
+                'ordering': ['-is_featured', '-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# A frozen copy of core.utils.eligibility.REBUILD_SQL as of this migration
+REBUILD_SQL = """
+WITH last_donation AS (
+    SELECT donor_id, MAX(donation_date)::date AS donated_on
+    FROM core_donation
+    WHERE status = 'completed' AND donation_date IS NOT NULL
+    GROUP BY donor_id
+),
+last_test AS (
+    SELECT DISTINCT ON (d.donor_id)
+        d.donor_id, t.hemoglobin, t.created_at::date AS tested_on
+    FROM core_bloodtest t
+    JOIN core_donation d ON d.id = t.donation_id
+    WHERE t.hemoglobin IS NOT NULL
+    ORDER BY d.donor_id, t.created_at DESC
+),
+state AS (
+    SELECT
+        u.id,
+        ld.donated_on,
+        ld.donated_on + %(interval)s AS interval_ends,
+        CASE
+            WHEN lt.hemoglobin < CASE WHEN u.gender = 'M' THEN %(min_male)s ELSE %(min_other)s END
+            THEN lt.tested_on + %(deferral)s
+        END AS deferred_until
+    FROM core_user u
+    LEFT JOIN last_donation ld ON ld.donor_id = u.id
+    LEFT JOIN last_test lt ON lt.donor_id = u.id
+)
+UPDATE core_user u
+SET last_donation_date = s.donated_on,
+    eligible_from = CASE
+        WHEN s.interval_ends IS NULL AND s.deferred_until IS NULL THEN NULL
+        ELSE GREATEST(s.interval_ends, s.deferred_until)
+    END,
+    is_deferred = COALESCE(s.deferred_until > %(today)s, FALSE)
+FROM state s
+WHERE s.id = u.id
+  AND (u.last_donation_date IS DISTINCT FROM s.donated_on
+       OR u.eligible_from IS DISTINCT FROM CASE
+           WHEN s.interval_ends IS NULL AND s.deferred_until IS NULL THEN NULL
+           ELSE GREATEST(s.interval_ends, s.deferred_until)
+       END
+       OR u.is_deferred IS DISTINCT FROM COALESCE(s.deferred_until > %(today)s, FALSE))
+"""
+
+
+def backfill_eligibility(apps, schema_editor):
+    params = {
+        'interval': getattr(settings, 'DONATION_INTERVAL_DAYS', 56),
+        'deferral': getattr(settings, 'HEMOGLOBIN_DEFERRAL_DAYS', 90),
+        'min_male': 13.0,
+        'min_other': 12.5,
+        'today': timezone.localdate(),
+    }
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL, params)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_background_tasks_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='eligible_from',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='is_deferred',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_donation_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_deferred', False), ('is_donor', True), ('location_lat__isnull', False), ('location_long__isnull', False)), fields=['blood_group', 'eligible_from'], name='user_matchable_donor_idx'),
+        ),
+        migrations.RunPython(backfill_eligibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:49
+
+import re
+
+from django.db import migrations, models
+
+# A frozen copy of core.utils.urgency.URGENCY_KEYWORDS as of this migration
+URGENCY_KEYWORDS = [
+    (0, ['critical', 'emergency', 'immediate', 'immediately', 'life threatening', 'stat', 'asap']),
+    (1, ['high', 'urgent', 'soon', 'today']),
+    (3, ['low', 'routine', 'scheduled', 'planned', 'whenever']),
+    (2, ['medium', 'normal', 'moderate']),
+]
+
+
+def urgency_priority(urgency):
+    words = ' '.join(re.findall(r'[a-z]+', (urgency or '').lower()))
+    for level, keywords in URGENCY_KEYWORDS:
+        if any(re.search(rf'\b{keyword}\b', words) for keyword in keywords):
+            return level
+    return 2
+
+
+def backfill_priority(apps, schema_editor):
+    BloodRequest = apps.get_model('core', 'BloodRequest')
+    # One UPDATE per distinct urgency text rather than one per request
+    for urgency in BloodRequest.objects.values_list('urgency', flat=True).distinct():
+        BloodRequest.objects.filter(urgency=urgency).update(priority=urgency_priority(urgency))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_rate_limit_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='first_notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Critical'), (1, 'High'), (2, 'Medium'), (3, 'Low')], default=2),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['blood_group', 'priority', 'created_at'], name='bloodrequest_pending_idx'),
+        ),
+        migrations.RunPython(backfill_priority, migrations.RunPython.noop),
+    ]
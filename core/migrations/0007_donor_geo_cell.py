@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:51
+
+from django.db import migrations, models
+
+
+# Frozen copy of core.utils.geo.DONOR_CELL_SQL for 0.1 degree cells (1800 rows x 3600 columns)
+BACKFILL_SQL = """
+UPDATE core_user
+SET geo_cell = LEAST(FLOOR((location_lat + 90) / 0.1)::int, 1799) * 3600
+             + MOD(FLOOR((location_long + 180) / 0.1)::int, 3600)
+WHERE location_lat IS NOT NULL AND location_long IS NOT NULL
+"""
+
+
+def backfill_geo_cells(apps, schema_editor):
+    schema_editor.execute(BACKFILL_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_blood_request_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_deferred', False), ('is_donor', True), ('location_lat__isnull', False), ('location_long__isnull', False)), fields=['blood_group', 'geo_cell'], name='user_donor_cell_idx'),
+        ),
+        migrations.RunPython(backfill_geo_cells, migrations.RunPython.noop),
+    ]
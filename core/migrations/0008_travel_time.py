@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_donor_geo_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin_cell', models.CharField(max_length=20)),
+                ('destination_cell', models.CharField(max_length=20)),
+                ('seconds', models.FloatField(blank=True, null=True)),
+                ('provider', models.CharField(max_length=50)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='traveltime',
+            constraint=models.UniqueConstraint(fields=('origin_cell', 'destination_cell'), name='travel_time_cell_pair'),
+        ),
+    ]
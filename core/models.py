@@ -1,9 +1,14 @@
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.hashers import make_password, check_password
 import uuid
 
+from .utils.geo import donor_cell
+from .utils.urgency import MEDIUM, PRIORITY_CHOICES, urgency_priority
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, username, email, password=None, **extra_fields):
         if not email:
@@ -47,6 +52,8 @@ class User(AbstractUser):
     is_recipient = models.BooleanField(default=True)
     location_lat = models.FloatField(blank=True, null=True)
     location_long = models.FloatField(blank=True, null=True)
+    # Donor search grid cell of the location (core.utils.geo.donor_cell), set on save
+    geo_cell = models.IntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     profile_picture = models.ImageField(
@@ -55,8 +62,40 @@ class User(AbstractUser):
         null=True,
         default='profile_pictures/default.png'
     )
+    # Re-encoded size variants of profile_picture, keyed by variant name
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
+
+    # Denormalized donation eligibility, maintained by core.utils.eligibility
+    last_donation_date = models.DateField(blank=True, null=True)
+    eligible_from = models.DateField(blank=True, null=True)  # Null means eligible now
+    is_deferred = models.BooleanField(default=False)
     
     objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Covers only donors that matching can ever return
+            models.Index(
+                fields=['blood_group', 'eligible_from'],
+                condition=Q(is_donor=True, is_deferred=False, location_lat__isnull=False, location_long__isnull=False),
+                name='user_matchable_donor_idx',
+            ),
+            # Ring scans of the k-nearest donor search (core.utils.donor_search)
+            models.Index(
+                fields=['blood_group', 'geo_cell'],
+                condition=Q(is_donor=True, is_deferred=False, location_lat__isnull=False, location_long__isnull=False),
+                name='user_donor_cell_idx',
+            ),
+            # Donor counts per blood group on the dashboard
+            models.Index(fields=['is_donor', 'blood_group', 'is_active'], name='user_donor_group_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = donor_cell(self.location_lat, self.location_long)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'location_lat', 'location_long'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geo_cell'}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.username} - {self.blood_group}"
@@ -132,11 +171,29 @@ class BloodRequest(models.Model):
     blood_group = models.CharField(max_length=3, choices=User.BLOOD_GROUPS)
     units_required = models.PositiveIntegerField(default=1)
     urgency = models.CharField(max_length=100)
+    # Normalized from urgency on save; lower is more urgent
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=MEDIUM)
     reason = models.TextField(blank=True, null=True)
     location_lat = models.FloatField()
     location_long = models.FloatField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    first_notified_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Also serves status='pending' with or without blood_group
+            models.Index(fields=['blood_group', 'priority', 'created_at'], condition=Q(status='pending'),
+                         name='bloodrequest_pending_idx'),
+            models.Index(fields=['created_at'], name='bloodrequest_created_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.priority = urgency_priority(self.urgency)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'urgency' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'priority'}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"Request from {self.patient.username} for {self.blood_group}"
@@ -156,17 +213,32 @@ class Donation(models.Model):
     ai_recommended_hospital = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['donor', 'status'], name='donation_donor_status_idx'),
+            # Pledged and completed units of a request
+            models.Index(fields=['blood_request', 'status'], name='donation_request_status_idx'),
+            models.Index(fields=['status'], name='donation_status_idx'),
+            models.Index(fields=['created_at'], name='donation_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
+        became_completed = False
         if self.pk:
             try:
                 old_instance = Donation.objects.get(pk=self.pk)
                 if old_instance.status != 'completed' and self.status == 'completed':
                     from django.utils import timezone
                     self.donation_date = timezone.now()
+                    became_completed = True
             except Donation.DoesNotExist:
-                pass
+                became_completed = self.status == 'completed'
         
         super().save(*args, **kwargs)
+
+        if became_completed:
+            from .utils.eligibility import record_completed_donation
+            record_completed_donation(self.donor_id, self.donation_date or self.created_at)
     
     def __str__(self):
         return f"Donation by {self.donor.username} for {self.blood_request.patient.username}"
@@ -226,6 +298,11 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat_room', 'timestamp'], name='message_room_time_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.username} at {self.timestamp}"
@@ -248,6 +325,12 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     related_id = models.UUIDField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A user's recent notifications, newest first
+            models.Index(fields=['user', '-created_at'], name='notification_user_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} notification for {self.user.username}"
@@ -273,6 +356,9 @@ class DonorHospitalAssignment(models.Model):
     
     class Meta:
         unique_together = ['donor', 'hospital', 'donation']
+        indexes = [
+            models.Index(fields=['hospital', 'status'], name='assignment_hospital_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.donor.username} -> {self.hospital.name} (Donation: {self.donation.id})"
@@ -323,4 +409,66 @@ class DonationStats(models.Model):
         ordering = ['-date']
 
     def __str__(self):
-        return f"Stats for {self.date}"
\ No newline at end of file
+        return f"Stats for {self.date}"
+
+
+class TravelTime(models.Model):
+    """Cached travel time between two grid cells (core.utils.travel_time)"""
+    origin_cell = models.CharField(max_length=20)
+    destination_cell = models.CharField(max_length=20)
+    seconds = models.FloatField(blank=True, null=True)  # None when there is no route
+    provider = models.CharField(max_length=50)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['origin_cell', 'destination_cell'], name='travel_time_cell_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.origin_cell} -> {self.destination_cell}: {self.seconds}s ({self.provider})"
+
+
+class BackgroundTask(models.Model):
+    """Deferred work picked up by the process_tasks worker"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.PositiveSmallIntegerField(default=50)  # Lower runs first
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    run_at = models.DateTimeField(default=timezone.now)
+    dedupe_key = models.CharField(max_length=255, blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    last_error = models.TextField(blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['priority', 'run_at'], condition=Q(status='pending'), name='task_pending_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedupe_key'], condition=Q(status='pending'), name='task_pending_dedupe'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class RateLimitBucket(models.Model):
+    """Shared token bucket state for core.utils.rate_limit; rate and capacity live in settings"""
+    name = models.CharField(max_length=50, primary_key=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.1f} tokens"
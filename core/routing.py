@@ -3,4 +3,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/chat/(?P<chat_room_id>\w+)/$', consumers.ChatConsumer.as_asgi()),
+    re_path(r'ws/location/$', consumers.LocationConsumer.as_asgi()),
 ]
\ No newline at end of file
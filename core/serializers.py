@@ -2,11 +2,14 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
 from .models import User, DonorHospitalAssignment, Hospital, BloodRequest, Donation, BloodTest, ChatRoom, Message, Notification, HospitalUser, News, DonationStats
-import requests
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
 import json
 import base64
 from math import radians, sin, cos, sqrt, atan2
+from .tasks import enqueue, PRIORITY_INTERACTIVE
+from .utils.images import validate_image_upload, picture_url, profile_picture_url
+from .utils.http_gateway import get_json
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -39,10 +42,11 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def geocode_address(self, address):
         try:
-            api_key = settings.GOOGLE_MAPS_API_KEY
-            url = f"https://maps.googleapis.com/maps/api/geocode/json?address={address}&key={api_key}"
-            response = requests.get(url)
-            data = response.json()
+            data = get_json(
+                'google_maps',
+                'https://maps.googleapis.com/maps/api/geocode/json',
+                params={'address': address, 'key': settings.GOOGLE_MAPS_API_KEY},
+            )
             
             if data['status'] == 'OK':
                 location = data['results'][0]['geometry']['location']
@@ -73,6 +77,18 @@ class UserLoginSerializer(serializers.Serializer):
         
         return data
 
+def _picture_url(name, variants, context):
+    """
+    Profile picture URL for both user serializers, in the size variant asked for by
+    the view (context) or the client (?picture_size=thumb)
+    """
+    request = context.get('request')
+    size = context.get('picture_size')
+    if size is None and request is not None:
+        size = request.query_params.get('picture_size') if hasattr(request, 'query_params') else None
+    return picture_url(name, variants, size, request)
+
+
 class UserSerializer(serializers.ModelSerializer):
     profile_picture_url = serializers.SerializerMethodField()
     
@@ -88,18 +104,13 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['profile_picture_url']
     
     def get_profile_picture_url(self, obj):
-        if obj.profile_picture:
-            request = self.context.get('request')
-            if request:
-                # This generates absolute URL like: http://127.0.0.1:8000/media/profile_pictures/filename.jpg
-                return request.build_absolute_uri(obj.profile_picture.url)
-            return obj.profile_picture.url
-        return None
+        return _picture_url(obj.profile_picture.name, obj.profile_picture_variants, self.context)
      
     
     
 class UserUpdateSerializer(serializers.ModelSerializer):
-    profile_picture = serializers.ImageField(required=False, allow_null=True)
+    # Only sniffed here; decoding and re-encoding happen in the background worker
+    profile_picture = serializers.FileField(required=False, allow_null=True, validators=[validate_image_upload])
     profile_picture_url = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
@@ -110,12 +121,20 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         ]
     
     def get_profile_picture_url(self, obj):
-        if obj.profile_picture:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.profile_picture.url)
-            return obj.profile_picture.url
-        return None
+        return profile_picture_url(obj, None, self.context.get('request'))
+
+    def update(self, instance, validated_data):
+        new_picture = 'profile_picture' in validated_data and validated_data['profile_picture'] is not None
+        if new_picture:
+            validated_data['profile_picture_variants'] = {}
+        instance = super().update(instance, validated_data)
+        if new_picture:
+            enqueue(
+                'process_profile_picture',
+                {'user_id': str(instance.pk), 'upload': instance.profile_picture.name},
+                priority=PRIORITY_INTERACTIVE,
+            )
+        return instance
     
 
 class ChangePasswordSerializer(serializers.Serializer):
@@ -221,7 +240,7 @@ class BloodRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = BloodRequest
         fields = '__all__'
-        read_only_fields = ('patient', 'status')
+        read_only_fields = ('patient', 'status', 'priority', 'first_notified_at')
         
 
 class BloodTestSerializer(serializers.ModelSerializer):
@@ -381,4 +400,123 @@ class DashboardStatsSerializer(serializers.Serializer):
     active_donors = serializers.IntegerField()
     pending_requests = serializers.IntegerField()
     completed_donations = serializers.IntegerField()
-    blood_group_stats = serializers.DictField()
\ No newline at end of file
+    blood_group_stats = serializers.DictField()
+
+
+def _full_name(first_column, last_column):
+    """User.get_full_name() from .values() columns"""
+    return ([first_column, last_column],
+            lambda row, context: f"{row[first_column]} {row[last_column]}".strip())
+
+
+def _is_column(model, source):
+    """Whether a dotted serializer source names a model field, possibly across relations"""
+    for part in source.split('.'):
+        if model is None:
+            return False
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        model = field.related_model
+    return True
+
+
+class CompiledSerializer:
+    """
+    Read-only fast path for large lists.
+
+    The fields of `serializer_class` are compiled once into per-field builders
+    over .values() rows, so serializing a row is a dict comprehension instead
+    of DRF's per-field attribute lookups. The output is the same as
+    serializer_class. Fields that are not a column or a related column
+    (methods, SerializerMethodFields) need an entry in `computed`: field name ->
+    (columns, function(row, context)).
+    """
+
+    serializer_class = None
+    computed = {}
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.fields, self.columns = self.compile()
+
+    @classmethod
+    def compile(cls):
+        compiled = cls.__dict__.get('_compiled')
+        if compiled is None:
+            compiled = cls._compiled = cls._compile()
+        return compiled
+
+    @classmethod
+    def _compile(cls):
+        model = cls.serializer_class.Meta.model
+        fields, columns = [], []
+        for name, field in cls.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in cls.computed:
+                needed, build = cls.computed[name]
+            elif isinstance(field, serializers.SerializerMethodField) or not _is_column(model, field.source):
+                raise TypeError(f"{cls.__name__} needs a computed entry for {name}")
+            else:
+                column = field.source.replace('.', '__')
+                needed, build = [column], cls._column_builder(model, field, column)
+            columns.extend(column for column in needed if column not in columns)
+            fields.append((name, build))
+        return fields, columns
+
+    @staticmethod
+    def _column_builder(model, field, column):
+        if isinstance(field, serializers.FileField):
+            storage = model._meta.get_field(field.source).storage
+
+            def build(row, context):
+                if not row[column]:
+                    return None
+                url = storage.url(row[column])
+                request = context.get('request')
+                return request.build_absolute_uri(url) if request is not None else url
+            return build
+
+        if isinstance(field, serializers.RelatedField):
+            # Primary key related fields render the key itself
+            convert = None
+        else:
+            convert = field.to_representation
+
+        def build(row, context):
+            value = row[column]
+            if value is None or convert is None:
+                return value
+            return convert(value)
+        return build
+
+    def values(self, queryset):
+        """`queryset` projected to the columns the fields need"""
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row):
+        context = self.context
+        return {name: build(row, context) for name, build in self.fields}
+
+
+class CompiledUserSerializer(CompiledSerializer):
+    serializer_class = UserSerializer
+    computed = {
+        'profile_picture_url': (
+            ['profile_picture', 'profile_picture_variants'],
+            lambda row, context: _picture_url(row['profile_picture'], row['profile_picture_variants'], context),
+        ),
+    }
+
+
+class CompiledHospitalSerializer(CompiledSerializer):
+    serializer_class = HospitalSerializer
+
+
+class CompiledBloodRequestSerializer(CompiledSerializer):
+    serializer_class = BloodRequestSerializer
+    computed = {
+        'patient_name': _full_name('patient__first_name', 'patient__last_name'),
+    }
@@ -1,17 +1,37 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from .models import Donation
-from django.utils import timezone
+from .models import BloodTest, News, Hospital
+from .tasks import enqueue
+from .utils.cache import bump_cache_version
+from .utils.eligibility import record_blood_test
+from .utils.map_layer import MAP_LAYER_NAMESPACE
 
-@receiver(pre_save, sender=Donation)
-def update_donation_date(sender, instance, **kwargs):
+NEWS_CACHE_NAMESPACE = 'news'
+
+@receiver([post_save, post_delete], sender=News)
+def invalidate_news_cache(sender, instance, **kwargs):
+    """
+    Drop every cached news response whenever an article changes
+    """
+    transaction.on_commit(lambda: bump_cache_version(NEWS_CACHE_NAMESPACE))
+
+
+@receiver([post_save, post_delete], sender=Hospital)
+def rebuild_hospital_map_layer(sender, instance, **kwargs):
+    """
+    Retire the precomputed hospital map layer and queue a rebuild; a burst of
+    hospital edits collapses into a single pending rebuild
+    """
+    transaction.on_commit(lambda: bump_cache_version(MAP_LAYER_NAMESPACE))
+    enqueue('build_map_layer', dedupe_key='build_map_layer')
+
+
+@receiver(post_save, sender=BloodTest)
+def update_donor_deferral(sender, instance, update_fields=None, **kwargs):
     """
-    Automatically set donation_date when status changes to completed
+    Keep the donor's deferral flag in step with their latest hemoglobin result
     """
-    if instance.pk:
-        try:
-            old_instance = Donation.objects.get(pk=instance.pk)
-            if old_instance.status != 'completed' and instance.status == 'completed':
-                instance.donation_date = timezone.now()
-        except Donation.DoesNotExist:
-            pass
\ No newline at end of file
+    if update_fields is not None and 'hemoglobin' not in update_fields:
+        return
+    record_blood_test(instance)
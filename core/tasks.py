@@ -0,0 +1,222 @@
+# core/tasks.py
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import BackgroundTask
+from .utils.rate_limit import BULK, INTERACTIVE, traffic_class
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers are claimed first by the worker
+PRIORITY_CRITICAL = 0
+PRIORITY_INTERACTIVE = 10
+PRIORITY_NORMAL = 50
+PRIORITY_LOW = 70
+PRIORITY_BULK = 90
+
+_registry = {}
+
+
+def task(name):
+    """Register a function as the handler for background tasks called `name`"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, priority=PRIORITY_NORMAL, delay=None, dedupe_key=None, max_attempts=3):
+    """
+    Queue `name` to run in the worker.
+
+    With a dedupe_key, a task that is still pending under the same key absorbs the
+    new one. With TASKS_ALWAYS_EAGER the handler runs in-process once the current
+    transaction commits instead.
+    """
+    if name not in _registry:
+        raise KeyError(f"Unknown background task: {name}")
+    payload = payload or {}
+
+    if settings.TASKS_ALWAYS_EAGER and not delay:
+        transaction.on_commit(lambda: _run_handler(name, payload, priority))
+        return None
+
+    run_at = timezone.now() + (delay or timedelta())
+    try:
+        with transaction.atomic():
+            return BackgroundTask.objects.create(
+                name=name, payload=payload, priority=priority, run_at=run_at,
+                dedupe_key=dedupe_key, max_attempts=max_attempts,
+            )
+    except IntegrityError:
+        # Another pending task already covers this key
+        return BackgroundTask.objects.filter(dedupe_key=dedupe_key, status='pending').first()
+
+
+def claim_tasks(limit=10):
+    """Lock up to `limit` due tasks for this worker, most urgent first"""
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            BackgroundTask.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', run_at__lte=now)
+            .order_by('priority', 'run_at')[:limit]
+        )
+        for claimed in tasks:
+            claimed.status = 'running'
+            claimed.locked_at = now
+            claimed.attempts += 1
+        BackgroundTask.objects.bulk_update(tasks, ['status', 'locked_at', 'attempts'])
+    return tasks
+
+
+def _run_handler(name, payload, priority):
+    # Bulk-priority tasks draw on the bulk share of rate-limited upstream budgets
+    with traffic_class(BULK if priority >= PRIORITY_BULK else INTERACTIVE):
+        _registry[name](payload)
+
+
+def run_task(claimed):
+    handler = _registry.get(claimed.name)
+    try:
+        if handler is None:
+            raise KeyError(f"No handler registered for {claimed.name}")
+        _run_handler(claimed.name, claimed.payload, claimed.priority)
+    except Exception as e:
+        logger.error(f"Background task {claimed.name} ({claimed.id}) failed: {str(e)}")
+        claimed.last_error = traceback.format_exc()
+        if claimed.attempts < claimed.max_attempts and handler is not None:
+            # Exponential backoff before the next attempt
+            claimed.status = 'pending'
+            claimed.run_at = timezone.now() + timedelta(seconds=30 * 2 ** (claimed.attempts - 1))
+        else:
+            claimed.status = 'failed'
+            claimed.finished_at = timezone.now()
+    else:
+        claimed.status = 'done'
+        claimed.finished_at = timezone.now()
+    claimed.locked_at = None
+    try:
+        claimed.save(update_fields=['status', 'run_at', 'last_error', 'locked_at', 'finished_at'])
+    except IntegrityError:
+        # A newer task with the same dedupe key was queued while this one ran
+        claimed.status = 'done'
+        claimed.dedupe_key = None
+        claimed.save(update_fields=['status', 'dedupe_key', 'locked_at', 'finished_at', 'last_error'])
+
+
+def process_tasks(limit=10):
+    """Claim and run one batch of due tasks. Returns how many were processed."""
+    tasks = claim_tasks(limit)
+    for claimed in tasks:
+        run_task(claimed)
+    return len(tasks)
+
+
+def release_stale_tasks(timeout=timedelta(minutes=15)):
+    """Put tasks whose worker died mid-run back in the queue"""
+    return BackgroundTask.objects.filter(
+        status='running', locked_at__lt=timezone.now() - timeout
+    ).update(status='pending', locked_at=None)
+
+
+# ----------------------------------------------------------------------
+# Task handlers
+# ----------------------------------------------------------------------
+
+@task('process_profile_picture')
+def process_profile_picture_task(payload):
+    from .utils.images import process_profile_picture
+    process_profile_picture(payload['user_id'], payload['upload'])
+
+
+@task('build_map_layer')
+def build_map_layer_task(payload):
+    from .utils.map_layer import get_hospital_layer
+    get_hospital_layer()
+
+
+@task('predict_blood_test')
+def predict_blood_test_task(payload):
+    from .models import BloodTest, Notification
+    from .utils.ai_prediction import predict_for_blood_test
+
+    blood_test = BloodTest.objects.select_related('donation__donor').filter(pk=payload['blood_test_id']).first()
+    if blood_test is None:
+        return
+    donor = blood_test.donation.donor
+
+    prediction, owner = predict_for_blood_test(blood_test, donor)
+    if not owner:
+        return
+
+    Notification.objects.create(
+        user=donor,
+        notification_type='health_alert',
+        title='Blood Test Analysis Complete',
+        message=prediction['notification_message'],
+        related_id=blood_test.id
+    )
+
+
+@task('notify_blood_request_donors')
+def notify_blood_request_donors_task(payload):
+    from .utils.notify_waves import dispatch, wave_interval
+    from .utils.urgency import task_priority
+
+    blood_request, next_payload = dispatch(payload)
+    if next_payload is None:
+        return
+    # The next wave only goes out if nobody has responded by then
+    enqueue(
+        'notify_blood_request_donors',
+        next_payload,
+        priority=task_priority(blood_request.priority),
+        delay=wave_interval(blood_request.priority),
+        dedupe_key=f"notify-request:{payload['blood_request_id']}",
+    )
+
+
+@task('warm_travel_times')
+def warm_travel_times_task(payload):
+    from .utils.travel_time import stale_pairs, warm
+
+    # Another task or the warm command may have fetched some of these meanwhile
+    pairs = stale_pairs([tuple(pair) for pair in payload['pairs']])
+    if pairs:
+        written = warm(pairs)
+        logger.info(f"Warmed {written} travel times for {len(pairs)} cell pairs")
+
+
+@task('flush_donor_location')
+def flush_donor_location_task(payload):
+    from .utils.donor_location import flush_location
+
+    flush_location(payload['user_id'])
+
+
+@task('maintain_partitions')
+def maintain_partitions_task(payload):
+    from .utils.partitions import ensure_partitions
+
+    ensure_partitions()
+    # Runs again tomorrow; months are created well ahead, so a missed day is harmless
+    enqueue('maintain_partitions', priority=PRIORITY_LOW, delay=timedelta(days=1),
+            dedupe_key='maintain-partitions')
+
+
+@task('lift_expired_deferrals')
+def lift_expired_deferrals_task(payload):
+    from .utils.eligibility import lift_expired_deferrals
+
+    lifted = lift_expired_deferrals()
+    if lifted:
+        logger.info(f"Lifted {lifted} expired donor deferrals")
+    # Runs again tomorrow; eligible_from has day resolution
+    enqueue('lift_expired_deferrals', priority=PRIORITY_LOW, delay=timedelta(days=1),
+            dedupe_key='lift-expired-deferrals')
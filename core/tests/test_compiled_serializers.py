@@ -0,0 +1,77 @@
+from django.test import TestCase
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import BloodRequest, Hospital, User
+from core.serializers import (
+    BloodRequestSerializer, CompiledBloodRequestSerializer, CompiledHospitalSerializer, CompiledSerializer,
+    CompiledUserSerializer, HospitalSerializer, UserSerializer,
+)
+
+
+class CompiledSerializerTests(TestCase):
+    """The compiled .values() serializers must render exactly what their DRF serializers render"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = User.objects.create_user(
+            username='compiled-patient', email='compiled-patient@example.com', password='x',
+            phone_number='9800000011', first_name='Sita', last_name='', blood_group='A-',
+        )
+        User.objects.create_user(
+            username='compiled-donor', email='compiled-donor@example.com', password='x',
+            phone_number='9800000012', first_name='Ram', last_name='Thapa', age=30, gender='M',
+            location_lat=27.7, location_long=85.3, profile_picture='profile_pictures/ram.png',
+            profile_picture_variants={'thumb': 'profile_pictures/variants/ram-thumb.webp'},
+        )
+        User.objects.create_user(
+            username='compiled-blank', email='compiled-blank@example.com', password='x',
+            phone_number='9800000013', profile_picture='',
+        )
+        Hospital.objects.create(name='Compiled Hospital', address='Patan', phone_number='015555555',
+                                location_lat=27.67, location_long=85.32)
+        BloodRequest.objects.create(patient=cls.patient, blood_group='A-', urgency='Critical',
+                                    location_lat=27.7, location_long=85.3)
+        BloodRequest.objects.create(patient=cls.patient, blood_group='A-', urgency='low', reason='Surgery',
+                                    units_required=3, location_lat=27.71, location_long=85.31)
+
+    def assertSameJSON(self, queryset, drf_class, compiled_class, context=None):
+        queryset = queryset.order_by('pk')
+        expected = [drf_class(instance, context=context or {}).data for instance in queryset]
+        compiled = compiled_class(context=context)
+        actual = [compiled.to_representation(row) for row in compiled.values(queryset)]
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_user(self):
+        request = Request(APIRequestFactory().get('/api/users/nearby_donors/?picture_size=thumb'))
+        for context in ({}, {'picture_size': 'thumb'}, {'request': request}, {'request': request, 'picture_size': 'full'}):
+            with self.subTest(context=context):
+                self.assertSameJSON(User.objects.all(), UserSerializer, CompiledUserSerializer, context)
+
+    def test_hospital(self):
+        self.assertSameJSON(Hospital.objects.all(), HospitalSerializer, CompiledHospitalSerializer)
+
+    def test_blood_request(self):
+        self.assertSameJSON(BloodRequest.objects.all(), BloodRequestSerializer, CompiledBloodRequestSerializer)
+
+    def test_method_fields_need_computed_entry(self):
+        class Incomplete(CompiledSerializer):
+            serializer_class = BloodRequestSerializer
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_write_only_fields_are_skipped(self):
+        class PasswordSerializer(serializers.ModelSerializer):
+            password = serializers.CharField(write_only=True)
+
+            class Meta:
+                model = User
+                fields = ['id', 'username', 'password']
+
+        class CompiledPasswordSerializer(CompiledSerializer):
+            serializer_class = PasswordSerializer
+
+        self.assertEqual(CompiledPasswordSerializer().columns, ['id', 'username'])
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import psycopg2.extensions as extensions
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db.backends.postgresql_pool.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, PoolTimeout, close_pools
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.autocommit = True
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+        self.healthy = True
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        if not self.healthy:
+            raise ConnectionError('server closed the connection')
+        return FakeCursor()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        pass
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def pool(self, **options):
+        return ConnectionPool(FakeConnection, **options)
+
+    def test_returned_connections_are_reused(self):
+        pool = self.pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(pool.stats()['connections_opened'], 1)
+
+    def test_open_transactions_are_rolled_back(self):
+        pool = self.pool()
+        conn = pool.getconn()
+        conn.status = extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_broken_connections_are_discarded(self):
+        pool = self.pool()
+        conn = pool.getconn()
+        conn.status = extensions.TRANSACTION_STATUS_UNKNOWN
+        pool.putconn(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_connections_are_health_checked(self):
+        pool = self.pool(check_after=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.healthy = False
+        with self.assertLogs('core.db.pool', 'WARNING'):
+            replacement = pool.getconn()
+        self.assertIsNot(replacement, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['health_check_failures'], 1)
+
+    def test_checkout_times_out_when_exhausted(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        pool = self.pool(max_size=1, timeout=5)
+        conn = pool.getconn()
+        threading.Timer(0.05, pool.putconn, [conn]).start()
+        self.assertIs(pool.getconn(), conn)
+        stats = pool.stats()
+        self.assertEqual((stats['waits'], stats['connections_opened']), (1, 1))
+
+    def test_idle_connections_expire(self):
+        pool = self.pool(max_idle=0.01)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        time.sleep(0.02)
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertTrue(conn.closed)
+
+    def test_stats_add_up_under_concurrency(self):
+        pool = self.pool(max_size=4, max_idle=0.001, timeout=5)
+
+        def work():
+            for _ in range(50):
+                pool.putconn(pool.getconn())
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 400)
+        self.assertEqual(stats['connections_opened'] - stats['connections_closed'], stats['size'])
+
+
+class PooledBackendTests(TestCase):
+    def test_close_returns_connection_to_pool(self):
+        settings_dict = dict(connection.settings_dict, POOL={'MAX_SIZE': 2})
+        wrapper = DatabaseWrapper(settings_dict, alias='pool-test')
+        self.addCleanup(close_pools, settings_dict['NAME'])
+
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+        wrapper.close()
+        self.assertEqual(wrapper.connection_pool.stats()['connections_opened'], 1)
@@ -0,0 +1,65 @@
+import time
+from unittest import mock
+
+from django.core.signing import TimestampSigner
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db.router import PIN_COOKIE, PRIMARY, ReplicaRouter, ReplicaRoutingMiddleware, router_stats, use_primary
+from core.models import User
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], READ_YOUR_WRITES_SECONDS=5)
+@mock.patch('core.db.router.replica_health.is_healthy', return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def run_request(self, request, write=False, primary=False):
+        """Pass `request` through the middleware; returns (alias used for reads, response)"""
+        seen = {}
+
+        def view(request):
+            if primary:
+                use_primary()
+            seen['read'] = ReplicaRouter().db_for_read(User)
+            if write:
+                ReplicaRouter().db_for_write(User)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen['read'], response
+
+    def test_safe_request_reads_from_replica(self, is_healthy):
+        self.assertEqual(self.run_request(self.factory.get('/api/news/'))[0], 'replica_1')
+        self.assertEqual(self.run_request(self.factory.post('/api/news/'))[0], PRIMARY)
+
+    def test_write_pins_client_to_primary(self, is_healthy):
+        _, response = self.run_request(self.factory.post('/api/blood-requests/'), write=True)
+        pin = response.cookies[PIN_COOKIE]
+        self.assertEqual(pin['max-age'], 5)
+
+        pinned_before = router_stats()['pinned_requests']
+        request = self.factory.get('/api/blood-requests/')
+        request.COOKIES[PIN_COOKIE] = pin.value
+        self.assertEqual(self.run_request(request)[0], PRIMARY)
+        self.assertEqual(router_stats()['pinned_requests'], pinned_before + 1)
+
+    def test_expired_or_forged_pin_is_ignored(self, is_healthy):
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 60):
+            expired = TimestampSigner(salt='core.db.router.pin').sign('1')
+        for value in (expired, 'forged:pin'):
+            with self.subTest(value=value):
+                request = self.factory.get('/api/blood-requests/')
+                request.COOKIES[PIN_COOKIE] = value
+                self.assertEqual(self.run_request(request)[0], 'replica_1')
+
+    def test_use_primary(self, is_healthy):
+        self.assertEqual(self.run_request(self.factory.get('/api/news/'), primary=True)[0], PRIMARY)
+
+    def test_unhealthy_replica_falls_back(self, is_healthy):
+        is_healthy.return_value = False
+        self.assertEqual(self.run_request(self.factory.get('/api/news/'))[0], PRIMARY)
+
+    def test_outside_requests_use_primary(self, is_healthy):
+        self.assertEqual(ReplicaRouter().db_for_read(User), PRIMARY)
@@ -0,0 +1,101 @@
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.benchmarks.scenarios import user_headers
+from core.consumers import LocationConsumer
+from core.models import BackgroundTask, BloodRequest, Donation, User
+from core.utils.donor_location import WRITTEN, flush_location, record_location
+from core.utils.geo import donor_cell
+
+
+@override_settings(DONOR_LOCATION={'min_interval': 30, 'min_distance_m': 25})
+class DonorLocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = User.objects.create_user(
+            username='ping-donor', email='ping-donor@example.com', password='x', phone_number='9800000001',
+            blood_group='O+', location_lat=27.70, location_long=85.30,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def ping(self, lat, lng):
+        return self.client.post('/api/users/location/', {'lat': lat, 'lng': lng}, **user_headers(self.donor))
+
+    def test_ping_writes_only_location_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.ping(27.75, 85.35)
+        self.assertEqual(response.data, {'status': 'written'})
+        update = next(query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE'))
+        columns = update.split(' SET ')[1].split(' WHERE ')[0]
+        self.assertEqual(sorted(part.split(' = ')[0] for part in columns.split(', ')),
+                         ['"geo_cell"', '"location_lat"', '"location_long"'])
+
+        self.donor.refresh_from_db()
+        self.assertEqual((self.donor.location_lat, self.donor.location_long), (27.75, 85.35))
+        self.assertEqual(self.donor.geo_cell, donor_cell(27.75, 85.35))
+
+    def test_pings_in_window_coalesce_into_one_flush(self):
+        self.assertEqual(self.ping(27.75, 85.35).status_code, 200)
+        for step in range(1, 4):
+            response = self.ping(27.75 + step / 100, 85.35)
+            self.assertEqual((response.status_code, response.data['status']), (202, 'coalesced'))
+        self.assertEqual(BackgroundTask.objects.filter(name='flush_donor_location').count(), 1)
+
+        self.donor.refresh_from_db()
+        self.assertEqual(self.donor.location_lat, 27.75)
+        self.assertTrue(flush_location(self.donor.id))
+        self.donor.refresh_from_db()
+        self.assertEqual((self.donor.location_lat, self.donor.location_long), (27.78, 85.35))
+
+    def test_small_moves_are_not_written(self):
+        self.assertEqual(self.ping(27.70001, 85.30001).data, {'status': 'unchanged'})
+
+    def test_stale_user_is_compared_with_stored_location(self):
+        stale = User.objects.get(pk=self.donor.pk)
+        # A trailing flush moved the donor after `stale` was loaded, as for a connected websocket
+        User.objects.filter(pk=self.donor.pk).update(location_lat=27.78)
+        self.assertEqual(record_location(stale, 27.70001, 85.30), WRITTEN)
+        self.donor.refresh_from_db()
+        self.assertEqual(self.donor.location_lat, 27.70001)
+
+    def test_non_donor_is_rejected(self):
+        User.objects.filter(pk=self.donor.pk).update(is_donor=False)
+        self.assertEqual(self.ping(27.75, 85.35).status_code, 403)
+        self.donor.refresh_from_db()
+        self.assertEqual(self.donor.location_lat, 27.70)
+
+    def test_invalid_coordinates(self):
+        self.assertEqual(self.ping(95, 85.30).status_code, 400)
+        self.assertEqual(self.ping('', 85.30).status_code, 400)
+
+    def test_accept_stores_longitude(self):
+        patient = User.objects.create_user(
+            username='ping-patient', email='ping-patient@example.com', password='x', phone_number='9800000002',
+        )
+        blood_request = BloodRequest.objects.create(
+            patient=patient, blood_group='O+', urgency='high', location_lat=27.71, location_long=85.31,
+        )
+        donation = Donation.objects.create(donor=self.donor, blood_request=blood_request)
+
+        self.client.post(f'/api/donations/{donation.id}/accept/', {'donor_lat': 27.72, 'donor_lng': 85.33},
+                         **user_headers(self.donor))
+        self.donor.refresh_from_db()
+        self.assertEqual((self.donor.location_lat, self.donor.location_long), (27.72, 85.33))
+
+
+class LocationConsumerTests(SimpleTestCase):
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(LocationConsumer.as_asgi(), '/ws/location/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        await communicator.disconnect()
+        return connected
+
+    async def test_only_donors_connect(self):
+        self.assertFalse(await self.connect(User(username='ws-patient', is_donor=False)))
+        self.assertTrue(await self.connect(User(username='ws-donor', is_donor=True)))
@@ -0,0 +1,115 @@
+from importlib import import_module
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.benchmarks.scenarios import user_headers
+from core.models import User
+from core.utils.donor_search import nearest_donor_ids, nearest_donor_values
+from core.utils.geo import donor_cell, donor_cells_in_ring, haversine_km, ring_coverage_km
+
+ORIGIN = (27.70, 85.30)
+
+
+class DonorGridTests(SimpleTestCase):
+    def test_ring_wraps_at_antimeridian(self):
+        cells = donor_cells_in_ring(0.05, 179.95, 0, 1)
+        self.assertEqual(len(cells), 9)
+        self.assertIn(donor_cell(0.05, -179.95), cells)
+
+    def test_outer_ring_excludes_inner(self):
+        ring = donor_cells_in_ring(*ORIGIN, 2, 2)
+        self.assertEqual(len(ring), 25 - 9)
+        self.assertNotIn(donor_cell(*ORIGIN), ring)
+
+    def test_coverage_shrinks_towards_poles(self):
+        self.assertGreater(ring_coverage_km(0, 3), ring_coverage_km(60, 3))
+        self.assertEqual(ring_coverage_km(27.7, 0), 0.0)
+
+
+class NearestDonorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        offsets = {
+            'near': 0.01,     # ~1 km
+            'mid': 0.05,      # ~5.5 km
+            'far': 0.6,       # ~67 km, several rings out
+            'remote': 2.0,    # ~220 km
+        }
+        cls.donors = {}
+        for n, (name, offset) in enumerate(offsets.items()):
+            cls.donors[name] = User.objects.create_user(
+                username=f'knn-{name}', email=f'knn-{name}@example.com', password='x',
+                phone_number=f'98000001{n:02d}', blood_group='A+',
+                location_lat=ORIGIN[0] + offset, location_long=ORIGIN[1],
+            )
+        User.objects.create_user(
+            username='knn-other-group', email='knn-other-group@example.com', password='x',
+            phone_number='9800000110', blood_group='B+', location_lat=ORIGIN[0], location_long=ORIGIN[1],
+        )
+        User.objects.create_user(
+            username='knn-deferred', email='knn-deferred@example.com', password='x', phone_number='9800000111',
+            blood_group='A+', location_lat=ORIGIN[0], location_long=ORIGIN[1], is_deferred=True,
+        )
+
+    def ids(self, *names):
+        return [self.donors[name].id for name in names]
+
+    def test_closest_first(self):
+        nearest = nearest_donor_ids(*ORIGIN, 2, 100, blood_group='A+')
+        self.assertEqual([donor_id for _, donor_id in nearest], self.ids('near', 'mid'))
+        self.assertAlmostEqual(nearest[0][0], 1.1, delta=0.1)
+
+    def test_sparse_area_expands_rings(self):
+        nearest = nearest_donor_ids(*ORIGIN, 3, 100, blood_group='A+')
+        self.assertEqual([donor_id for _, donor_id in nearest], self.ids('near', 'mid', 'far'))
+
+    def test_max_radius_and_exclusions(self):
+        nearest = nearest_donor_ids(*ORIGIN, 10, 100, blood_group='A+', exclude=self.ids('near'))
+        self.assertEqual([donor_id for _, donor_id in nearest], self.ids('mid', 'far'))
+
+    def test_matches_brute_force(self):
+        expected = sorted(
+            (haversine_km(*ORIGIN, donor.location_lat, donor.location_long), donor.id)
+            for donor in self.donors.values()
+        )
+        nearest = nearest_donor_ids(*ORIGIN, 4, 500, blood_group='A+')
+        self.assertEqual([donor_id for _, donor_id in nearest], [donor_id for _, donor_id in expected])
+
+    def test_values_rows(self):
+        rows = nearest_donor_values(*ORIGIN, 1, ['username'], 100, blood_group='A+')
+        self.assertEqual([(row['id'], row['username']) for row, _ in rows], [(self.donors['near'].id, 'knn-near')])
+
+    def nearby(self, max_distance):
+        return self.client.get(
+            f'/api/users/nearby_donors/?lat={ORIGIN[0]}&lng={ORIGIN[1]}&blood_group=A%2B&max_distance={max_distance}',
+            **user_headers(self.donors['near'])
+        )
+
+    def test_nearby_rejects_unbounded_radius(self):
+        for max_distance in ('inf', 'nan', '-5', '0', 'far'):
+            with self.subTest(max_distance=max_distance):
+                self.assertEqual(self.nearby(max_distance).status_code, 400)
+
+    @override_settings(DONOR_MATCH_RADIUS_KM=100)
+    def test_nearby_radius_is_capped(self):
+        response = self.nearby('1e9')
+        self.assertEqual([row['username'] for row in response.data], ['knn-mid', 'knn-far'])
+
+
+class GeoCellBackfillTests(TestCase):
+    def test_migration_sql_matches_donor_cell(self):
+        migration = import_module('core.migrations.0007_donor_geo_cell')
+        points = [(27.70, 85.30), (-33.87, 151.21), (90.0, 180.0), (-90.0, -180.0), (51.5, -0.12)]
+        for n, (lat, lng) in enumerate(points):
+            User.objects.create_user(
+                username=f'cell-{n}', email=f'cell-{n}@example.com', password='x',
+                phone_number=f'98000001{20 + n}', location_lat=lat, location_long=lng,
+            )
+        User.objects.update(geo_cell=None)
+
+        with connection.schema_editor() as schema_editor:
+            migration.backfill_geo_cells(None, schema_editor)
+        for user in User.objects.filter(username__startswith='cell-'):
+            with self.subTest(lat=user.location_lat, lng=user.location_long):
+                self.assertEqual(user.geo_cell, donor_cell(user.location_lat, user.location_long))
@@ -0,0 +1,92 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import BackgroundTask, BloodRequest, BloodTest, Donation, Hospital, User
+from core.tasks import lift_expired_deferrals_task
+from core.utils.eligibility import lift_expired_deferrals, matchable_donors, rebuild_donor_eligibility
+
+
+@override_settings(DONATION_INTERVAL_DAYS=56, HEMOGLOBIN_DEFERRAL_DAYS=90)
+class DonorEligibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = User.objects.create_user(
+            username='elig-patient', email='elig-patient@example.com', password='x', phone_number='9800000031',
+        )
+        cls.blood_request = BloodRequest.objects.create(
+            patient=cls.patient, blood_group='B+', urgency='high', location_lat=27.7, location_long=85.3,
+        )
+        cls.hospital = Hospital.objects.create(name='Eligibility Hospital', address='Kathmandu',
+                                               phone_number='014000031', location_lat=27.7, location_long=85.3)
+
+    def setUp(self):
+        self.donor = User.objects.create_user(
+            username='elig-donor', email='elig-donor@example.com', password='x', phone_number='9800000032',
+            blood_group='B+', gender='M', location_lat=27.7, location_long=85.3,
+        )
+
+    def complete_donation(self):
+        donation = Donation.objects.create(donor=self.donor, blood_request=self.blood_request, status='scheduled')
+        donation.status = 'completed'
+        donation.save()
+        return donation
+
+    def test_completed_donation_starts_interval(self):
+        self.assertTrue(matchable_donors().filter(pk=self.donor.pk).exists())
+        donation = self.complete_donation()
+
+        self.donor.refresh_from_db()
+        donated_on = timezone.localdate(donation.donation_date)
+        self.assertEqual(self.donor.last_donation_date, donated_on)
+        self.assertEqual(self.donor.eligible_from, donated_on + timedelta(days=56))
+        self.assertFalse(matchable_donors().filter(pk=self.donor.pk).exists())
+        self.assertTrue(matchable_donors(on=donated_on + timedelta(days=56)).filter(pk=self.donor.pk).exists())
+
+    def test_low_hemoglobin_defers_until_normal_result(self):
+        donation = self.complete_donation()
+        test = BloodTest.objects.create(donation=donation, tested_by=self.hospital, hemoglobin=11.8)
+        self.donor.refresh_from_db()
+        self.assertTrue(self.donor.is_deferred)
+        self.assertEqual(self.donor.eligible_from, timezone.localdate(test.created_at) + timedelta(days=90))
+
+        test.hemoglobin = 14.2
+        test.save()
+        self.donor.refresh_from_db()
+        self.assertFalse(self.donor.is_deferred)
+        self.assertEqual(self.donor.eligible_from, self.donor.last_donation_date + timedelta(days=56))
+
+    def test_rebuild_matches_incremental_state(self):
+        donation = self.complete_donation()
+        BloodTest.objects.create(donation=donation, tested_by=self.hospital, hemoglobin=11.8)
+        self.donor.refresh_from_db()
+        expected = (self.donor.last_donation_date, self.donor.eligible_from, self.donor.is_deferred)
+
+        User.objects.filter(pk=self.donor.pk).update(last_donation_date=None, eligible_from=None, is_deferred=False)
+        self.assertEqual(rebuild_donor_eligibility(), 1)
+        self.donor.refresh_from_db()
+        self.assertEqual((self.donor.last_donation_date, self.donor.eligible_from, self.donor.is_deferred), expected)
+        self.assertEqual(rebuild_donor_eligibility(), 0)
+
+    def test_expired_deferrals_are_lifted(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        User.objects.filter(pk=self.donor.pk).update(is_deferred=True, eligible_from=yesterday)
+
+        call_command('refresh_donor_eligibility', stdout=StringIO())
+        self.donor.refresh_from_db()
+        self.assertFalse(self.donor.is_deferred)
+        self.assertEqual(lift_expired_deferrals(), 0)
+
+    def test_daily_task_makes_lapsed_deferral_matchable(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        User.objects.filter(pk=self.donor.pk).update(is_deferred=True, eligible_from=yesterday)
+        self.assertFalse(matchable_donors().filter(pk=self.donor.pk).exists())
+
+        with self.assertLogs('core.tasks', 'INFO'):
+            lift_expired_deferrals_task({})
+        self.assertTrue(matchable_donors().filter(pk=self.donor.pk).exists())
+        next_run = BackgroundTask.objects.get(dedupe_key='lift-expired-deferrals')
+        self.assertGreater(next_run.run_at, timezone.now() + timedelta(hours=23))
@@ -0,0 +1,86 @@
+import csv
+import gzip
+import json
+from io import StringIO
+
+from django.test import TestCase
+
+from core.benchmarks.scenarios import hospital_headers, user_headers
+from core.models import BloodRequest, BloodTest, Donation, Hospital, HospitalUser, User
+from core.utils.exports import buffered
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username='export-staff', email='export-staff@example.com', password='x', phone_number='9800000061',
+            is_staff=True,
+        )
+        cls.donor = User.objects.create_user(
+            username='export-donor', email='export-donor@example.com', password='x', phone_number='9800000062',
+            blood_group='AB+',
+        )
+        blood_request = BloodRequest.objects.create(
+            patient=cls.staff, blood_group='AB+', urgency='high', location_lat=27.7, location_long=85.3,
+        )
+        cls.hospital, cls.other = Hospital.objects.bulk_create([
+            Hospital(name='Export Hospital', address='Kathmandu', phone_number='014000061',
+                     location_lat=27.7, location_long=85.3),
+            Hospital(name='Other Export', address='Lalitpur', phone_number='014000062',
+                     location_lat=27.67, location_long=85.32),
+        ])
+        cls.hospital_user = HospitalUser.objects.create(
+            hospital=cls.hospital, username='export-hospital', email='export-hospital@example.com'
+        )
+        cls.donations = Donation.objects.bulk_create([
+            Donation(donor=cls.donor, blood_request=blood_request, hospital=hospital, status='completed')
+            for hospital in (cls.hospital, cls.hospital, cls.other)
+        ])
+        BloodTest.objects.create(donation=cls.donations[0], tested_by=cls.hospital, hemoglobin=13.4)
+
+    def download(self, path, **headers):
+        response = self.client.get(path, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export_of_all_hospitals(self):
+        response, body = self.download('/api/exports/donations/', **user_headers(self.staff))
+        rows = list(csv.DictReader(StringIO(body.decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['donor'] for row in rows}, {'export-donor'})
+        self.assertEqual(sorted(row['hemoglobin'] for row in rows), ['', '', '13.4'])
+        self.assertRegex(response['Content-Disposition'], r'attachment; filename="donations-[\d-]+\.csv"')
+
+    def test_gzip_matches_identity(self):
+        _, plain = self.download('/api/exports/blood_tests/?fmt=jsonl', **user_headers(self.staff))
+        response, compressed = self.download('/api/exports/blood_tests/?fmt=jsonl', HTTP_ACCEPT_ENCODING='gzip',
+                                             **user_headers(self.staff))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed), plain)
+        self.assertEqual(json.loads(plain)['hemoglobin'], 13.4)
+
+    def test_hospital_export_is_scoped(self):
+        _, body = self.download('/api/hospital-dashboard/export/?dataset=donations&fmt=jsonl',
+                                **hospital_headers(self.hospital_user))
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual({row['hospital'] for row in rows}, {'Export Hospital'})
+        self.assertEqual(len(rows), 2)
+
+    def test_date_range_is_inclusive(self):
+        created = self.donations[0].created_at.date().isoformat()
+        _, body = self.download(f'/api/exports/donations/?from={created}&to={created}', **user_headers(self.staff))
+        self.assertEqual(len(body.decode().splitlines()), 4)
+        _, body = self.download('/api/exports/donations/?to=2000-01-01', **user_headers(self.staff))
+        self.assertEqual(len(body.decode().splitlines()), 1)
+
+    def test_rejected_requests(self):
+        self.assertEqual(self.client.get('/api/exports/donations/', **user_headers(self.donor)).status_code, 403)
+        for path in ('/api/exports/users/', '/api/exports/donations/?fmt=xml', '/api/exports/donations/?from=May'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path, **user_headers(self.staff)).status_code, 400)
+
+    def test_buffered_groups_small_lines(self):
+        pieces = list(buffered((b'x' * 10 for _ in range(25)), size=100))
+        self.assertEqual([len(piece) for piece in pieces], [100, 100, 50])
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.utils.http_gateway import (
+    CircuitBreaker, DeadlineExceeded, RequestDeadlineMiddleware, Upstream, UpstreamError, UpstreamUnavailable,
+    deadline, remaining_budget,
+)
+
+
+def failing(timeout):
+    raise ConnectionError('connection refused')
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        with self.assertLogs('core.utils.http_gateway', 'WARNING'):
+            breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.snapshot()['state'], CircuitBreaker.OPEN)
+        self.assertEqual(breaker.snapshot()['short_circuited'], 1)
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0)
+        with self.assertLogs('core.utils.http_gateway', 'WARNING'):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.snapshot()['state'], CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+
+class UpstreamTests(SimpleTestCase):
+    def test_retries_then_succeeds(self):
+        upstream = Upstream('test', retries=2, backoff=0)
+        calls = iter([ConnectionError('reset'), 'ok'])
+
+        def flaky(timeout):
+            result = next(calls)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with self.assertLogs('core.utils.http_gateway', 'WARNING'):
+            self.assertEqual(upstream.call(flaky), 'ok')
+        self.assertEqual(upstream.breaker.snapshot()['consecutive_failures'], 0)
+
+    def test_open_circuit_fails_fast(self):
+        upstream = Upstream('test', retries=0, failure_threshold=1, reset_timeout=60)
+        with self.assertLogs('core.utils.http_gateway', 'WARNING'):
+            with self.assertRaises(UpstreamError):
+                upstream.call(failing)
+        called = mock.Mock()
+        with self.assertRaises(UpstreamUnavailable):
+            upstream.call(called)
+        called.assert_not_called()
+
+    def test_timeout_is_trimmed_to_deadline(self):
+        upstream = Upstream('test', timeout=10)
+        self.assertEqual(upstream.call(lambda timeout: timeout), 10)
+        with deadline(2):
+            self.assertLessEqual(upstream.call(lambda timeout: timeout), 2)
+            with deadline(30):
+                # An inner block can never extend the outer budget
+                self.assertLessEqual(remaining_budget(), 2)
+
+    def test_no_attempt_without_budget(self):
+        upstream = Upstream('test')
+        called = mock.Mock()
+        with deadline(0.1):
+            with self.assertRaises(DeadlineExceeded):
+                upstream.call(called)
+        called.assert_not_called()
+        self.assertEqual(upstream.breaker.snapshot()['failures'], 0)
+
+    @override_settings(REQUEST_BUDGET_SECONDS=5)
+    def test_middleware_sets_request_budget(self):
+        middleware = RequestDeadlineMiddleware(lambda request: remaining_budget())
+        self.assertLessEqual(middleware(None), 5)
+        self.assertGreater(middleware(None), 4)
+        self.assertIsNone(remaining_budget())
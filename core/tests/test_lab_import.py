@@ -0,0 +1,94 @@
+from io import BytesIO
+
+from django.test import TestCase
+
+from core.models import BloodRequest, BloodTest, Donation, DonorHospitalAssignment, Hospital, User
+from core.utils.lab_import import LabImportError, LabResultImporter, normalize_analytes
+
+
+class NormalizeAnalytesTests(TestCase):
+    def test_numbers_and_blanks(self):
+        values = normalize_analytes({'hemoglobin': ' 13.5 ', 'platelet_count': '250,000', 'sugar_level': ''})
+        self.assertEqual(values, {'hemoglobin': 13.5, 'platelet_count': 250000.0})
+
+    def test_interactive_counts_are_not_scaled(self):
+        self.assertEqual(normalize_analytes({'wbc_count': 7200}), {'wbc_count': 7200.0})
+        with self.assertRaisesMessage(LabImportError, 'wbc_count: 7.2 is outside'):
+            normalize_analytes({'wbc_count': 7.2})
+
+    def test_lab_export_counts_in_thousands(self):
+        values = normalize_analytes({'wbc_count': '7.2', 'platelet_count': '250'}, thousands=True)
+        self.assertEqual(values, {'wbc_count': 7200.0, 'platelet_count': 250000.0})
+
+    def test_every_invalid_field_is_reported(self):
+        with self.assertRaises(LabImportError) as raised:
+            normalize_analytes({'hemoglobin': 'n/a', 'rbc_count': 40, 'uric_acid_level': 'nan'})
+        message = str(raised.exception)
+        for field in ('hemoglobin', 'rbc_count', 'uric_acid_level'):
+            self.assertIn(field, message)
+
+
+class LabResultImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        patient = User.objects.create_user(
+            username='lab-patient', email='lab-patient@example.com', password='x', phone_number='9800000051',
+        )
+        donor = User.objects.create_user(
+            username='lab-donor', email='lab-donor@example.com', password='x', phone_number='9800000052',
+            gender='F',
+        )
+        blood_request = BloodRequest.objects.create(
+            patient=patient, blood_group='O+', urgency='high', location_lat=27.7, location_long=85.3,
+        )
+        cls.hospital, other = Hospital.objects.bulk_create([
+            Hospital(name='Lab Hospital', address='Kathmandu', phone_number='014000051',
+                     location_lat=27.7, location_long=85.3),
+            Hospital(name='Other Lab', address='Lalitpur', phone_number='014000052',
+                     location_lat=27.67, location_long=85.32),
+        ])
+        cls.donation, cls.foreign = Donation.objects.bulk_create([
+            Donation(donor=donor, blood_request=blood_request, hospital=cls.hospital, status='completed'),
+            Donation(donor=donor, blood_request=blood_request, hospital=other, status='completed'),
+        ])
+        cls.assignment = DonorHospitalAssignment.objects.create(
+            donor=donor, hospital=cls.hospital, donation=cls.donation, status='completed',
+        )
+        DonorHospitalAssignment.objects.create(donor=donor, hospital=other, donation=cls.foreign, status='completed')
+
+    def run_import(self, body, fmt='csv', **options):
+        return LabResultImporter(self.hospital, chunk_size=2, **options).run(BytesIO(body.encode()), fmt)
+
+    def test_csv_import_with_aliases(self):
+        report = self.run_import(
+            'Assignment,Hgb,WBC,PLT\n'
+            f'{self.assignment.id},13.9,7.2,250\n'
+        )
+        self.assertEqual((report['created'], report['updated'], report['failed']), (1, 0, 0))
+        test = BloodTest.objects.get(donation=self.donation)
+        self.assertEqual((test.hemoglobin, test.wbc_count, test.platelet_count), (13.9, 7200.0, 250000.0))
+        self.assertEqual(test.tested_by, self.hospital)
+
+    def test_reimport_updates_only_given_analytes(self):
+        self.run_import(f'donation_id,hemoglobin,rbc\n{self.donation.id},13.9,4.8\n')
+        report = self.run_import(f'{{"donation_id": "{self.donation.id}", "hb": 14.4}}\n', fmt='jsonl')
+        self.assertEqual((report['created'], report['updated']), (0, 1))
+        test = BloodTest.objects.get(donation=self.donation)
+        self.assertEqual((test.hemoglobin, test.rbc_count), (14.4, 4.8))
+
+    def test_bad_rows_are_reported_by_line(self):
+        report = self.run_import(
+            'donation_id,hemoglobin\n'
+            f'{self.donation.id},abc\n'
+            'not-a-uuid,13\n'
+            f'{self.foreign.id},13\n'
+            ',13\n'
+        )
+        self.assertEqual(report['failed'], 4)
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3, 4, 5])
+        self.assertFalse(BloodTest.objects.exists())
+
+    def test_dry_run_writes_nothing(self):
+        report = self.run_import(f'donation_id,hemoglobin\n{self.donation.id},13.9\n', dry_run=True)
+        self.assertEqual(report['created'], 1)
+        self.assertFalse(BloodTest.objects.exists())
@@ -0,0 +1,56 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.models import Hospital
+
+
+@override_settings(MAP_TILE_SIZE=0.5)
+class HospitalMapLayerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Hospital.objects.create(name='Bir Hospital', address='Kathmandu', phone_number='014221119',
+                                location_lat=27.7050, location_long=85.3130)
+        Hospital.objects.create(name='Manipal', address='Pokhara', phone_number='061526416',
+                                location_lat=28.2096, location_long=83.9856)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_full_layer_is_compressed_geojson(self):
+        response = self.client.get('/api/map/hospitals/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'application/geo+json')
+        layer = json.loads(gzip.decompress(response.content))
+        self.assertEqual([feature['properties']['name'] for feature in layer['features']],
+                         ['Bir Hospital', 'Manipal'])
+        self.assertEqual(layer['features'][0]['geometry']['coordinates'], [85.3130, 27.7050])
+
+        again = self.client.get('/api/map/hospitals/', HTTP_ACCEPT_ENCODING='gzip',
+                                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_bbox_lists_only_visible_tiles(self):
+        response = self.client.get('/api/map/hospitals/?bbox=85.0,27.5,85.6,27.9')
+        self.assertEqual(len(response.data['tiles']), 1)
+        tile = response.data['tiles'][0]
+        self.assertEqual(tile['count'], 1)
+
+        body = self.client.get(tile['url']).content
+        self.assertEqual(json.loads(body)['features'][0]['properties']['name'], 'Bir Hospital')
+
+    def test_invalid_bbox_and_unknown_tile(self):
+        self.assertEqual(self.client.get('/api/map/hospitals/?bbox=1,2,3').status_code, 400)
+        self.assertEqual(self.client.get('/api/map/hospitals/tiles/999_999/').status_code, 404)
+
+    def test_hospital_change_rebuilds_layer(self):
+        etag = self.client.get('/api/map/hospitals/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Hospital.objects.create(name='Teaching Hospital', address='Maharajgunj', phone_number='014412303',
+                                    location_lat=27.7360, location_long=85.3300)
+
+        response = self.client.get('/api/map/hospitals/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)['features']), 3)
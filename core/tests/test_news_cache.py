@@ -0,0 +1,59 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+
+from core.models import News
+from core.utils.cache import check_shared_cache
+
+
+class NewsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.news = News.objects.create(title='Blood drive', summary='Summary', content='Content')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get('/api/news/')
+        self.assertEqual(response.status_code, 200)
+
+        again = self.client.get('/api/news/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], response['ETag'])
+
+    def test_saving_news_changes_etag(self):
+        etag = self.client.get(f'/api/news/{self.news.id}/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news.title = 'Blood drive moved'
+            self.news.save()
+
+        response = self.client.get(f'/api/news/{self.news.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Blood drive moved')
+
+    def test_deleting_news_moves_list_last_modified(self):
+        other = News.objects.create(title='Old news', summary='Summary', content='Content')
+        last_modified = self.client.get('/api/news/')['Last-Modified']
+
+        later = time.time_ns() + 60 * 10 ** 9
+        with mock.patch('core.utils.cache.time.time_ns', return_value=later):
+            with self.captureOnCommitCallbacks(execute=True):
+                other.delete()
+
+        response = self.client.get('/api/news/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response['Last-Modified'], http_date(later // 10 ** 9))
+
+    def test_per_process_cache_is_flagged(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                              'LOCATION': 'redis://localhost:6379'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([warning.id for warning in check_shared_cache()], ['core.W001'])
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(), [])
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import BackgroundTask, BloodRequest, Donation, Notification, User
+from core.tasks import PRIORITY_CRITICAL, notify_blood_request_donors_task
+from core.utils.notify_waves import dispatch, wave_interval, wave_size
+from core.utils.urgency import CRITICAL, LOW
+
+WAVES = {
+    'DONOR_NOTIFY_WAVE_SIZE': 1,
+    'DONOR_NOTIFY_WAVE_GROWTH': 2,
+    'DONOR_NOTIFY_MAX_WAVES': 3,
+    'DONOR_NOTIFY_COUNT': 200,
+    'DONOR_NOTIFY_RADIUS_KM': 100,
+    'DONOR_NOTIFY_WAVE_INTERVAL': {'critical': 120, 'high': 300, 'medium': 900, 'low': 1800},
+}
+
+
+@override_settings(**WAVES)
+class WaveScheduleTests(SimpleTestCase):
+    def test_waves_grow_with_units_and_silence(self):
+        self.assertEqual([wave_size(1, wave) for wave in range(3)], [1, 2, 4])
+        self.assertEqual(wave_size(3, 1), 6)
+
+    def test_urgent_requests_wait_less(self):
+        self.assertEqual(wave_interval(CRITICAL), timedelta(seconds=120))
+        self.assertEqual(wave_interval(LOW), timedelta(seconds=1800))
+        self.assertEqual(wave_interval(None), timedelta(seconds=900))
+
+
+@override_settings(**WAVES)
+class WaveDispatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = User.objects.create_user(
+            username='wave-patient', email='wave-patient@example.com', password='x', phone_number='9800000130',
+            blood_group='O-', location_lat=27.70, location_long=85.30,
+        )
+        cls.donors = [
+            User.objects.create_user(
+                username=f'wave-donor-{n}', email=f'wave-donor-{n}@example.com', password='x',
+                phone_number=f'98000001{31 + n}', blood_group='O-',
+                location_lat=27.70 + 0.01 * (n + 1), location_long=85.30,
+            )
+            for n in range(6)
+        ]
+
+    def setUp(self):
+        self.blood_request = BloodRequest.objects.create(
+            patient=self.patient, blood_group='O-', urgency='high', location_lat=27.70, location_long=85.30,
+        )
+
+    def notified(self):
+        return set(Notification.objects.filter(related_id=self.blood_request.id).values_list('user_id', flat=True))
+
+    def ids(self, donors):
+        return {donor.id for donor in donors}
+
+    def step(self, payload):
+        with self.assertLogs('core.utils.notify_waves', 'INFO'):
+            return dispatch(payload)
+
+    def test_waves_reach_further_out(self):
+        _, payload = self.step({'blood_request_id': str(self.blood_request.id)})
+        self.assertEqual(self.notified(), self.ids(self.donors[:1]))
+        self.blood_request.refresh_from_db()
+        self.assertIsNotNone(self.blood_request.first_notified_at)
+
+        _, payload = self.step(payload)
+        self.assertEqual(self.notified(), self.ids(self.donors[:3]))
+
+        # The third wave would be 4 donors but only 3 are left in range
+        _, payload = self.step(payload)
+        self.assertEqual(payload['wave'], 3)
+        self.assertEqual(self.notified(), self.ids(self.donors))
+
+        _, payload = self.step(payload)
+        self.assertIsNone(payload)
+
+    def test_covered_request_stops(self):
+        _, payload = self.step({'blood_request_id': str(self.blood_request.id)})
+        Donation.objects.create(donor=self.donors[0], blood_request=self.blood_request)
+
+        _, payload = self.step(payload)
+        self.assertIsNone(payload)
+        self.assertEqual(self.notified(), self.ids(self.donors[:1]))
+
+    def test_responses_delay_next_wave(self):
+        self.blood_request.units_required = 2
+        self.blood_request.save(update_fields=['units_required'])
+        _, payload = self.step({'blood_request_id': str(self.blood_request.id)})
+        Donation.objects.create(donor=self.donors[0], blood_request=self.blood_request)
+
+        _, next_payload = dispatch(payload)
+        self.assertEqual((next_payload['wave'], next_payload['pledged']), (1, 1))
+        self.assertEqual(len(self.notified()), 2)
+
+    def test_closed_request_stops(self):
+        self.blood_request.status = 'completed'
+        self.blood_request.save(update_fields=['status'])
+        self.assertEqual(dispatch({'blood_request_id': str(self.blood_request.id)}), (None, None))
+        self.assertEqual(self.notified(), set())
+
+    def test_task_schedules_next_wave(self):
+        self.blood_request.urgency = 'critical'
+        self.blood_request.save(update_fields=['urgency'])
+        with self.assertLogs('core.utils.notify_waves', 'INFO'):
+            notify_blood_request_donors_task({'blood_request_id': str(self.blood_request.id)})
+
+        task = BackgroundTask.objects.get(dedupe_key=f'notify-request:{self.blood_request.id}')
+        self.assertEqual((task.priority, task.payload['wave']), (PRIORITY_CRITICAL, 1))
+        self.assertAlmostEqual((task.run_at - task.created_at).total_seconds(), 120, delta=5)
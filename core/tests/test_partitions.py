@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.benchmarks.scenarios import user_headers
+from core.models import Notification, User
+from core.utils.partitions import (
+    add_months, convert_to_partitioned, detach_partitions, ensure_partitions, list_partitions, month_start,
+    partition_name,
+)
+
+TABLE = 'core_notification'
+
+
+def rows_in(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+        return cursor.fetchone()[0]
+
+
+class PartitionTests(TestCase):
+    # The conversion and every partition change roll back with the test transaction
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='partition-user', email='partition-user@example.com', password='x', phone_number='9800000140',
+        )
+
+    def notify(self, created_at):
+        notification = Notification.objects.create(user=self.user, notification_type='health_alert',
+                                                   title='Partitioned', message='Partitioned')
+        Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        # Run the deferred foreign key checks now; tables with pending ones cannot be altered
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        return notification
+
+    def partitions(self):
+        with connection.cursor() as cursor:
+            return [name for name, _ in list_partitions(cursor, TABLE)]
+
+    def test_convert_copies_rows(self):
+        self.notify(timezone.now())
+        with self.assertLogs('core.utils.partitions', 'INFO'):
+            self.assertEqual(convert_to_partitioned(TABLE, months_ahead=1), 1)
+        this_month = month_start(timezone.now())
+        self.assertIn(partition_name(TABLE, add_months(this_month, 1)), self.partitions())
+        self.assertEqual(rows_in(partition_name(TABLE, this_month)), 1)
+
+    def test_new_partition_takes_rows_from_default(self):
+        with self.assertLogs('core.utils.partitions', 'INFO'):
+            convert_to_partitioned(TABLE, months_ahead=0)
+        ahead = add_months(month_start(timezone.now()), 2)
+        early = self.notify(ahead + timedelta(days=3))
+        self.assertEqual(rows_in(TABLE + '_default'), 1)
+
+        with self.assertLogs('core.utils.partitions', 'INFO'):
+            created = ensure_partitions(months_ahead=2, tables=[TABLE])
+        self.assertEqual(created, [partition_name(TABLE, add_months(ahead, -1)), partition_name(TABLE, ahead)])
+        self.assertEqual(rows_in(TABLE + '_default'), 0)
+        self.assertEqual(rows_in(partition_name(TABLE, ahead)), 1)
+        # The default partition is attached again and the row is still reachable through the table
+        self.assertIn(TABLE + '_default', self.partitions())
+        self.assertTrue(Notification.objects.filter(pk=early.pk).exists())
+
+    def test_detach_old_months(self):
+        this_month = month_start(timezone.now())
+        self.notify(add_months(this_month, -2))
+        with self.assertLogs('core.utils.partitions', 'INFO'):
+            convert_to_partitioned(TABLE, months_ahead=0)
+            detached = detach_partitions(TABLE, add_months(this_month, -1))
+        self.assertEqual(detached, [partition_name(TABLE, add_months(this_month, -2))])
+        self.assertEqual(Notification.objects.count(), 0)
+
+    def test_unpartitioned_table_is_left_alone(self):
+        self.assertEqual(ensure_partitions(tables=[TABLE]), [])
+
+
+@override_settings(NOTIFICATION_LIST_DAYS=30)
+class NotificationWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='window-user', email='window-user@example.com', password='x', phone_number='9800000141',
+        )
+        cls.recent = Notification.objects.create(user=cls.user, notification_type='health_alert',
+                                                 title='Recent', message='Recent')
+        cls.old = Notification.objects.create(user=cls.user, notification_type='health_alert',
+                                              title='Old', message='Old')
+        Notification.objects.filter(pk=cls.old.pk).update(created_at=timezone.now() - timedelta(days=60))
+
+    def test_list_is_bounded(self):
+        response = self.client.get('/api/notifications/', **user_headers(self.user))
+        self.assertEqual([row['id'] for row in response.data['results']], [str(self.recent.id)])
+
+    def test_old_notification_is_reachable_by_id(self):
+        response = self.client.get(f'/api/notifications/{self.old.id}/', **user_headers(self.user))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(f'/api/notifications/{self.old.id}/mark_read/', **user_headers(self.user))
+        self.assertEqual(response.status_code, 200)
+        self.old.refresh_from_db()
+        self.assertTrue(self.old.is_read)
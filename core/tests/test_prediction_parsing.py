@@ -0,0 +1,49 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.utils.ai_prediction import MAX_ITEMS, HealthPredictor, PredictionFormatError
+
+DATA = {'donor_age': 34, 'donor_gender': 'F', 'hemoglobin': 10.5, 'sugar_level': 90, 'wbc_count': None}
+
+
+class PredictionParsingTests(SimpleTestCase):
+    def parse(self, document):
+        answer = document if isinstance(document, str) else json.dumps(document)
+        return HealthPredictor()._parse_prediction_response(answer, DATA)
+
+    def test_json_answer(self):
+        prediction = self.parse({
+            'summary': ' Low hemoglobin ',
+            'findings': ['Low hemoglobin', ''],
+            'conditions': 'Possible anemia',
+            'recommendations': [f'Step {n}' for n in range(MAX_ITEMS + 3)],
+        })
+        self.assertEqual(prediction['summary'], 'Low hemoglobin')
+        self.assertEqual(prediction['findings'], ['Low hemoglobin'])
+        self.assertEqual(prediction['conditions'], ['Possible anemia'])
+        self.assertEqual(len(prediction['recommendations']), MAX_ITEMS)
+        self.assertEqual(prediction['notification_message'], 'Low hemoglobin')
+        self.assertTrue(prediction['has_abnormalities'])
+        self.assertIn('POSSIBLE CONDITIONS:\n', prediction['full_prediction'])
+
+    def test_malformed_answers(self):
+        for answer in ('SUMMARY: fine', '[1, 2]', {'summary': ''}, {'summary': 'ok', 'findings': {'a': 1}}):
+            with self.subTest(answer=answer):
+                with self.assertRaises(PredictionFormatError):
+                    self.parse(answer)
+
+    def test_prompt_lists_only_measured_analytes(self):
+        prompt = HealthPredictor()._create_health_prediction_prompt(DATA)
+        self.assertEqual(prompt.splitlines()[0], 'Donor: 34y, female')
+        self.assertEqual(len(prompt.splitlines()), 3)
+        self.assertIn('(ref 12-15.5, low)', prompt)
+
+    @override_settings(OPENAI_API_KEY='sk-test')
+    @mock.patch('core.utils.ai_prediction.openai_chat', return_value='Sorry, I cannot help with that.')
+    def test_unparseable_answer_falls_back(self, openai_chat):
+        with self.assertLogs('core.utils.ai_prediction', 'ERROR'):
+            prediction = HealthPredictor().predict_health_risks(DATA)
+        self.assertEqual(openai_chat.call_args.kwargs['response_format'], {'type': 'json_object'})
+        self.assertEqual(prediction['summary'], 'Blood test shows 1 area(s) needing attention')
@@ -0,0 +1,126 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core.benchmarks.scenarios import hospital_headers
+from core.models import (
+    BloodRequest, BloodTest, Donation, DonorHospitalAssignment, Hospital, HospitalUser, Notification, User,
+)
+from core.utils.http_gateway import UpstreamError, remaining_budget
+
+ANSWER = json.dumps({
+    'summary': 'Hemoglobin is low',
+    'findings': ['Low hemoglobin (11.0 g/dL)'],
+    'conditions': ['Possible iron deficiency'],
+    'recommendations': ['Eat iron-rich food'],
+    'notification': 'Your hemoglobin is low.',
+})
+
+
+def chunks(text, size=16):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def events(response):
+    """(event, data) for every SSE frame in a streamed response"""
+    body = b''.join(response.streaming_content).decode()
+    frames = []
+    for frame in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in frame.splitlines())
+        frames.append((lines['event'], json.loads(lines['data'])))
+    return frames
+
+
+@override_settings(OPENAI_API_KEY='sk-test')
+class StreamPredictionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        patient = User.objects.create_user(
+            username='sse-patient', email='sse-patient@example.com', password='x', phone_number='9800000071',
+        )
+        cls.donor = User.objects.create_user(
+            username='sse-donor', email='sse-donor@example.com', password='x', phone_number='9800000072',
+            gender='M', age=40,
+        )
+        blood_request = BloodRequest.objects.create(
+            patient=patient, blood_group='O+', urgency='high', location_lat=27.7, location_long=85.3,
+        )
+        cls.hospital = Hospital.objects.create(name='SSE Hospital', address='Kathmandu', phone_number='014000071',
+                                               location_lat=27.7, location_long=85.3)
+        cls.hospital_user = HospitalUser.objects.create(
+            hospital=cls.hospital, username='sse-hospital', email='sse-hospital@example.com'
+        )
+        donation = Donation.objects.create(donor=cls.donor, blood_request=blood_request, hospital=cls.hospital,
+                                           status='completed')
+        cls.assignment = DonorHospitalAssignment.objects.create(
+            donor=cls.donor, hospital=cls.hospital, donation=donation, status='completed',
+        )
+        cls.blood_test = BloodTest.objects.create(donation=donation, tested_by=cls.hospital, hemoglobin=11.0)
+
+    def stream(self):
+        response = self.client.post(
+            f'/api/hospital-dashboard/assignments/{self.assignment.id}/stream_prediction/',
+            HTTP_ACCEPT='text/event-stream', **hospital_headers(self.hospital_user)
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return events(response)
+
+    @mock.patch('core.utils.ai_prediction.openai_chat_stream')
+    def test_tokens_then_saved_result(self, openai_chat_stream):
+        openai_chat_stream.return_value = iter(chunks(ANSWER))
+        frames = self.stream()
+
+        tokens = [data['text'] for event, data in frames if event == 'token']
+        self.assertEqual(''.join(tokens), ANSWER)
+        self.assertEqual(frames[-1][0], 'done')
+        self.assertEqual(frames[-1][1]['summary'], 'Hemoglobin is low')
+
+        self.blood_test.refresh_from_db()
+        self.assertEqual(self.blood_test.prediction_summary, 'Hemoglobin is low')
+        self.assertTrue(Notification.objects.filter(user=self.donor, related_id=self.blood_test.id).exists())
+
+    @mock.patch('core.utils.ai_prediction.openai_chat_stream')
+    def test_interrupted_stream_resets_to_fallback(self, openai_chat_stream):
+        def broken(**params):
+            yield ANSWER[:20]
+            raise UpstreamError('openai stream interrupted')
+        openai_chat_stream.side_effect = broken
+
+        with self.assertLogs('core.utils.ai_prediction', 'ERROR'):
+            frames = self.stream()
+        names = [event for event, _ in frames]
+        self.assertEqual(names, ['token', 'reset', 'token', 'done'])
+        fallback = json.loads(frames[2][1]['text'])
+        self.assertEqual(fallback['summary'], frames[-1][1]['summary'])
+
+    def test_other_hospitals_assignment_is_not_found(self):
+        other = Hospital.objects.create(name='Other SSE', address='Lalitpur', phone_number='014000072',
+                                        location_lat=27.67, location_long=85.32)
+        other_user = HospitalUser.objects.create(hospital=other, username='sse-other', email='sse-other@example.com')
+        response = self.client.post(
+            f'/api/hospital-dashboard/assignments/{self.assignment.id}/stream_prediction/',
+            **hospital_headers(other_user)
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch('core.utils.ai_prediction.openai_chat_stream')
+    def test_get_does_not_predict(self, openai_chat_stream):
+        response = self.client.get(
+            f'/api/hospital-dashboard/assignments/{self.assignment.id}/stream_prediction/',
+            **hospital_headers(self.hospital_user)
+        )
+        self.assertEqual(response.status_code, 405)
+        openai_chat_stream.assert_not_called()
+
+    @mock.patch('core.utils.ai_prediction.openai_chat_stream')
+    def test_stream_is_opened_under_request_deadline(self, openai_chat_stream):
+        budgets = []
+
+        def stream(**params):
+            budgets.append(remaining_budget())
+            yield ANSWER
+        openai_chat_stream.side_effect = stream
+
+        self.stream()
+        self.assertIsNotNone(budgets[0])
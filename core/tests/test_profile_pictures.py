@@ -0,0 +1,103 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core.models import BackgroundTask, User
+from core.tasks import PRIORITY_BULK, PRIORITY_CRITICAL, claim_tasks, enqueue
+from core.utils.images import (
+    DEFAULT_PROFILE_PICTURE, PROFILE_PICTURE_SIZES, process_profile_picture, validate_image_upload,
+)
+
+
+def png_bytes(size=(640, 480), color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class ProfilePictureTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root, PROFILE_PICTURE_MAX_UPLOAD_BYTES=1024 * 1024)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='picture-user', email='picture-user@example.com', password='x', phone_number='9800000021',
+        )
+
+    def upload(self, content):
+        path = default_storage.save('profile_pictures/uploads/picture.png', ContentFile(content))
+        User.objects.filter(pk=self.user.pk).update(profile_picture=path)
+        return path
+
+    def test_variants_are_square_and_hashed(self):
+        upload = self.upload(png_bytes())
+        variants = process_profile_picture(self.user.pk, upload)
+
+        self.assertEqual(set(variants), set(PROFILE_PICTURE_SIZES))
+        for name, size in PROFILE_PICTURE_SIZES.items():
+            with default_storage.open(variants[name]) as fh:
+                self.assertEqual(Image.open(fh).size, (size, size))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_variants, variants)
+        self.assertRegex(self.user.profile_picture.name, r'^profile_pictures/[0-9a-f]{16}\.jpg$')
+        self.assertFalse(default_storage.exists(upload))
+
+    def test_undecodable_upload_falls_back_to_default(self):
+        upload = self.upload(b'\x89PNG\r\n\x1a\n' + b'not really a png')
+        with self.assertLogs('core.utils.images', 'WARNING'):
+            self.assertIsNone(process_profile_picture(self.user.pk, upload))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture.name, DEFAULT_PROFILE_PICTURE)
+        self.assertEqual(self.user.profile_picture_variants, {})
+        self.assertFalse(default_storage.exists(upload))
+
+    def test_newer_upload_is_left_alone(self):
+        upload = self.upload(png_bytes())
+        User.objects.filter(pk=self.user.pk).update(profile_picture='profile_pictures/newer.png')
+
+        self.assertIsNone(process_profile_picture(self.user.pk, upload))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture.name, 'profile_pictures/newer.png')
+
+    def test_upload_validation(self):
+        validate_image_upload(SimpleUploadedFile('ok.png', png_bytes()))
+        with self.assertRaises(ValidationError):
+            validate_image_upload(SimpleUploadedFile('fake.png', b'<svg></svg>'))
+        with self.assertRaises(ValidationError):
+            validate_image_upload(SimpleUploadedFile('big.png', png_bytes()[:8] + b'\0' * (2 * 1024 * 1024)))
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class BackgroundTaskTests(TestCase):
+    def test_dedupe_key_absorbs_pending_task(self):
+        first = enqueue('build_map_layer', dedupe_key='build_map_layer')
+        second = enqueue('build_map_layer', dedupe_key='build_map_layer')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(BackgroundTask.objects.count(), 1)
+
+    def test_claims_most_urgent_first(self):
+        enqueue('build_map_layer', priority=PRIORITY_BULK)
+        urgent = enqueue('build_map_layer', priority=PRIORITY_CRITICAL)
+
+        claimed = claim_tasks(limit=1)
+        self.assertEqual([task.pk for task in claimed], [urgent.pk])
+        urgent.refresh_from_db()
+        self.assertEqual((urgent.status, urgent.attempts), ('running', 1))
@@ -0,0 +1,259 @@
+from itertools import count
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.benchmarks.scenarios import hospital_headers, user_headers
+from core.models import (
+    BloodRequest, BloodTest, ChatRoom, Donation, DonorHospitalAssignment, Hospital, HospitalUser,
+    Message, News, Notification, User,
+)
+from core.utils.geo import donor_cell
+
+# Rows behind each measured request; the query count must be the same at every size
+ROW_COUNTS = (1, 10, 100)
+
+LAT, LNG = 27.7172, 85.3240
+
+_serial = count(1)
+
+
+def make_user(**fields):
+    n = next(_serial)
+    fields.setdefault('location_lat', LAT)
+    fields.setdefault('location_long', LNG)
+    fields.setdefault('blood_group', 'O+')
+    return User(
+        username=f'qc-user-{n}', email=f'qc-user-{n}@example.com', phone_number=f'98{n:08d}',
+        first_name='Query', last_name=f'Count {n}', age=30, gender='M',
+        geo_cell=donor_cell(fields['location_lat'], fields['location_long']), **fields
+    )
+
+
+def make_hospital():
+    n = next(_serial)
+    return Hospital(
+        name=f'Query Count Hospital {n}', address='Kathmandu', phone_number=f'01{n:07d}',
+        location_lat=LAT, location_long=LNG,
+    )
+
+
+def make_blood_request(patient, **fields):
+    return BloodRequest(
+        patient=patient, blood_group='O+', units_required=1, urgency='high',
+        location_lat=LAT, location_long=LNG, **fields
+    )
+
+
+def top_up(queryset, rows, build):
+    """Add rows built by build(count) until `queryset` holds `rows` of them"""
+    missing = rows - queryset.count()
+    if missing > 0:
+        build(missing)
+
+
+class QueryCountTests(TestCase):
+    """
+    Pin the number of SQL queries behind every list and detail endpoint.
+
+    Each endpoint is requested with 1, 10 and 100 rows behind it and must run
+    exactly the same number of queries every time, so a serializer field or view
+    loop that queries once per row fails here instead of in production.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient, cls.donor, cls.staff = User.objects.bulk_create([
+            make_user(), make_user(), make_user(is_staff=True),
+        ])
+        cls.hospital = Hospital.objects.bulk_create([make_hospital()])[0]
+        cls.hospital_user = HospitalUser.objects.create(
+            hospital=cls.hospital, username='qc-hospital', email='qc-hospital@example.com'
+        )
+        cls.blood_request = BloodRequest.objects.bulk_create([make_blood_request(cls.patient)])[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def assertQueries(self, expected, path, grow, headers):
+        """
+        GET `path` after grow(rows) for each of ROW_COUNTS; every request must run
+        exactly `expected` queries. `path` may be a callable for detail URLs.
+        """
+        counts = {}
+        for rows in ROW_COUNTS:
+            grow(rows)
+            # Measure the uncached path of cached endpoints
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(path() if callable(path) else path, **headers)
+            self.assertEqual(response.status_code, 200, response.content[:500])
+            counts[rows] = len(queries)
+            if counts[rows] != expected:
+                captured = '\n'.join(query['sql'] for query in queries.captured_queries)
+                self.fail(f"{counts} queries by row count, expected {expected}:\n{captured}")
+
+    # Fixtures
+
+    def grow_donations(self, rows):
+        """Donations by self.donor, each with a blood test, chat room and hospital assignment"""
+        def build(missing):
+            donations = Donation.objects.bulk_create([
+                Donation(donor=self.donor, blood_request=self.blood_request, hospital=self.hospital,
+                         status='scheduled')
+                for _ in range(missing)
+            ])
+            BloodTest.objects.bulk_create([
+                BloodTest(donation=donation, tested_by=self.hospital, hemoglobin=14.0) for donation in donations
+            ])
+            ChatRoom.objects.bulk_create([
+                ChatRoom(donor=self.donor, patient=self.patient, donation=donation) for donation in donations
+            ])
+            DonorHospitalAssignment.objects.bulk_create([
+                DonorHospitalAssignment(donor=self.donor, hospital=self.hospital, donation=donation,
+                                        status='scheduled')
+                for donation in donations
+            ])
+        top_up(Donation.objects.filter(donor=self.donor), rows, build)
+
+    def grow_users(self, rows):
+        top_up(User.objects.filter(username__startswith='qc-user-', is_staff=False), rows + 2,
+               lambda missing: User.objects.bulk_create([make_user() for _ in range(missing)]))
+
+    def grow_hospitals(self, rows):
+        top_up(Hospital.objects.all(), rows,
+               lambda missing: Hospital.objects.bulk_create([make_hospital() for _ in range(missing)]))
+
+    def grow_blood_requests(self, rows):
+        top_up(BloodRequest.objects.filter(patient=self.patient), rows,
+               lambda missing: BloodRequest.objects.bulk_create(
+                   [make_blood_request(self.patient) for _ in range(missing)]
+               ))
+
+    def grow_messages(self, rows):
+        self.grow_donations(1)
+        room = ChatRoom.objects.first()
+        top_up(Message.objects.filter(chat_room=room), rows,
+               lambda missing: Message.objects.bulk_create([
+                   Message(chat_room=room, sender=(self.donor, self.patient)[n % 2], content=f'Message {n}')
+                   for n in range(missing)
+               ]))
+
+    def grow_notifications(self, rows):
+        top_up(Notification.objects.filter(user=self.donor), rows,
+               lambda missing: Notification.objects.bulk_create([
+                   Notification(user=self.donor, notification_type='blood_request', title='Blood Request Nearby',
+                                message='A patient nearby needs O+ blood.')
+                   for _ in range(missing)
+               ]))
+
+    def grow_news(self, rows):
+        top_up(News.objects.all(), rows,
+               lambda missing: News.objects.bulk_create([
+                   News(title=f'News {n}', summary='Summary', content='Content') for n in range(missing)
+               ]))
+
+    # Users
+
+    def test_user_list(self):
+        self.assertQueries(3, '/api/users/', self.grow_users, user_headers(self.staff))
+
+    def test_user_detail(self):
+        self.assertQueries(2, f'/api/users/{self.donor.id}/', self.grow_users, user_headers(self.staff))
+
+    def test_user_profile(self):
+        self.assertQueries(1, '/api/users/profile/', self.grow_users, user_headers(self.donor))
+
+    def test_nearby_donors(self):
+        path = f'/api/users/nearby_donors/?lat={LAT}&lng={LNG}&blood_group=O%2B&limit=500'
+        self.assertQueries(6, path, self.grow_users, user_headers(self.patient))
+
+    # Hospitals
+
+    def test_hospital_list(self):
+        self.assertQueries(3, '/api/hospitals/', self.grow_hospitals, user_headers(self.donor))
+
+    def test_hospital_detail(self):
+        self.assertQueries(2, f'/api/hospitals/{self.hospital.id}/', self.grow_hospitals, user_headers(self.donor))
+
+    def test_nearby_hospitals(self):
+        path = f'/api/hospitals/nearby_hospitals/?lat={LAT}&lng={LNG}'
+        self.assertQueries(2, path, self.grow_hospitals, user_headers(self.donor))
+
+    # Blood requests
+
+    def test_blood_request_list(self):
+        self.assertQueries(3, '/api/blood-requests/', self.grow_blood_requests, user_headers(self.patient))
+
+    def test_blood_request_detail(self):
+        path = f'/api/blood-requests/{self.blood_request.id}/'
+        self.assertQueries(2, path, self.grow_blood_requests, user_headers(self.patient))
+
+    def test_find_best_donors(self):
+        path = f'/api/blood-requests/{self.blood_request.id}/find_best_donors/?limit=500'
+        self.assertQueries(9, path, self.grow_users, user_headers(self.patient))
+
+    def test_available_blood_requests(self):
+        self.assertQueries(2, '/api/available-blood-requests/', self.grow_blood_requests, user_headers(self.donor))
+
+    # Donations and blood tests
+
+    def test_donation_list(self):
+        self.assertQueries(3, '/api/donations/', self.grow_donations, user_headers(self.donor))
+
+    def test_donation_detail(self):
+        path = lambda: f'/api/donations/{Donation.objects.first().id}/'
+        self.assertQueries(3, path, self.grow_donations, user_headers(self.donor))
+
+    def test_blood_test_list(self):
+        self.assertQueries(3, '/api/blood-tests/', self.grow_donations, user_headers(self.donor))
+
+    def test_blood_test_detail(self):
+        path = lambda: f'/api/blood-tests/{BloodTest.objects.first().id}/'
+        self.assertQueries(3, path, self.grow_donations, user_headers(self.donor))
+
+    # Chat
+
+    def test_chat_room_list(self):
+        self.assertQueries(3, '/api/chat-rooms/', self.grow_donations, user_headers(self.patient))
+
+    def test_chat_room_detail(self):
+        path = lambda: f'/api/chat-rooms/{ChatRoom.objects.first().id}/'
+        self.assertQueries(3, path, self.grow_donations, user_headers(self.patient))
+
+    def test_chat_room_messages(self):
+        path = lambda: f'/api/chat-rooms/{ChatRoom.objects.first().id}/messages/'
+        self.assertQueries(4, path, self.grow_messages, user_headers(self.patient))
+
+    # Notifications
+
+    def test_notification_list(self):
+        self.assertQueries(3, '/api/notifications/', self.grow_notifications, user_headers(self.donor))
+
+    def test_notification_detail(self):
+        path = lambda: f'/api/notifications/{Notification.objects.first().id}/'
+        self.assertQueries(3, path, self.grow_notifications, user_headers(self.donor))
+
+    # Hospital dashboard and assignments
+
+    def test_hospital_dashboard_list(self):
+        self.assertQueries(3, '/api/hospital-dashboard/donors/', self.grow_donations,
+                           hospital_headers(self.hospital_user))
+
+    def test_assignment_list(self):
+        self.assertQueries(3, '/api/donor-hospital-assignments/', self.grow_donations, user_headers(self.donor))
+
+    def test_assignment_detail(self):
+        path = lambda: f'/api/donor-hospital-assignments/{DonorHospitalAssignment.objects.first().id}/'
+        self.assertQueries(3, path, self.grow_donations, user_headers(self.donor))
+
+    # News
+
+    def test_news_list(self):
+        self.assertQueries(2, '/api/news/', self.grow_news, {})
+
+    def test_news_detail(self):
+        path = lambda: f'/api/news/{News.objects.first().id}/'
+        self.assertQueries(2, path, self.grow_news, {})
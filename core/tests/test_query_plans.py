@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import BloodRequest, ChatRoom, Donation, DonorHospitalAssignment, Hospital, Message, Notification, User
+from core.utils.eligibility import matchable_donors
+from core.utils.geo import donor_cells_in_ring
+from core.utils.synthetic_data import SyntheticDataGenerator
+
+
+class QueryPlanTests(TestCase):
+    """
+    The hot query shapes from views.py must be answerable from an index.
+
+    Plans are taken with enable_seqscan off, so the planner only falls back to a
+    sequential scan when no index can serve the query at all. A Seq Scan in the
+    plan therefore means a missing or unusable index, whatever the dataset size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(seed=7, prefix='plan').generate(users=2000, hospitals=20)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.donor = User.objects.filter(is_donor=True, donations__isnull=False).first()
+        cls.hospital = Hospital.objects.filter(donor_assignments__isnull=False).first()
+        cls.chat_room = ChatRoom.objects.first()
+        cls.blood_request = BloodRequest.objects.first()
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+        self.addCleanup(self._reset_seqscan)
+
+    def _reset_seqscan(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def assertIndexed(self, queryset, table):
+        plan = queryset.explain()
+        self.assertNotIn(f'Seq Scan on {table}', plan, f"{table} is scanned sequentially:\n{plan}")
+
+    def test_available_blood_requests(self):
+        queryset = BloodRequest.objects.filter(blood_group=self.donor.blood_group, status='pending')
+        self.assertIndexed(queryset, 'core_bloodrequest')
+
+    def test_dashboard_request_counts(self):
+        self.assertIndexed(BloodRequest.objects.filter(status='pending'), 'core_bloodrequest')
+        week_ago = date.today() - timedelta(days=7)
+        self.assertIndexed(BloodRequest.objects.filter(created_at__gte=week_ago), 'core_bloodrequest')
+
+    def test_dashboard_donor_counts(self):
+        self.assertIndexed(User.objects.filter(is_donor=True, is_active=True), 'core_user')
+        self.assertIndexed(User.objects.filter(blood_group='O+', is_donor=True), 'core_user')
+
+    def test_nearest_donor_ring_scan(self):
+        cells = donor_cells_in_ring(self.donor.location_lat, self.donor.location_long, 0, 2)
+        queryset = matchable_donors().filter(blood_group=self.donor.blood_group, geo_cell__in=cells)
+        self.assertIndexed(queryset, 'core_user')
+
+    def test_donor_donations(self):
+        self.assertIndexed(Donation.objects.filter(donor=self.donor), 'core_donation')
+        self.assertIndexed(Donation.objects.filter(donor=self.donor, status='completed'), 'core_donation')
+
+    def test_request_donations(self):
+        queryset = Donation.objects.filter(blood_request=self.blood_request, status='completed')
+        self.assertIndexed(queryset, 'core_donation')
+        queryset = Donation.objects.filter(blood_request=self.blood_request).exclude(status='cancelled')
+        self.assertIndexed(queryset, 'core_donation')
+
+    def test_dashboard_donation_counts(self):
+        self.assertIndexed(Donation.objects.filter(status='completed'), 'core_donation')
+        week_ago = date.today() - timedelta(days=7)
+        self.assertIndexed(Donation.objects.filter(created_at__gte=week_ago), 'core_donation')
+
+    def test_notification_list(self):
+        since = timezone.now() - timedelta(days=180)
+        queryset = Notification.objects.filter(user=self.donor, created_at__gte=since).order_by('-created_at')
+        self.assertIndexed(queryset, 'core_notification')
+        self.assertIndexed(Notification.objects.filter(user=self.donor, is_read=False), 'core_notification')
+
+    def test_chat_room_messages(self):
+        queryset = Message.objects.filter(
+            chat_room=self.chat_room, timestamp__gte=self.chat_room.created_at
+        ).order_by('timestamp')
+        self.assertIndexed(queryset, 'core_message')
+
+    def test_hospital_assignments(self):
+        self.assertIndexed(DonorHospitalAssignment.objects.filter(hospital=self.hospital), 'core_donorhospitalassignment')
+        queryset = DonorHospitalAssignment.objects.filter(hospital=self.hospital, status='scheduled')
+        self.assertIndexed(queryset, 'core_donorhospitalassignment')
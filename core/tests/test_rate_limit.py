@@ -0,0 +1,73 @@
+from itertools import count
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.utils.rate_limit import (
+    BULK, INTERACTIVE, RateLimiter, Throttled, _bucket_connection, bucket_cursor, close_bucket_connection,
+)
+
+LIMIT = {
+    'requests_per_minute': 60,
+    'burst': 3,
+    'bulk_requests_per_minute': 60,
+    'bulk_burst': 5,
+    'interactive_reserve': 2,
+    'max_wait': {'interactive': 0, 'bulk': 0},
+}
+
+_serial = count(1)
+
+
+@override_settings(TEST_RATE_LIMIT=LIMIT)
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter(f'test-{next(_serial)}', 'TEST_RATE_LIMIT')
+        # Buckets are written on their own connection and outlive the test transaction
+        self.addCleanup(close_bucket_connection)
+        self.addCleanup(self.delete_buckets)
+
+    def delete_buckets(self):
+        with bucket_cursor() as cursor:
+            cursor.execute('DELETE FROM core_ratelimitbucket WHERE name LIKE %s', [f'{self.limiter.name}%'])
+
+    def test_burst_then_throttled(self):
+        for _ in range(3):
+            self.limiter.acquire(INTERACTIVE)
+        with self.assertRaises(Throttled):
+            self.limiter.acquire(INTERACTIVE)
+        stats = self.limiter.stats()
+        self.assertEqual((stats['granted'][INTERACTIVE], stats['throttled'][INTERACTIVE]), (3, 1))
+
+    def test_bulk_leaves_interactive_reserve(self):
+        self.limiter.acquire(BULK)
+        with self.assertRaises(Throttled):
+            self.limiter.acquire(BULK)
+        # The bulk bucket still has tokens, but the shared bucket is down to the reserve
+        self.limiter.acquire(INTERACTIVE)
+
+    def test_penalty_empties_shared_bucket(self):
+        self.limiter.penalize(30)
+        with self.assertRaises(Throttled):
+            self.limiter.acquire(INTERACTIVE)
+
+    def test_bucket_lock_is_not_held_by_callers_transaction(self):
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.addCleanup(other.close)
+        with transaction.atomic():
+            self.limiter.acquire(INTERACTIVE)
+            # Another worker can lock the row while this transaction is still open
+            with other.cursor() as cursor:
+                cursor.execute('SELECT tokens FROM core_ratelimitbucket WHERE name = %s FOR UPDATE NOWAIT',
+                               [self.limiter.name])
+                self.assertEqual(len(cursor.fetchall()), 1)
+
+    def test_metrics_use_level_snapshot(self):
+        self.limiter.acquire(INTERACTIVE)
+        first = self.limiter.stats()
+        self.assertAlmostEqual(first['tokens'][INTERACTIVE], 2, delta=0.1)
+        with CaptureQueriesContext(_bucket_connection()) as queries:
+            second = self.limiter.stats()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second['tokens'], first['tokens'])
@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import BloodRequest, Donation, DonorHospitalAssignment, Hospital, User
+from core.utils.reconciliation import MISSING, ORPHANED, STALE, UNASSIGNED, AssignmentReconciler
+
+
+class AssignmentReconcilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = User.objects.create_user(
+            username='recon-patient', email='recon-patient@example.com', password='x', phone_number='9800000041',
+        )
+        cls.donor = User.objects.create_user(
+            username='recon-donor', email='recon-donor@example.com', password='x', phone_number='9800000042',
+            blood_group='A+', location_lat=27.7, location_long=85.3,
+        )
+        cls.blood_request = BloodRequest.objects.create(
+            patient=cls.patient, blood_group='A+', urgency='high', location_lat=27.7, location_long=85.3,
+        )
+        cls.hospital, cls.other = Hospital.objects.bulk_create([
+            Hospital(name='Recon Hospital', address='Kathmandu', phone_number='014000041',
+                     location_lat=27.7, location_long=85.3),
+            Hospital(name='Other Hospital', address='Lalitpur', phone_number='014000042',
+                     location_lat=27.67, location_long=85.32),
+        ])
+
+    def donation(self, **fields):
+        fields.setdefault('status', 'scheduled')
+        return Donation.objects.create(donor=self.donor, blood_request=self.blood_request, **fields)
+
+    def test_counts_each_kind_of_drift(self):
+        self.donation(hospital=self.hospital)
+        stale = self.donation(hospital=self.hospital)
+        DonorHospitalAssignment.objects.create(donor=self.donor, hospital=self.hospital, donation=stale,
+                                               status='pending')
+        moved = self.donation(hospital=self.hospital)
+        DonorHospitalAssignment.objects.create(donor=self.donor, hospital=self.other, donation=moved,
+                                               status='scheduled')
+        self.donation()
+
+        counts = AssignmentReconciler().counts()
+        self.assertEqual(counts, {MISSING: 2, STALE: 1, ORPHANED: 1, UNASSIGNED: 1})
+
+    def test_reconcile_repairs_drift(self):
+        self.donation(hospital=self.hospital)
+        moved = self.donation(hospital=self.hospital)
+        DonorHospitalAssignment.objects.create(donor=self.donor, hospital=self.other, donation=moved,
+                                               status='scheduled')
+
+        self.assertEqual(AssignmentReconciler(chunk_size=1).reconcile(), {MISSING: 2, STALE: 0, ORPHANED: 1})
+        self.assertEqual(AssignmentReconciler().counts(), {MISSING: 0, STALE: 0, ORPHANED: 0, UNASSIGNED: 0})
+        self.assertEqual(DonorHospitalAssignment.objects.get(hospital=self.other).status, 'cancelled')
+
+    def test_dry_run_writes_nothing(self):
+        self.donation(hospital=self.hospital)
+        output = StringIO()
+        call_command('fix_hospital_assignments', '--dry-run', stdout=output)
+        self.assertIn('Would fix 1 missing assignments', output.getvalue())
+        self.assertFalse(DonorHospitalAssignment.objects.exists())
+
+    def test_assign_to_hospital(self):
+        unassigned = self.donation()
+        call_command('fix_hospital_assignments', '--assign-to', 'Other Hospital', stdout=StringIO())
+        unassigned.refresh_from_db()
+        self.assertEqual(unassigned.hospital, self.other)
+        self.assertTrue(DonorHospitalAssignment.objects.filter(donation=unassigned, hospital=self.other).exists())
@@ -0,0 +1,134 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import BloodRequest, BloodTest, Donation, Hospital, User
+from core.utils.ai_prediction import HealthPredictor, prediction_input, prediction_key, save_prediction
+from core.utils.http_gateway import deadline
+from core.utils.single_flight import single_flight
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def run_concurrently(self, key, func, callers=4):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.capture(key, func))) for _ in range(callers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def capture(self, key, func):
+        try:
+            return single_flight(key, func)
+        except Exception as e:
+            return e
+
+    def test_concurrent_callers_share_one_call(self):
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'result'
+
+        threads, results = self.run_concurrently('sf-test', compute)
+        threading.Timer(0.2, release.set).start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('result', False)] + [('result', True)] * 3)
+
+    def test_errors_reach_waiters(self):
+        release = threading.Event()
+
+        def compute():
+            release.wait(5)
+            raise ValueError('upstream failed')
+
+        threads, results = self.run_concurrently('sf-error', compute, callers=3)
+        threading.Timer(0.2, release.set).start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual([type(result) for result in results], [ValueError] * 3)
+
+    def test_result_of_another_process_is_reused(self):
+        cache.add('single-flight:sf-remote:lease', 'other-process', 60)
+        cache.set('single-flight:sf-remote:result', 'remote result', 30)
+        compute = mock.Mock()
+        self.assertEqual(single_flight('sf-remote', compute), ('remote result', True))
+        compute.assert_not_called()
+
+    def test_waiter_stops_at_request_budget(self):
+        release = threading.Event()
+        leader = threading.Thread(target=lambda: single_flight('sf-stuck', lambda: release.wait(5)))
+        leader.start()
+        self.addCleanup(leader.join, 5)
+        self.addCleanup(release.set)
+        time.sleep(0.1)
+
+        started = time.monotonic()
+        with deadline(0.3), self.assertLogs('core.utils.single_flight', 'WARNING'):
+            self.assertEqual(single_flight('sf-stuck', lambda: 'computed here'), ('computed here', False))
+        self.assertLess(time.monotonic() - started, 2)
+
+    @override_settings(REQUEST_BUDGET_SECONDS=0.3)
+    def test_lease_of_another_process_is_not_waited_out(self):
+        cache.add('single-flight:sf-held:lease', 'other-process', 60)
+        started = time.monotonic()
+        with self.assertLogs('core.utils.single_flight', 'WARNING'):
+            self.assertEqual(single_flight('sf-held', lambda: 'computed here'), ('computed here', False))
+        self.assertLess(time.monotonic() - started, 2)
+
+
+class CompareAndSetSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        patient = User.objects.create_user(
+            username='cas-patient', email='cas-patient@example.com', password='x', phone_number='9800000081',
+        )
+        cls.donor = User.objects.create_user(
+            username='cas-donor', email='cas-donor@example.com', password='x', phone_number='9800000082',
+            gender='M', age=30,
+        )
+        blood_request = BloodRequest.objects.create(
+            patient=patient, blood_group='O+', urgency='high', location_lat=27.7, location_long=85.3,
+        )
+        hospital = Hospital.objects.create(name='CAS Hospital', address='Kathmandu', phone_number='014000081',
+                                           location_lat=27.7, location_long=85.3)
+        donation = Donation.objects.create(donor=cls.donor, blood_request=blood_request, status='completed')
+        cls.blood_test = BloodTest.objects.create(donation=donation, tested_by=hospital, hemoglobin=14.0,
+                                                  sugar_level=90)
+
+    def prediction(self, data):
+        return HealthPredictor()._get_fallback_prediction(data)
+
+    def test_prediction_for_current_values_is_saved(self):
+        data = prediction_input(self.donor, self.blood_test)
+        self.assertTrue(save_prediction(self.blood_test, data, self.prediction(data)))
+        self.blood_test.refresh_from_db()
+        self.assertEqual(self.blood_test.prediction_summary, 'All blood test parameters within normal ranges')
+
+    def test_prediction_for_superseded_values_is_dropped(self):
+        data = prediction_input(self.donor, self.blood_test)
+        BloodTest.objects.filter(pk=self.blood_test.pk).update(hemoglobin=11.0)
+
+        with self.assertLogs('core.utils.ai_prediction', 'INFO'):
+            self.assertFalse(save_prediction(self.blood_test, data, self.prediction(data)))
+        self.blood_test.refresh_from_db()
+        self.assertIsNone(self.blood_test.prediction_summary)
+
+    def test_key_follows_prompt_inputs(self):
+        data = prediction_input(self.donor, self.blood_test)
+        self.assertEqual(prediction_key(self.blood_test.pk, data),
+                         prediction_key(self.blood_test.pk, dict(data, hemoglobin='14.0', donor_name='Renamed')))
+        self.assertNotEqual(prediction_key(self.blood_test.pk, data),
+                            prediction_key(self.blood_test.pk, dict(data, hemoglobin=11.0)))
@@ -0,0 +1,131 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import BackgroundTask, Hospital, TravelTime
+from core.utils.travel_time import (
+    EstimatedTravelTime, TravelTimeProvider, purge_expired, rank_hospitals, travel_cell, travel_times, warm,
+)
+from core.views import DonationViewSet
+
+DONOR = (27.70, 85.30)
+PATIENT = (27.72, 85.32)
+
+
+class RoadProvider(TravelTimeProvider):
+    """Fixed travel time for every pair, with small matrix limits"""
+
+    name = 'road'
+    max_origins = max_destinations = 2
+    max_elements = 4
+
+    def __init__(self, seconds=600):
+        self.seconds = seconds
+        self.calls = []
+
+    def matrix(self, origins, destinations):
+        self.calls.append((len(origins), len(destinations)))
+        return [[self.seconds] * len(destinations) for _ in origins]
+
+
+def queued_pairs():
+    return {
+        tuple(pair)
+        for task in BackgroundTask.objects.filter(name='warm_travel_times')
+        for pair in task.payload['pairs']
+    }
+
+
+class TravelTimeCacheTests(TestCase):
+    def cache(self, origin, destination, seconds, age=timedelta()):
+        TravelTime.objects.create(
+            origin_cell=travel_cell(*origin), destination_cell=travel_cell(*destination), seconds=seconds,
+            provider='road', updated_at=timezone.now() - age,
+        )
+
+    def test_fresh_pairs_come_from_the_cache(self):
+        self.cache(DONOR, PATIENT, 1234)
+        self.cache(PATIENT, DONOR, None)
+        self.assertEqual(travel_times([DONOR, PATIENT], [PATIENT, DONOR])[0][0], 1234)
+        self.assertIsNone(travel_times([PATIENT], [DONOR])[0][0])
+
+    @mock.patch('core.utils.travel_time.travel_time_provider', return_value=RoadProvider())
+    def test_expired_pairs_are_estimated_and_queued(self, provider):
+        self.cache(DONOR, PATIENT, 1234, age=timedelta(days=8))
+        [[seconds]] = travel_times([DONOR], [PATIENT])
+        self.assertEqual(seconds, EstimatedTravelTime().seconds(DONOR, PATIENT))
+        self.assertEqual(queued_pairs(), {(travel_cell(*DONOR), travel_cell(*PATIENT))})
+
+    def test_estimate_provider_queues_nothing(self):
+        travel_times([DONOR], [PATIENT])
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_warm_splits_matrix_calls_and_upserts(self):
+        provider = RoadProvider()
+        pairs = [(travel_cell(*DONOR), travel_cell(lat, 85.30)) for lat in (27.8, 27.9, 28.0)]
+        pairs.append((travel_cell(*PATIENT), travel_cell(27.8, 85.30)))
+        self.cache(DONOR, (27.8, 85.30), 1, age=timedelta(days=8))
+
+        written = warm(pairs, provider)
+        self.assertTrue(all(origins <= 2 and destinations <= 2 for origins, destinations in provider.calls))
+        # Origins sharing a block get all of its destinations, so extra pairs may be written
+        self.assertEqual(TravelTime.objects.count(), written)
+        stored = dict(((o, d), seconds) for o, d, seconds in
+                      TravelTime.objects.values_list('origin_cell', 'destination_cell', 'seconds'))
+        self.assertEqual({stored[pair] for pair in pairs}, {600})
+
+    def test_purge_expired(self):
+        self.cache(DONOR, PATIENT, 1, age=timedelta(days=8))
+        self.cache(PATIENT, DONOR, 1)
+        self.assertEqual(purge_expired(), 1)
+        self.assertEqual(TravelTime.objects.count(), 1)
+
+
+class RankHospitalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def hospital(name, lat, lng, n):
+            return Hospital.objects.create(name=name, address='Nepal', phone_number=f'01400013{n}',
+                                           location_lat=lat, location_long=lng)
+
+        cls.near = hospital('Near', 27.71, 85.31, 1)
+        cls.close = hospital('Close', 27.75, 85.35, 2)
+        # About 90 km away, outside the warm radius
+        cls.far = hospital('Far', 28.50, 85.30, 3)
+
+    def set_road_time(self, hospital, seconds):
+        for point in (DONOR, PATIENT):
+            TravelTime.objects.update_or_create(
+                origin_cell=travel_cell(*point), destination_cell=travel_cell(hospital.location_lat,
+                                                                              hospital.location_long),
+                defaults={'seconds': seconds, 'provider': 'road', 'updated_at': timezone.now()},
+            )
+
+    @mock.patch('core.utils.travel_time.travel_time_provider', return_value=RoadProvider())
+    def test_only_shortlist_is_looked_up(self, provider):
+        ranked = rank_hospitals(DONOR, PATIENT)
+        self.assertEqual([row[0] for row in ranked], [self.near, self.close])
+        far_cell = travel_cell(self.far.location_lat, self.far.location_long)
+        self.assertTrue(queued_pairs())
+        self.assertNotIn(far_cell, {destination for _, destination in queued_pairs()})
+
+    def test_quickest_road_time_wins(self):
+        self.set_road_time(self.near, 3000)
+        self.set_road_time(self.close, 600)
+        self.assertEqual(DonationViewSet().find_best_hospital(*DONOR, *PATIENT), self.close)
+
+    def test_unrouted_hospitals_fall_back_to_distance(self):
+        self.set_road_time(self.near, None)
+        self.set_road_time(self.close, None)
+        ranked = rank_hospitals(DONOR, PATIENT)
+        self.assertEqual([row[0] for row in ranked], [self.near, self.close])
+        self.assertEqual(ranked[0][3:], (None, None))
+        self.assertEqual(DonationViewSet().find_best_hospital(*DONOR, *PATIENT), self.near)
+
+    @mock.patch('core.utils.travel_time.travel_time_provider', return_value=RoadProvider())
+    def test_nothing_in_radius_ranks_by_distance(self, provider):
+        ranked = rank_hospitals((29.5, 85.30), (29.5, 85.31))
+        self.assertEqual([row[0] for row in ranked], [self.far, self.close, self.near])
+        self.assertEqual(queued_pairs(), set())
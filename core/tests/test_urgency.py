@@ -0,0 +1,70 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.benchmarks.scenarios import user_headers
+from core.models import BloodRequest, User
+from core.tasks import PRIORITY_CRITICAL, PRIORITY_LOW, PRIORITY_NORMAL
+from core.utils.urgency import CRITICAL, HIGH, LOW, MEDIUM, search_radius_km, task_priority, urgency_priority
+
+
+class UrgencyMappingTests(SimpleTestCase):
+    def test_free_text_urgency(self):
+        cases = {
+            'Critical': CRITICAL,
+            'LIFE-THREATENING!': CRITICAL,
+            'needed asap': CRITICAL,
+            'Urgent': HIGH,
+            'high': HIGH,
+            'routine surgery': LOW,
+            'Medium': MEDIUM,
+            'statistics': MEDIUM,
+            '': MEDIUM,
+            None: MEDIUM,
+        }
+        for urgency, priority in cases.items():
+            with self.subTest(urgency=urgency):
+                self.assertEqual(urgency_priority(urgency), priority)
+
+    @override_settings(URGENCY_SEARCH_RADIUS_FACTOR={'critical': 2.0, 'high': 1.5})
+    def test_radius_grows_with_urgency(self):
+        self.assertEqual([search_radius_km(level, 20) for level in (CRITICAL, HIGH, MEDIUM, LOW)],
+                         [40.0, 30.0, 20, 20])
+
+    def test_task_priority(self):
+        self.assertEqual(task_priority(CRITICAL), PRIORITY_CRITICAL)
+        self.assertEqual(task_priority(LOW), PRIORITY_LOW)
+        self.assertEqual(task_priority(None), PRIORITY_NORMAL)
+
+
+@override_settings(REQUEST_VISIBLE_RADIUS_KM=20, URGENCY_SEARCH_RADIUS_FACTOR={'critical': 2.0, 'high': 1.5})
+class RequestPriorityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = User.objects.create_user(
+            username='urgency-patient', email='urgency-patient@example.com', password='x',
+            phone_number='9800000091',
+        )
+        cls.donor = User.objects.create_user(
+            username='urgency-donor', email='urgency-donor@example.com', password='x', phone_number='9800000092',
+            blood_group='B-', location_lat=27.70, location_long=85.30,
+        )
+
+    def request(self, urgency, lat):
+        return BloodRequest.objects.create(patient=self.patient, blood_group='B-', urgency=urgency,
+                                           location_lat=lat, location_long=85.30)
+
+    def test_save_keeps_priority_in_step(self):
+        blood_request = self.request('low', 27.70)
+        self.assertEqual(blood_request.priority, LOW)
+        blood_request.urgency = 'Emergency'
+        blood_request.save(update_fields=['urgency'])
+        blood_request.refresh_from_db()
+        self.assertEqual(blood_request.priority, CRITICAL)
+
+    def test_urgent_requests_are_visible_further_away(self):
+        # About 25 km north of the donor
+        critical = self.request('Critical', 27.925)
+        self.request('Low', 27.925)
+        nearby = self.request('Low', 27.71)
+
+        response = self.client.get('/api/available-blood-requests/', **user_headers(self.donor))
+        self.assertEqual([row['id'] for row in response.data], [str(critical.id), str(nearby.id)])
@@ -1,4 +1,5 @@
 from django.urls import path, include
+from rest_framework.renderers import JSONRenderer
 from rest_framework.routers import DefaultRouter
 from .views import debug_blood_requests
 
@@ -7,9 +8,11 @@ from .views import (
     DonationViewSet, BloodTestViewSet, ChatRoomViewSet, NotificationViewSet,
     complete_donation, available_blood_requests, CustomTokenObtainPairView,
     create_chatroom_for_donation, HospitalAuthViewSet, HospitalDashboardViewSet,
-    DonorHospitalAssignmentViewSet, NewsViewSet, dashboard_stats
+    DonorHospitalAssignmentViewSet, NewsViewSet, dashboard_stats,
+    hospital_map_layer, hospital_map_tile, export_data, ops_metrics
 )
 from rest_framework_simplejwt.views import TokenRefreshView
+from .utils.streaming import EventStreamRenderer
 
 router = DefaultRouter()
 router.register(r'auth', AuthViewSet, basename='auth')
@@ -56,10 +59,17 @@ urlpatterns = [
     path('api/password-reset/confirm/', AuthViewSet.as_view({'post': 'reset_password'}), name='password-reset-confirm'),
     path('api/hospital-password-reset/request/', HospitalAuthViewSet.as_view({'post': 'request_password_reset'}), name='hospital-password-reset-request'),
     path('api/hospital-password-reset/confirm/', HospitalAuthViewSet.as_view({'post': 'reset_password'}), name='hospital-password-reset-confirm'),
+    path('api/hospital-dashboard/export/', HospitalDashboardViewSet.as_view({'get': 'export'}), name='hospital-dashboard-export'),
+    path('api/exports/<str:dataset>/', export_data, name='export-data'),
+    path('api/hospital-dashboard/lab-results/import/', HospitalDashboardViewSet.as_view({'post': 'import_lab_results'}), name='hospital-dashboard-import-lab-results'),
     path('api/hospital-dashboard/assignments/<uuid:pk>/generate_prediction/', HospitalDashboardViewSet.as_view({'post': 'generate_prediction'}), name='hospital-dashboard-generate-prediction'),
+    path('api/hospital-dashboard/assignments/<uuid:pk>/stream_prediction/', HospitalDashboardViewSet.as_view({'post': 'stream_prediction'}, renderer_classes=[JSONRenderer, EventStreamRenderer]), name='hospital-dashboard-stream-prediction'),
     path('api/test-openai/', HospitalDashboardViewSet.as_view({'get': 'test_openai'}), name='test-openai'),
     path('api/users/profile/', UserViewSet.as_view({'get': 'profile'}), name='user-profile'),
     path('api/users/<uuid:pk>/update_profile/', UserViewSet.as_view({'put': 'update_profile', 'patch': 'update_profile'}), name='user-update-profile'),
     path('api/users/<uuid:pk>/change_password/', UserViewSet.as_view({'post': 'change_password'}), name='user-change-password'),
     path('api/dashboard-stats/', dashboard_stats, name='dashboard-stats'),
+    path('api/ops/metrics/', ops_metrics, name='ops-metrics'),
+    path('api/map/hospitals/', hospital_map_layer, name='hospital-map-layer'),
+    path('api/map/hospitals/tiles/<str:key>/', hospital_map_tile, name='hospital-map-tile'),
 ]
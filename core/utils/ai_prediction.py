@@ -1,222 +1,340 @@
 # core/utils/ai_prediction.py
-import openai
-from openai import OpenAI
-import os
-from django.conf import settings
+import hashlib
+import json
 import logging
-import re
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .http_gateway import UpstreamUnavailable, openai_available, openai_chat, openai_chat_stream
+from .single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
+ANALYTE_FIELDS = ['sugar_level', 'hemoglobin', 'uric_acid_level', 'wbc_count', 'rbc_count', 'platelet_count']
+
+# field -> (label, unit, male range, female range)
+REFERENCE_RANGES = {
+    'sugar_level': ('Glucose', 'mg/dL', (70, 100), (70, 100)),
+    'hemoglobin': ('Hemoglobin', 'g/dL', (13.5, 17.5), (12.0, 15.5)),
+    'uric_acid_level': ('Uric acid', 'mg/dL', (3.4, 7.0), (2.4, 6.0)),
+    'wbc_count': ('WBC', 'cells/mcL', (4500, 11000), (4500, 11000)),
+    'rbc_count': ('RBC', 'million cells/mcL', (4.7, 6.1), (4.2, 5.4)),
+    'platelet_count': ('Platelets', 'platelets/mcL', (150000, 450000), (150000, 450000)),
+}
+
+# Advice used by the rule-based fallback for (field, status)
+FALLBACK_ADVICE = {
+    ('sugar_level', 'high'): "Reduce sugar and carbohydrate intake",
+    ('sugar_level', 'low'): "Maintain regular meal schedule",
+    ('hemoglobin', 'low'): "Increase iron-rich foods",
+    ('hemoglobin', 'high'): "Stay well hydrated",
+    ('uric_acid_level', 'high'): "Limit red meat, seafood and alcohol, and drink plenty of water",
+    ('wbc_count', 'high'): "Have a doctor check for infection or inflammation",
+    ('wbc_count', 'low'): "Have a doctor review your immune health",
+    ('rbc_count', 'low'): "Increase iron, folate and vitamin B12 in your diet",
+    ('platelet_count', 'low'): "Avoid injury-prone activity and have a doctor review your platelet count",
+    ('platelet_count', 'high'): "Have a doctor review your platelet count",
+}
+
+# Output cap for the JSON answer; the schema asks for short lists, so this is rarely reached
+PREDICTION_MAX_TOKENS = 450
+
+# Longest list the model may return per section
+MAX_ITEMS = 5
+
+SYSTEM_PROMPT = (
+    "You review blood donor lab results for a hospital. Reply with a JSON object only:\n"
+    '{"summary": "<=2 sentences", "findings": ["..."], "conditions": ["..."], '
+    '"recommendations": ["..."], "notification": "1 sentence addressed to the donor"}\n'
+    "findings: only out-of-range values and what they mean. conditions: possible causes worth "
+    "checking, not diagnoses. recommendations: concrete diet, lifestyle and follow-up advice. "
+    f"At most {MAX_ITEMS} short items per list; use [] when nothing applies. Plain language."
+)
+
+DISCLAIMER = (
+    "This AI analysis is for informational purposes only. Please consult with a qualified healthcare "
+    "professional for proper diagnosis and treatment. Do not disregard professional medical advice "
+    "based on this analysis."
+)
+
+# BloodTest columns written by apply_prediction
+PREDICTION_FIELDS = [
+    'health_risk_prediction', 'disease_prediction', 'prediction_confidence', 'prediction_summary',
+    'prediction_findings', 'prediction_conditions', 'prediction_recommendations', 'prediction_disclaimer',
+]
+
+
+class PredictionFormatError(ValueError):
+    pass
+
+
+def prediction_input(donor, blood_test):
+    """The data HealthPredictor.predict_health_risks expects for a donor's blood test"""
+    data = {
+        'donor_name': f"{donor.first_name} {donor.last_name}",
+        'donor_age': donor.age,
+        'donor_gender': donor.gender,
+    }
+    for field in ANALYTE_FIELDS:
+        data[field] = getattr(blood_test, field)
+    return data
+
+
+def reference_range(field, gender):
+    label, unit, male, female = REFERENCE_RANGES[field]
+    return female if gender == 'F' else male
+
+
+def classify(field, value, gender):
+    """'low', 'normal' or 'high' against the donor's reference range"""
+    low, high = reference_range(field, gender)
+    if value < low:
+        return 'low'
+    if value > high:
+        return 'high'
+    return 'normal'
+
+
+def measured_analytes(data):
+    """(field, value, status) for every analyte that was actually measured"""
+    gender = data.get('donor_gender')
+    measured = []
+    for field in ANALYTE_FIELDS:
+        try:
+            value = float(data.get(field))
+        except (TypeError, ValueError):
+            continue
+        if value:
+            measured.append((field, value, classify(field, value, gender)))
+    return measured
+
+
+def _bullets(items):
+    return '\n'.join(f"- {item}" for item in items) or None
+
+
+def apply_prediction(blood_test, prediction):
+    """Copy a HealthPredictor result onto `blood_test`; returns the update_fields to save"""
+    blood_test.health_risk_prediction = prediction['full_prediction']
+    blood_test.disease_prediction = prediction['summary']
+    blood_test.prediction_confidence = prediction['confidence']
+    blood_test.prediction_summary = prediction['summary']
+    blood_test.prediction_findings = _bullets(prediction['findings'])
+    blood_test.prediction_conditions = _bullets(prediction['conditions'])
+    blood_test.prediction_recommendations = _bullets(prediction['recommendations'])
+    blood_test.prediction_disclaimer = DISCLAIMER
+    return PREDICTION_FIELDS + ['updated_at']
+
+
+def _analyte_value(value):
+    # Values may still be strings from request data; compare them as the DB stores them
+    return None if value in (None, '') else float(value)
+
+
+def prediction_key(blood_test_id, data):
+    """Single-flight key: the blood test plus a hash of everything the prompt depends on"""
+    inputs = [data.get('donor_age'), data.get('donor_gender')]
+    inputs += [_analyte_value(data.get(field)) for field in ANALYTE_FIELDS]
+    digest = hashlib.sha1(json.dumps(inputs).encode('utf-8')).hexdigest()
+    return f'prediction:{blood_test_id}:{digest}'
+
+
+def save_prediction(blood_test, data, prediction, using=None):
+    """
+    Persist `prediction` only if the blood test still has the analyte values it was
+    made from, so a slow prediction for superseded values cannot overwrite the
+    result for newer ones. Returns whether the row was updated.
+    """
+    from core.models import BloodTest
+
+    update_fields = apply_prediction(blood_test, prediction)
+    blood_test.updated_at = timezone.now()
+    current = Q()
+    for field in ANALYTE_FIELDS:
+        value = _analyte_value(data.get(field))
+        current &= Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+    updated = BloodTest.objects.using(using).filter(current, pk=blood_test.pk).update(
+        **{field: getattr(blood_test, field) for field in update_fields}
+    )
+    if not updated:
+        logger.info(f"Discarded stale prediction for blood test {blood_test.pk}")
+    return bool(updated)
+
+
+def predict_for_blood_test(blood_test, donor):
+    """
+    Predict and save the analysis for a blood test, coalescing with any prediction
+    already in flight for the same test and inputs.
+
+    Returns (prediction, owner): owner is True only for the caller whose prediction
+    was saved, which should then send the notification; callers that shared an
+    in-flight prediction, or whose result went stale, get owner False.
+    """
+    data = prediction_input(donor, blood_test)
+    prediction, shared = single_flight(
+        prediction_key(blood_test.pk, data),
+        lambda: HealthPredictor().predict_health_risks(data),
+    )
+    if shared:
+        apply_prediction(blood_test, prediction)
+        return prediction, False
+    return prediction, save_prediction(blood_test, data, prediction)
+
+
 class HealthPredictor:
-    def __init__(self):
-        self.api_key = settings.OPENAI_API_KEY
-        self.client = OpenAI(api_key=self.api_key) if self.api_key else None
-    
     def predict_health_risks(self, blood_test_data):
         """
         Predict health risks based on blood test results using OpenAI API
         """
         try:
-            if not self.api_key:
+            if not openai_available():
                 logger.error("OpenAI API key is not configured")
                 return self._get_fallback_prediction(blood_test_data)
             
-            if not self.client:
-                self.client = OpenAI(api_key=self.api_key)
-            
-            prompt = self._create_health_prediction_prompt(blood_test_data)
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "system",
-                    "content": "You are a medical AI assistant. Analyze blood test results and provide:\n"
-                               "1. Health risk assessment based on the values\n"
-                               "2. Specific recommendations for improvement\n"
-                               "3. Preventive measures\n"
-                               "4. When to consult a doctor\n"
-                               "Be professional, accurate, and compassionate. "
-                               "Format the response in clear, patient-friendly language."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }],
-                max_tokens=1000,
-                temperature=0.3
-            )
-            
-            prediction = response.choices[0].message.content.strip()
-            return self._parse_prediction_response(prediction)
+            answer = openai_chat(**self._request_params(blood_test_data))
+            return self._parse_prediction_response(answer, blood_test_data)
             
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
             return self._get_fallback_prediction(blood_test_data)
-    
-    def _create_health_prediction_prompt(self, data):
-        """Create a detailed prompt for health prediction"""
-        return f"""
-        Analyze these blood test results and provide a comprehensive health assessment:
-
-        PATIENT INFORMATION:
-        - Name: {data.get('donor_name', 'Patient')}
-        - Age: {data.get('donor_age', 'Unknown')}
-        - Gender: {data.get('donor_gender', 'Unknown')}
-
-        BLOOD TEST RESULTS:
-        - Sugar Level: {data.get('sugar_level', 'Not provided')} mg/dL (Normal: 70-100 mg/dL)
-        - Hemoglobin: {data.get('hemoglobin', 'Not provided')} g/dL (Normal: 13.5-17.5g/dL M, 12.0-15.5g/dL F)
-        - Uric Acid: {data.get('uric_acid_level', 'Not provided')} mg/dL (Normal: 3.4-7.0mg/dL M, 2.4-6.0mg/dL F)
-        - WBC Count: {data.get('wbc_count', 'Not provided')} cells/mcL (Normal: 4,500-11,000)
-        - RBC Count: {data.get('rbc_count', 'Not provided')} million cells/mcL (Normal: 4.7-6.1M, 4.2-5.4F)
-        - Platelet Count: {data.get('platelet_count', 'Not provided')} platelets/mcL (Normal: 150,000-450,000)
-
-        Please provide:
-        1. HEALTH ASSESSMENT: Overall health status based on these values
-        2. RISK FACTORS: Any potential health risks or abnormalities
-        3. RECOMMENDATIONS: Specific actionable advice including:
-           - Dietary changes
-           - Lifestyle modifications
-           - When to consult a healthcare professional
-        4. PREVENTIVE MEASURES: Steps to maintain or improve health
-        5. FOLLOW-UP: Suggested timeline for next check-up
-
-        Format the response in clear, patient-friendly language with sections.
+
+    def stream_health_risks(self, blood_test_data):
+        """
+        Like predict_health_risks, but yields ('delta', text) events while the model
+        writes its JSON answer and finishes with a single ('result', prediction) event.
+
+        If OpenAI cannot be used the fallback is sent as one delta in the same JSON
+        shape; if the stream breaks part-way or the answer does not parse, a
+        ('reset', '') event tells the client to drop the text received so far first.
         """
-    
-    def _parse_prediction_response(self, prediction_text):
-        """Parse the OpenAI response into structured data"""
-        # Clean up the response
-        prediction_text = prediction_text.strip()
-        
+        parts = []
+        try:
+            if not openai_available():
+                raise UpstreamUnavailable('OpenAI API key is not configured')
+            for text in openai_chat_stream(**self._request_params(blood_test_data)):
+                parts.append(text)
+                yield 'delta', text
+            prediction = self._parse_prediction_response(''.join(parts), blood_test_data)
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {str(e)}")
+            prediction = self._get_fallback_prediction(blood_test_data)
+            if parts:
+                yield 'reset', ''
+            yield 'delta', self._as_document(prediction)
+        yield 'result', prediction
+
+    def _request_params(self, data):
         return {
-            "full_prediction": prediction_text,
-            "summary": self._extract_summary(prediction_text),
-            "notification_message": self._create_notification_message(prediction_text),
-            "confidence": 95,  # High confidence for AI-generated content
-            "has_abnormalities": self._check_abnormalities(prediction_text)
+            'messages': [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": self._create_health_prediction_prompt(data)},
+            ],
+            'response_format': {'type': 'json_object'},
+            'max_tokens': PREDICTION_MAX_TOKENS,
+            'temperature': 0.2,
         }
-    
-    def _extract_summary(self, text):
-        """Extract a summary from the prediction text"""
-        # Take the first 2-3 sentences as summary
-        sentences = re.split(r'[.!?]+', text)
-        summary = '. '.join(sentences[:3]).strip()
-        if summary and not summary.endswith('.'):
-            summary += '.'
-        return summary if summary else "Blood test analysis completed"
-    
-    def _create_notification_message(self, text):
-        """Create a notification-friendly message"""
-        sentences = re.split(r'[.!?]+', text)
-        if sentences:
-            return f"{sentences[0].strip()}." if sentences[0].strip() else "Your blood test analysis is ready. Please check your dashboard for detailed health recommendations."
-        return "Your blood test analysis is ready. Please check your dashboard for detailed health recommendations."
-    
-    def _check_abnormalities(self, text):
-        """Check if the text indicates any abnormalities"""
-        abnormality_indicators = ['abnormal', 'high', 'low', 'elevated', 'reduced', 'risk', 'concern', 'warning']
-        return any(indicator in text.lower() for indicator in abnormality_indicators)
-    
-    def _get_fallback_prediction(self, blood_test_data):
-        """Fallback prediction when OpenAI fails"""
-        # Create a basic analysis based on the values
-        analysis = self._generate_basic_analysis(blood_test_data)
-        
+
+    def _create_health_prediction_prompt(self, data):
+        """
+        One line per measured analyte with the donor's own reference range and
+        status already worked out, so the model only has to interpret them.
+        Unmeasured analytes and the donor's name are left out.
+        """
+        gender = data.get('donor_gender')
+        lines = [f"Donor: {data.get('donor_age') or 'unknown'}y, {'female' if gender == 'F' else 'male' if gender == 'M' else 'sex unknown'}"]
+        for field, value, status in measured_analytes(data):
+            label, unit = REFERENCE_RANGES[field][:2]
+            low, high = reference_range(field, gender)
+            lines.append(f"{label} {value:g} {unit} (ref {low:g}-{high:g}, {status})")
+        return '\n'.join(lines)
+
+    def _parse_prediction_response(self, answer, blood_test_data):
+        """Validate the model's JSON answer into the prediction dict"""
+        try:
+            document = json.loads(answer)
+        except ValueError as e:
+            raise PredictionFormatError(f"Prediction is not valid JSON: {str(e)}")
+        if not isinstance(document, dict):
+            raise PredictionFormatError('Prediction is not a JSON object')
+
+        summary = str(document.get('summary') or '').strip()
+        if not summary:
+            raise PredictionFormatError('Prediction has no summary')
+        sections = {}
+        for key in ('findings', 'conditions', 'recommendations'):
+            items = document.get(key) or []
+            if isinstance(items, str):
+                items = [items]
+            if not isinstance(items, list):
+                raise PredictionFormatError(f"Prediction {key} is not a list")
+            sections[key] = [str(item).strip() for item in items if str(item).strip()][:MAX_ITEMS]
+        abnormal = [field for field, value, status in measured_analytes(blood_test_data) if status != 'normal']
+
+        return self._build_prediction(
+            summary=summary,
+            notification=str(document.get('notification') or '').strip() or summary,
+            confidence=95,
+            has_abnormalities=bool(abnormal or sections['findings']),
+            **sections
+        )
+
+    def _build_prediction(self, summary, findings, conditions, recommendations, notification, confidence,
+                          has_abnormalities):
+        full_prediction = f"SUMMARY:\n{summary}"
+        for title, items in (('FINDINGS', findings), ('POSSIBLE CONDITIONS', conditions),
+                             ('RECOMMENDATIONS', recommendations)):
+            if items:
+                full_prediction += f"\n\n{title}:\n{_bullets(items)}"
         return {
-            "full_prediction": analysis['full_analysis'],
-            "summary": analysis['summary'],
-            "notification_message": analysis['notification'],
-            "confidence": 80,
-            "has_abnormalities": analysis['has_abnormalities']
+            "full_prediction": full_prediction,
+            "summary": summary,
+            "findings": findings,
+            "conditions": conditions,
+            "recommendations": recommendations,
+            "notification_message": notification,
+            "confidence": confidence,
+            "has_abnormalities": has_abnormalities,
         }
-    
-    def _generate_basic_analysis(self, data):
-        """Generate basic health analysis based on blood test values"""
-        # Get values with defaults
-        try:
-            sugar = float(data.get('sugar_level', 0))
-            hb = float(data.get('hemoglobin', 0))
-            uric_acid = float(data.get('uric_acid_level', 0))
-            wbc = float(data.get('wbc_count', 0))
-            rbc = float(data.get('rbc_count', 0))
-            platelets = float(data.get('platelet_count', 0))
-            
-            abnormalities = []
-            recommendations = []
-            
-            # Analyze each parameter
-            if sugar > 100:
-                abnormalities.append(f"Elevated sugar level ({sugar} mg/dL)")
-                recommendations.append("Reduce sugar and carbohydrate intake")
-            elif sugar < 70:
-                abnormalities.append(f"Low sugar level ({sugar} mg/dL)")
-                recommendations.append("Maintain regular meal schedule")
-            
-            gender = data.get('donor_gender', 'M')
-            if gender == 'M':
-                if hb < 13.5:
-                    abnormalities.append(f"Low hemoglobin ({hb} g/dL)")
-                    recommendations.append("Increase iron-rich foods")
-                elif hb > 17.5:
-                    abnormalities.append(f"High hemoglobin ({hb} g/dL)")
-                    recommendations.append("Stay well hydrated")
-            else:
-                if hb < 12.0:
-                    abnormalities.append(f"Low hemoglobin ({hb} g/dL)")
-                    recommendations.append("Increase iron-rich foods")
-                elif hb > 15.5:
-                    abnormalities.append(f"High hemoglobin ({hb} g/dL)")
-                    recommendations.append("Stay well hydrated")
-            
-            has_abnormalities = len(abnormalities) > 0
-            
-            if has_abnormalities:
-                summary = f"Blood test shows {len(abnormalities)} area(s) needing attention"
-                notification = f"Your blood test reveals {len(abnormalities)} area(s) requiring attention. Please check dashboard for details."
-                full_analysis = f"BLOOD TEST ANALYSIS:\n\n"
-                full_analysis += "RESULTS:\n"
-                full_analysis += f"- Sugar Level: {sugar} mg/dL\n"
-                full_analysis += f"- Hemoglobin: {hb} g/dL\n"
-                full_analysis += f"- Uric Acid: {uric_acid} mg/dL\n"
-                full_analysis += f"- WBC Count: {wbc} cells/mcL\n"
-                full_analysis += f"- RBC Count: {rbc} million cells/mcL\n"
-                full_analysis += f"- Platelet Count: {platelets} platelets/mcL\n\n"
-                full_analysis += "AREAS NEEDING ATTENTION:\n"
-                for ab in abnormalities:
-                    full_analysis += f"- {ab}\n"
-                full_analysis += "\nRECOMMENDATIONS:\n"
-                for rec in recommendations:
-                    full_analysis += f"- {rec}\n"
-                full_analysis += "\nPlease consult with a healthcare professional for personalized advice."
-            else:
-                summary = "All blood test parameters within normal ranges"
-                notification = "Great news! Your blood test results are within normal ranges."
-                full_analysis = f"BLOOD TEST ANALYSIS:\n\n"
-                full_analysis += "RESULTS:\n"
-                full_analysis += f"- Sugar Level: {sugar} mg/dL (Normal)\n"
-                full_analysis += f"- Hemoglobin: {hb} g/dL (Normal)\n"
-                full_analysis += f"- Uric Acid: {uric_acid} mg/dL (Normal)\n"
-                full_analysis += f"- WBC Count: {wbc} cells/mcL (Normal)\n"
-                full_analysis += f"- RBC Count: {rbc} million cells/mcL (Normal)\n"
-                full_analysis += f"- Platelet Count: {platelets} platelets/mcL (Normal)\n\n"
-                full_analysis += "COMMENDATION: All parameters are within normal ranges\n"
-                full_analysis += "RECOMMENDATION: Continue maintaining healthy lifestyle\n\n"
-                full_analysis += "Regular health check-ups are recommended."
-            
-            return {
-                'full_analysis': full_analysis,
-                'summary': summary,
-                'notification': notification,
-                'has_abnormalities': has_abnormalities
-            }
-            
-        except (ValueError, TypeError):
-            # If there's any error in value processing
-            return {
-                'full_analysis': "Blood test analysis completed. Please consult with a healthcare professional for detailed interpretation of your results.",
-                'summary': "Blood test processing completed",
-                'notification': "Your blood test results have been processed. Please check your dashboard for details.",
-                'has_abnormalities': False
-            }
\ No newline at end of file
+
+    def _as_document(self, prediction):
+        return json.dumps({
+            'summary': prediction['summary'],
+            'findings': prediction['findings'],
+            'conditions': prediction['conditions'],
+            'recommendations': prediction['recommendations'],
+            'notification': prediction['notification_message'],
+        })
+
+    def _get_fallback_prediction(self, blood_test_data):
+        """Rule-based prediction from the reference ranges when OpenAI is unavailable"""
+        findings = []
+        recommendations = []
+        for field, value, status in measured_analytes(blood_test_data):
+            if status == 'normal':
+                continue
+            label, unit = REFERENCE_RANGES[field][:2]
+            findings.append(f"{'Low' if status == 'low' else 'High'} {label.lower()} ({value:g} {unit})")
+            advice = FALLBACK_ADVICE.get((field, status))
+            if advice and advice not in recommendations:
+                recommendations.append(advice)
+
+        if findings:
+            summary = f"Blood test shows {len(findings)} area(s) needing attention"
+            notification = f"Your blood test reveals {len(findings)} area(s) requiring attention. Please check dashboard for details."
+            recommendations.append("Please consult with a healthcare professional for personalized advice")
+        else:
+            summary = "All blood test parameters within normal ranges"
+            notification = "Great news! Your blood test results are within normal ranges."
+            recommendations.append("Continue maintaining a healthy lifestyle; regular check-ups are recommended")
+
+        return self._build_prediction(
+            summary=summary,
+            findings=findings,
+            conditions=[],
+            recommendations=recommendations,
+            notification=notification,
+            confidence=80,
+            has_abnormalities=bool(findings),
+        )
+
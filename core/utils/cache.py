@@ -0,0 +1,95 @@
+# core/utils/cache.py
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+# Backends whose entries are private to one process
+PER_PROCESS_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_version(namespace):
+    """
+    Current version token of a cache namespace, in nanoseconds since the epoch.
+
+    Versions are timestamps rather than counters, so a version key that was evicted
+    can never bring back payloads that were cached under an older version.
+    """
+    key = f'{namespace}:version'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Invalidate everything cached under `namespace`"""
+    cache.set(f'{namespace}:version', time.time_ns(), None)
+
+
+def versioned_payload(namespace, key, build, timeout=300):
+    """
+    Return a cached entry {'data', 'etag', 'last_modified'} for `key`.
+
+    `build` is only called on a miss and must return (data, last_modified) where
+    last_modified is a datetime or None. The ETag is a hash of the serialized data,
+    so it changes exactly when the response body would. Last-Modified is never
+    older than the namespace version, so deleting a row, which leaves no
+    updated_at behind, still moves it forward.
+    """
+    version = cache_version(namespace)
+    full_key = f'{namespace}:{version}:{key}'
+    entry = cache.get(full_key)
+    if entry is None:
+        data, last_modified = build()
+        body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        modified = version // 10 ** 9
+        if last_modified:
+            modified = max(modified, int(last_modified.timestamp()))
+        entry = {
+            'data': data,
+            'etag': '"%s"' % hashlib.md5(body.encode()).hexdigest(),
+            'last_modified': modified,
+        }
+        cache.set(full_key, entry, timeout)
+    return entry
+
+
+def conditional_response(request, entry):
+    """Serve a cached entry, answering 304 when the client's validators still match"""
+    response = get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified']
+    )
+    if response is None:
+        response = Response(entry['data'])
+    response['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
+
+
+def check_shared_cache(app_configs=None, **kwargs):
+    """
+    Deploy check: namespace versions and pending donor locations
+    only reach other workers through a cache they all share.
+    """
+    if settings.CACHES['default']['BACKEND'] not in PER_PROCESS_BACKENDS:
+        return []
+    return [checks.Warning(
+        'The default cache is private to each process.',
+        hint='Set CACHE_BACKEND to a shared cache such as Redis or Memcached; otherwise '
+             'invalidations made by one worker are not seen by the others.',
+        id='core.W001',
+    )]
@@ -0,0 +1,127 @@
+# core/utils/donor_location.py
+"""
+High-frequency donor location updates.
+
+Clients report a donor's position with POST /api/users/location/ or a
+{"type": "location", "lat": ..., "lng": ...} message on the ws/location/
+socket. Pings are throttled per donor: the first ping of a
+DONOR_LOCATION['min_interval'] window is written at once, later pings in the
+window only replace the pending position in the cache, and one
+flush_donor_location task at the end of the window writes whichever came
+last. Moves shorter than DONOR_LOCATION['min_distance_m'] are not written.
+
+A write updates only location_lat, location_long and geo_cell, so the donor
+search grid sees the new position immediately. When the donor enters a new
+travel-time cell, travel times from it to nearby hospitals are queued for
+warming.
+
+Pending positions live in the cache, so the trailing write needs a cache
+shared by the web and worker processes; with a per-process cache a donor's
+latest position is written by their first ping after the window instead.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import haversine_km
+from .travel_time import EstimatedTravelTime, hospital_pairs, queue_warm, stale_pairs, travel_cell, travel_time_provider
+
+WRITTEN = 'written'
+COALESCED = 'coalesced'
+UNCHANGED = 'unchanged'
+
+
+def _window_key(user_id):
+    return f'donor-location:window:{user_id}'
+
+
+def _pending_key(user_id):
+    return f'donor-location:pending:{user_id}'
+
+
+def _scheduled_key(user_id):
+    return f'donor-location:scheduled:{user_id}'
+
+
+def parse_location(lat, lng):
+    """(lat, lng) as floats, or ValueError for missing or out of range coordinates"""
+    if lat in (None, '') or lng in (None, ''):
+        raise ValueError('Latitude and longitude are required')
+    lat, lng = float(lat), float(lng)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('Coordinates out of range')
+    return lat, lng
+
+
+def _moved(user, lat, lng):
+    if user.location_lat is None or user.location_long is None:
+        return True
+    distance_m = haversine_km(user.location_lat, user.location_long, lat, lng) * 1000
+    return distance_m >= settings.DONOR_LOCATION['min_distance_m']
+
+
+def _refresh_travel_times(old_cell, lat, lng):
+    """Queue travel times from a newly entered cell to its nearby hospitals"""
+    cell = travel_cell(lat, lng)
+    if cell == old_cell or isinstance(travel_time_provider(), EstimatedTravelTime):
+        return
+    pairs = stale_pairs(hospital_pairs([cell]))
+    if pairs:
+        queue_warm(pairs)
+
+
+def write_location(user, lat, lng):
+    """Store a donor's position, touching only the coordinate columns"""
+    old_cell = None
+    if user.location_lat is not None and user.location_long is not None:
+        old_cell = travel_cell(user.location_lat, user.location_long)
+    user.location_lat, user.location_long = lat, lng
+    # User.save() adds geo_cell to update_fields
+    user.save(update_fields=['location_lat', 'location_long'])
+    _refresh_travel_times(old_cell, lat, lng)
+
+
+def record_location(user, lat, lng):
+    """
+    Handle one location ping for `user`. Returns WRITTEN, COALESCED (held for the
+    end of the throttle window) or UNCHANGED (too close to the stored position).
+    """
+    from core.tasks import PRIORITY_INTERACTIVE, enqueue
+
+    interval = settings.DONOR_LOCATION['min_interval']
+    if not cache.add(_window_key(user.pk), 1, interval):
+        # Another write happened within the window; keep only the latest position
+        cache.set(_pending_key(user.pk), (lat, lng), interval * 2)
+        if cache.add(_scheduled_key(user.pk), 1, interval):
+            enqueue('flush_donor_location', {'user_id': str(user.pk)},
+                    priority=PRIORITY_INTERACTIVE, delay=timedelta(seconds=interval),
+                    dedupe_key=f'donor-location:{user.pk}')
+        return COALESCED
+
+    # This ping supersedes any position still pending from the last window
+    cache.delete(_pending_key(user.pk))
+    # `user` may be held by a long-lived consumer; a flush may have moved the donor since
+    user.refresh_from_db(fields=['location_lat', 'location_long'])
+    if not _moved(user, lat, lng):
+        return UNCHANGED
+    write_location(user, lat, lng)
+    return WRITTEN
+
+
+def flush_location(user_id):
+    """Write the pending position of a donor, if any; returns whether it was written"""
+    from core.models import User
+
+    pending = cache.get(_pending_key(user_id))
+    cache.delete_many([_pending_key(user_id), _scheduled_key(user_id)])
+    if pending is None:
+        return False
+    lat, lng = pending
+    user = User.objects.filter(pk=user_id).only('id', 'location_lat', 'location_long').first()
+    if user is None or not _moved(user, lat, lng):
+        return False
+    write_location(user, lat, lng)
+    # Pings right after the flush start a new window instead of writing again
+    cache.set(_window_key(user_id), 1, settings.DONOR_LOCATION['min_interval'])
+    return True
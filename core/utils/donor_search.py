@@ -0,0 +1,69 @@
+# core/utils/donor_search.py
+"""
+k-nearest eligible donor search over the User.geo_cell grid.
+
+Rings of grid cells are scanned outward from the search point, each ring
+through the (blood_group, geo_cell) partial index, until K donors lie within
+the distance the scanned rings are guaranteed to cover, or the maximum radius
+is reached. Dense areas stop after a ring or two; sparse ones keep expanding
+instead of finding nobody inside a fixed cutoff.
+"""
+from core.models import User
+from .eligibility import matchable_donors
+from .geo import donor_cells_in_ring, haversine_km, ring_coverage_km
+
+# Rings scanned by the first query; later queries double the scanned width
+INITIAL_RINGS = 1
+
+# Hard stop on ring count, for searches near the poles where cells get thin
+MAX_RINGS = 400
+
+
+def _rings_covering(lat, radius_km):
+    """Fewest rings around (lat, ·) that cover `radius_km`, capped at MAX_RINGS"""
+    for rings in range(1, MAX_RINGS + 1):
+        if ring_coverage_km(lat, rings) >= radius_km:
+            return rings
+    return MAX_RINGS
+
+
+def nearest_donor_ids(lat, lng, k, max_radius_km, blood_group=None, exclude=(), queryset=None):
+    """
+    [(distance_km, donor_id)] for the `k` closest matchable donors within
+    `max_radius_km` of (lat, lng), closest first.
+    """
+    donors = queryset if queryset is not None else matchable_donors()
+    if blood_group:
+        donors = donors.filter(blood_group=blood_group)
+    if exclude:
+        donors = donors.exclude(id__in=list(exclude))
+
+    candidates = []
+    max_rings = _rings_covering(lat, max_radius_km)
+    inner, outer = 0, min(INITIAL_RINGS, max_rings)
+    while True:
+        cells = donor_cells_in_ring(lat, lng, inner, outer)
+        rows = donors.filter(geo_cell__in=cells).values_list('id', 'location_lat', 'location_long')
+        for donor_id, donor_lat, donor_lng in rows:
+            distance = haversine_km(lat, lng, donor_lat, donor_lng)
+            if distance <= max_radius_km:
+                candidates.append((distance, donor_id))
+
+        covered = ring_coverage_km(lat, outer)
+        # Nothing outside the scanned rings can beat a candidate closer than `covered`
+        if sum(1 for distance, _ in candidates if distance <= covered) >= k:
+            break
+        if outer >= max_rings:
+            break
+        inner, outer = outer + 1, min(outer * 2, max_rings)
+
+    candidates.sort()
+    return candidates[:k]
+
+
+def nearest_donor_values(lat, lng, k, columns, max_radius_km, blood_group=None, exclude=(), queryset=None):
+    """[(row, distance_km)] for the `k` closest matchable donors, closest first, rows as .values(*columns)"""
+    nearest = nearest_donor_ids(lat, lng, k, max_radius_km, blood_group, exclude, queryset)
+    columns = list(dict.fromkeys(['id', *columns]))
+    rows = {row['id']: row for row in User.objects.filter(id__in=[donor_id for _, donor_id in nearest]).values(*columns)}
+    return [(rows[donor_id], distance) for distance, donor_id in nearest if donor_id in rows]
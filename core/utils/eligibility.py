@@ -0,0 +1,177 @@
+# core/utils/eligibility.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+# Minimum hemoglobin (g/dL) to donate; anything not 'M' uses the lower threshold
+MIN_HEMOGLOBIN = {'M': 13.0}
+DEFAULT_MIN_HEMOGLOBIN = 12.5
+
+
+def min_hemoglobin(gender):
+    return MIN_HEMOGLOBIN.get(gender, DEFAULT_MIN_HEMOGLOBIN)
+
+
+def _as_date(value):
+    if value is None:
+        return timezone.localdate()
+    if hasattr(value, 'hour'):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def matchable_donors(on=None):
+    """
+    Donors that may be asked to donate on `on` (today by default).
+
+    The filter mirrors the condition of user_matchable_donor_idx, so matching
+    queries that add a blood group stay on that index.
+    """
+    from core.models import User
+
+    on = on or timezone.localdate()
+    return User.objects.filter(
+        is_donor=True,
+        is_deferred=False,
+        location_lat__isnull=False,
+        location_long__isnull=False,
+    ).filter(Q(eligible_from__isnull=True) | Q(eligible_from__lte=on))
+
+
+def record_completed_donation(donor_id, donated_at):
+    """Start the donation interval for a donor, in a single UPDATE"""
+    from core.models import User
+
+    donated_on = _as_date(donated_at)
+    eligible = donated_on + timedelta(days=settings.DONATION_INTERVAL_DAYS)
+    User.objects.filter(pk=donor_id).update(
+        last_donation_date=Greatest(Coalesce(F('last_donation_date'), Value(donated_on)), Value(donated_on)),
+        eligible_from=Greatest(Coalesce(F('eligible_from'), Value(eligible)), Value(eligible)),
+    )
+
+
+def record_blood_test(blood_test):
+    """
+    Defer a donor whose test shows low hemoglobin for HEMOGLOBIN_DEFERRAL_DAYS, or lift
+    an earlier deferral once a test comes back normal.
+    """
+    record_blood_tests([blood_test])
+
+
+def record_blood_tests(blood_tests):
+    """record_blood_test for a batch, with one read and at most a few writes"""
+    from core.models import User
+
+    results = {}
+    for blood_test in blood_tests:
+        try:
+            results[blood_test.donation_id] = (float(blood_test.hemoglobin), _as_date(blood_test.created_at))
+        except (TypeError, ValueError):
+            continue
+    if not results:
+        return
+
+    donors = User.objects.filter(donations__id__in=list(results)).values(
+        'id', 'gender', 'is_deferred', 'last_donation_date', 'donations__id'
+    )
+    deferred = {}
+    lifted = []
+    for donor in donors:
+        hemoglobin, tested_on = results[donor['donations__id']]
+        if hemoglobin < min_hemoglobin(donor['gender']):
+            deferred_until = tested_on + timedelta(days=settings.HEMOGLOBIN_DEFERRAL_DAYS)
+            deferred.setdefault(deferred_until, []).append(donor['id'])
+        elif donor['is_deferred']:
+            # Only the regular donation interval still applies
+            last = donor['last_donation_date']
+            lifted.append(User(
+                id=donor['id'],
+                is_deferred=False,
+                eligible_from=last + timedelta(days=settings.DONATION_INTERVAL_DAYS) if last else None,
+            ))
+
+    for deferred_until, donor_ids in deferred.items():
+        User.objects.filter(pk__in=donor_ids).update(
+            is_deferred=True,
+            eligible_from=Greatest(Coalesce(F('eligible_from'), Value(deferred_until)), Value(deferred_until)),
+        )
+    if lifted:
+        User.objects.bulk_update(lifted, ['is_deferred', 'eligible_from'])
+
+
+def lift_expired_deferrals(on=None):
+    """Clear deferrals whose period has passed. Returns how many donors were lifted."""
+    from core.models import User
+
+    on = on or timezone.localdate()
+    return User.objects.filter(is_deferred=True, eligible_from__lte=on).update(is_deferred=False)
+
+
+# Recomputes every donor from their donation history: the latest completed
+# donation sets the interval, and a low hemoglobin result on the latest test
+# defers the donor until the deferral period has passed.
+REBUILD_SQL = """
+WITH last_donation AS (
+    SELECT donor_id, MAX(donation_date)::date AS donated_on
+    FROM core_donation
+    WHERE status = 'completed' AND donation_date IS NOT NULL
+    GROUP BY donor_id
+),
+last_test AS (
+    SELECT DISTINCT ON (d.donor_id)
+        d.donor_id, t.hemoglobin, t.created_at::date AS tested_on
+    FROM core_bloodtest t
+    JOIN core_donation d ON d.id = t.donation_id
+    WHERE t.hemoglobin IS NOT NULL
+    ORDER BY d.donor_id, t.created_at DESC
+),
+state AS (
+    SELECT
+        u.id,
+        ld.donated_on,
+        ld.donated_on + %(interval)s AS interval_ends,
+        CASE
+            WHEN lt.hemoglobin < CASE WHEN u.gender = 'M' THEN %(min_male)s ELSE %(min_other)s END
+            THEN lt.tested_on + %(deferral)s
+        END AS deferred_until
+    FROM core_user u
+    LEFT JOIN last_donation ld ON ld.donor_id = u.id
+    LEFT JOIN last_test lt ON lt.donor_id = u.id
+)
+UPDATE core_user u
+SET last_donation_date = s.donated_on,
+    eligible_from = CASE
+        WHEN s.interval_ends IS NULL AND s.deferred_until IS NULL THEN NULL
+        ELSE GREATEST(s.interval_ends, s.deferred_until)
+    END,
+    is_deferred = COALESCE(s.deferred_until > %(today)s, FALSE)
+FROM state s
+WHERE s.id = u.id
+  AND (u.last_donation_date IS DISTINCT FROM s.donated_on
+       OR u.eligible_from IS DISTINCT FROM CASE
+           WHEN s.interval_ends IS NULL AND s.deferred_until IS NULL THEN NULL
+           ELSE GREATEST(s.interval_ends, s.deferred_until)
+       END
+       OR u.is_deferred IS DISTINCT FROM COALESCE(s.deferred_until > %(today)s, FALSE))
+"""
+
+
+def rebuild_donor_eligibility(cursor=None, today=None):
+    """Recompute eligibility for every user in one statement. Returns rows changed."""
+    params = {
+        'interval': settings.DONATION_INTERVAL_DAYS,
+        'deferral': settings.HEMOGLOBIN_DEFERRAL_DAYS,
+        'min_male': MIN_HEMOGLOBIN['M'],
+        'min_other': DEFAULT_MIN_HEMOGLOBIN,
+        'today': today or timezone.localdate(),
+    }
+    if cursor is None:
+        with connection.cursor() as cursor:
+            cursor.execute(REBUILD_SQL, params)
+            return cursor.rowcount
+    cursor.execute(REBUILD_SQL, params)
+    return cursor.rowcount
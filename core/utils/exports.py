@@ -0,0 +1,179 @@
+# core/utils/exports.py
+import csv
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date
+
+from core.models import BloodTest, Donation
+from .streaming import for_server
+
+EXPORT_FORMATS = ['csv', 'jsonl']
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+# Encoded output is handed to the server in pieces of about this size
+FLUSH_BYTES = 64 * 1024
+
+# Column name -> ORM lookup, resolved with .values() in a single joined query
+DATASETS = {
+    'donations': {
+        'model': Donation,
+        'hospital_field': 'hospital',
+        'date_field': 'created_at',
+        'columns': {
+            'donation_id': 'id',
+            'status': 'status',
+            'created_at': 'created_at',
+            'donation_date': 'donation_date',
+            'donor': 'donor__username',
+            'donor_blood_group': 'donor__blood_group',
+            'blood_request_id': 'blood_request_id',
+            'requested_blood_group': 'blood_request__blood_group',
+            'urgency': 'blood_request__urgency',
+            'hospital': 'hospital__name',
+            'ai_recommended_hospital': 'ai_recommended_hospital',
+            'blood_test_id': 'blood_test__id',
+            'hemoglobin': 'blood_test__hemoglobin',
+            'life_saved': 'blood_test__life_saved',
+        },
+    },
+    'blood_tests': {
+        'model': BloodTest,
+        'hospital_field': 'tested_by',
+        'date_field': 'created_at',
+        'columns': {
+            'blood_test_id': 'id',
+            'donation_id': 'donation_id',
+            'donor': 'donation__donor__username',
+            'donor_blood_group': 'donation__donor__blood_group',
+            'donor_gender': 'donation__donor__gender',
+            'sugar_level': 'sugar_level',
+            'hemoglobin': 'hemoglobin',
+            'uric_acid_level': 'uric_acid_level',
+            'wbc_count': 'wbc_count',
+            'rbc_count': 'rbc_count',
+            'platelet_count': 'platelet_count',
+            'disease_prediction': 'disease_prediction',
+            'prediction_confidence': 'prediction_confidence',
+            'life_saved': 'life_saved',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+    },
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _day_start(value, name):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ExportError(f"{name} must be a date in YYYY-MM-DD format")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(dataset, hospital=None, date_from=None, date_to=None):
+    """
+    Rows of `dataset` as a .values() queryset, optionally limited to one hospital
+    and to an inclusive range of YYYY-MM-DD dates
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown export '{dataset}', expected one of {', '.join(DATASETS)}")
+    spec = DATASETS[dataset]
+    queryset = spec['model'].objects.all()
+    if hospital is not None:
+        queryset = queryset.filter(**{spec['hospital_field']: hospital})
+    if date_from:
+        queryset = queryset.filter(**{f"{spec['date_field']}__gte": _day_start(date_from, 'from')})
+    if date_to:
+        end = _day_start(date_to, 'to') + timedelta(days=1)
+        queryset = queryset.filter(**{f"{spec['date_field']}__lt": end})
+    columns = spec['columns']
+    return queryset.order_by(spec['date_field'], 'pk').values_list(*columns.values()), list(columns)
+
+
+class _Line:
+    """File-like sink that hands back whatever csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def encode_rows(rows, columns, fmt):
+    """Yield one encoded line per row, header first for CSV"""
+    if fmt == 'csv':
+        writer = csv.writer(_Line())
+        yield writer.writerow(columns).encode('utf-8')
+        for row in rows:
+            yield writer.writerow(row).encode('utf-8')
+    elif fmt == 'jsonl':
+        encoder = DjangoJSONEncoder(separators=(',', ':'), ensure_ascii=False)
+        for row in rows:
+            yield (encoder.encode(dict(zip(columns, row))) + '\n').encode('utf-8')
+    else:
+        raise ExportError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+
+def buffered(lines, size=FLUSH_BYTES):
+    """Group small lines into larger pieces so each write to the client is worthwhile"""
+    buffer = []
+    buffered_bytes = 0
+    for line in lines:
+        buffer.append(line)
+        buffered_bytes += len(line)
+        if buffered_bytes >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered_bytes = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(pieces, level=6):
+    """Compress a byte stream as a single gzip member, piece by piece"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for piece in pieces:
+        compressed = compressor.compress(piece)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def streaming_export(request, dataset, fmt='csv', hospital=None, date_from=None, date_to=None):
+    """
+    Stream an export as a download with bounded memory.
+
+    Rows come from a server-side cursor EXPORT_CHUNK_SIZE at a time and are encoded
+    and, when the client accepts it, gzip-compressed as they are produced.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    queryset, columns = export_queryset(dataset, hospital, date_from, date_to)
+
+    pieces = buffered(encode_rows(queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE), columns, fmt))
+    django_request = getattr(request, '_request', request)
+    compress = 'gzip' in django_request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if compress:
+        pieces = gzipped(pieces)
+    pieces = for_server(request, pieces)
+
+    content_type = 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(pieces, content_type=content_type)
+    stamp = timezone.localdate().isoformat()
+    response['Content-Disposition'] = f'attachment; filename="{dataset}-{stamp}.{fmt}"'
+    response['Cache-Control'] = 'no-store'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,103 @@
+# core/utils/geo.py
+from math import radians, sin, cos, sqrt, atan2, floor
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    lat1_rad, lng1_rad, lat2_rad, lng2_rad = map(radians, [lat1, lng1, lat2, lng2])
+    dlat = lat2_rad - lat1_rad
+    dlng = lng2_rad - lng1_rad
+    a = sin(dlat / 2) ** 2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlng / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def cell_for(lat, lng, size):
+    """(row, col) of the fixed `size`-degree grid cell containing a point"""
+    return int(floor((lat + 90) / size)), int(floor((lng + 180) / size))
+
+
+def cell_key(row, col):
+    return f"{row}_{col}"
+
+
+def parse_cell_key(key):
+    row, col = key.split('_')
+    return int(row), int(col)
+
+
+def cell_bounds(row, col, size):
+    """(min_lat, min_lng, max_lat, max_lng) of a grid cell"""
+    return row * size - 90, col * size - 180, (row + 1) * size - 90, (col + 1) * size - 180
+
+
+def cells_in_bbox(min_lat, min_lng, max_lat, max_lng, size):
+    """All grid cells overlapping a bounding box, row by row"""
+    min_row, min_col = cell_for(min_lat, min_lng, size)
+    max_row, max_col = cell_for(max_lat, max_lng, size)
+    return [(row, col) for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1)]
+
+
+def parse_bbox(value):
+    """Parse a GeoJSON-ordered 'min_lng,min_lat,max_lng,max_lat' string"""
+    min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(','))
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError('bbox must be min_lng,min_lat,max_lng,max_lat within valid ranges')
+    return min_lat, min_lng, max_lat, max_lng
+
+
+# Donor search grid (User.geo_cell): cells of DONOR_CELL_DEGREES, numbered row-major
+DONOR_CELL_DEGREES = 0.1
+DONOR_GRID_COLUMNS = int(round(360 / DONOR_CELL_DEGREES))
+DONOR_GRID_ROWS = int(round(180 / DONOR_CELL_DEGREES))
+KM_PER_DEGREE = 111.195
+
+
+def donor_cell(lat, lng):
+    """User.geo_cell for a location, or None without one"""
+    if lat is None or lng is None:
+        return None
+    row, col = cell_for(lat, lng, DONOR_CELL_DEGREES)
+    return min(row, DONOR_GRID_ROWS - 1) * DONOR_GRID_COLUMNS + col % DONOR_GRID_COLUMNS
+
+
+def donor_cells_in_ring(lat, lng, inner, outer):
+    """
+    geo_cell ids whose Chebyshev distance from the cell containing (lat, lng) is
+    between `inner` and `outer` rings inclusive. Longitude wraps at the antimeridian.
+    """
+    row, col = cell_for(lat, lng, DONOR_CELL_DEGREES)
+    cells = set()
+    for r in range(max(row - outer, 0), min(row + outer, DONOR_GRID_ROWS - 1) + 1):
+        for c in range(col - outer, col + outer + 1):
+            if max(abs(r - row), abs(c - col)) >= inner:
+                cells.add(r * DONOR_GRID_COLUMNS + c % DONOR_GRID_COLUMNS)
+    return cells
+
+
+def ring_coverage_km(lat, rings):
+    """
+    Distance from (lat, ·) that is guaranteed to be inside `rings` rings around its
+    cell: any point in an unscanned cell is at least this far away.
+    """
+    if rings <= 0:
+        return 0.0
+    # Cells are narrowest on the side of the scanned band nearest a pole
+    edge_lat = min(abs(lat) + rings * DONOR_CELL_DEGREES, 90.0)
+    return rings * DONOR_CELL_DEGREES * KM_PER_DEGREE * max(cos(radians(edge_lat)), 0.0)
+
+
+# Same arithmetic as donor_cell, for every user at once
+DONOR_CELL_SQL = f"""
+UPDATE core_user
+SET geo_cell = LEAST(FLOOR((location_lat + 90) / {DONOR_CELL_DEGREES})::int, {DONOR_GRID_ROWS - 1}) * {DONOR_GRID_COLUMNS}
+             + MOD(FLOOR((location_long + 180) / {DONOR_CELL_DEGREES})::int, {DONOR_GRID_COLUMNS})
+WHERE location_lat IS NOT NULL AND location_long IS NOT NULL
+"""
+
+
+def backfill_donor_cells(cursor):
+    """Recompute User.geo_cell for every user with a location"""
+    cursor.execute(DONOR_CELL_SQL)
+    return cursor.rowcount
@@ -0,0 +1,337 @@
+# core/utils/http_gateway.py
+"""
+Single exit point for calls to third-party HTTP services (OpenAI, Google Maps).
+
+Every upstream gets a keep-alive connection pool shared by the whole process, a
+circuit breaker, and retries with full jitter. Timeouts are cut down to whatever
+is left of the current request's budget (see RequestDeadlineMiddleware), so a
+slow upstream can never hold a request past its deadline. While a breaker is
+open, calls fail immediately with UpstreamUnavailable and callers use their
+local fallback.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain
+
+import requests
+from django.conf import settings
+from openai import OpenAI, RateLimitError
+from requests.adapters import HTTPAdapter
+
+from .metrics import register_metrics
+from .rate_limit import Throttled, current_traffic_class, openai_limiter
+
+logger = logging.getLogger(__name__)
+
+# Monotonic time by which the current unit of work must finish, if any
+_deadline = ContextVar('outbound_deadline', default=None)
+
+# Never start an attempt with less time than this left
+MIN_ATTEMPT_SECONDS = 0.5
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class UpstreamUnavailable(UpstreamError):
+    """The breaker is open or there is no time left; use the fallback"""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    pass
+
+
+class RateLimited(UpstreamUnavailable):
+    """No token from the shared rate limiter in time; fall back without calling out"""
+
+
+# ----------------------------------------------------------------------
+# Deadlines
+# ----------------------------------------------------------------------
+
+@contextmanager
+def deadline(seconds):
+    """Bound every outbound call made inside the block to `seconds` from now"""
+    current = _deadline.get()
+    new = time.monotonic() + seconds
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget():
+    """Seconds left before the current deadline, or None without one"""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+class RequestDeadlineMiddleware:
+    """Give each HTTP request REQUEST_BUDGET_SECONDS for its outbound calls"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with deadline(settings.REQUEST_BUDGET_SECONDS):
+            return self.get_response(request)
+
+
+# ----------------------------------------------------------------------
+# Circuit breaker
+# ----------------------------------------------------------------------
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds, then lets a single trial call through (half-open).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self.stats = {'calls': 0, 'failures': 0, 'short_circuited': 0, 'opened': 0}
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.stats['short_circuited'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats['calls'] += 1
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['failures'] += 1
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats['opened'] += 1
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, state=self.state, consecutive_failures=self.failures)
+
+
+# ----------------------------------------------------------------------
+# Upstreams
+# ----------------------------------------------------------------------
+
+class Upstream:
+    def __init__(self, name, timeout=10.0, retries=1, backoff=0.25, failure_threshold=5,
+                 reset_timeout=30.0, pool_size=10):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def attempt_timeout(self):
+        """Timeout for the next attempt, trimmed to the remaining request budget"""
+        left = remaining_budget()
+        if left is None:
+            return self.timeout
+        if left < MIN_ATTEMPT_SECONDS:
+            raise DeadlineExceeded(f"No time left in the request budget for {self.name}")
+        return min(self.timeout, left)
+
+    def sleep_before_retry(self, attempt):
+        # Full jitter keeps retrying workers from stampeding a recovering upstream
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        left = remaining_budget()
+        if left is not None and left - delay < MIN_ATTEMPT_SECONDS:
+            raise DeadlineExceeded(f"No time left to retry {self.name}")
+        time.sleep(delay)
+
+    def call(self, func):
+        """
+        Run func(timeout) under this upstream's breaker, deadline and retry policy.
+
+        func should raise for failures worth retrying; its return value is passed back.
+        """
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise UpstreamUnavailable(f"{self.name} circuit is open") from last_error
+            if attempt:
+                self.sleep_before_retry(attempt - 1)
+            try:
+                result = func(self.attempt_timeout())
+            except (DeadlineExceeded, RateLimited):
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                last_error = e
+                logger.warning(f"{self.name} call failed (attempt {attempt + 1}): {str(e)}")
+                continue
+            self.breaker.record_success()
+            return result
+        raise UpstreamError(f"{self.name} failed after {self.retries + 1} attempts: {last_error}") from last_error
+
+    def request(self, method, url, **kwargs):
+        """An HTTP request through the pooled session; 5xx and 429 count as failures"""
+        def send(timeout):
+            response = self.session.request(method, url, timeout=timeout, **kwargs)
+            if response.status_code in RETRY_STATUS_CODES:
+                raise UpstreamError(f"{self.name} returned {response.status_code}")
+            return response
+        return self.call(send)
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def upstream(name):
+    """The process-wide Upstream for `name`, configured from OUTBOUND_HTTP"""
+    if name not in _upstreams:
+        with _upstreams_lock:
+            if name not in _upstreams:
+                _upstreams[name] = Upstream(name, **settings.OUTBOUND_HTTP.get(name, {}))
+    return _upstreams[name]
+
+
+def get_json(name, url, **kwargs):
+    return upstream(name).request('GET', url, **kwargs).json()
+
+
+# ----------------------------------------------------------------------
+# OpenAI
+# ----------------------------------------------------------------------
+
+_openai_client = None
+
+
+def openai_client():
+    """One OpenAI client (and so one HTTP connection pool) per process"""
+    global _openai_client
+    if _openai_client is None:
+        with _upstreams_lock:
+            if _openai_client is None:
+                # Retries and timeouts are handled by the gateway, not the SDK
+                _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
+    return _openai_client
+
+
+def openai_available():
+    return bool(settings.OPENAI_API_KEY)
+
+
+def _openai_admit():
+    """Take a token from the cluster-wide OpenAI budget for one HTTP attempt"""
+    max_wait = openai_limiter.config.get('max_wait', {}).get(current_traffic_class(), 5.0)
+    left = remaining_budget()
+    if left is not None:
+        # Never queue past the request's own budget
+        max_wait = max(min(max_wait, left - MIN_ATTEMPT_SECONDS), 0)
+    try:
+        openai_limiter.acquire(max_wait=max_wait)
+    except Throttled as e:
+        raise RateLimited(str(e)) from e
+
+
+def _openai_create(timeout, **kwargs):
+    _openai_admit()
+    try:
+        return openai_client().with_options(timeout=timeout).chat.completions.create(**kwargs)
+    except RateLimitError as e:
+        # A 429 means the account is over its limit for every worker; back off cluster-wide
+        try:
+            retry_after = float(e.response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            retry_after = 1.0
+        openai_limiter.penalize(retry_after)
+        raise
+
+
+def openai_chat(messages, model='gpt-3.5-turbo', **params):
+    """Text of a chat completion; raises UpstreamError when the caller should fall back"""
+    if not openai_available():
+        raise UpstreamUnavailable('OpenAI API key is not configured')
+
+    def create(timeout):
+        response = _openai_create(timeout, model=model, messages=messages, **params)
+        return response.choices[0].message.content.strip()
+    return upstream('openai').call(create)
+
+
+def openai_chat_stream(messages, model='gpt-3.5-turbo', **params):
+    """
+    Yield the text of a chat completion as it is generated.
+
+    Opening the stream and reading the first token go through the breaker, deadline
+    and retry policy like openai_chat; once text has been yielded a failure can no
+    longer be retried and surfaces as UpstreamError.
+    """
+    if not openai_available():
+        raise UpstreamUnavailable('OpenAI API key is not configured')
+    gateway = upstream('openai')
+
+    def open_stream(timeout):
+        stream = _openai_create(timeout, model=model, messages=messages, stream=True, **params)
+        chunks = iter(stream)
+        return chunks, next(chunks, None)
+    chunks, first = gateway.call(open_stream)
+
+    try:
+        for chunk in chain([first] if first is not None else [], chunks):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        gateway.breaker.record_failure()
+        raise UpstreamError(f"openai stream interrupted: {str(e)}") from e
+
+
+def gateway_stats():
+    return {name: up.breaker.snapshot() for name, up in list(_upstreams.items())}
+
+
+register_metrics('http_gateway', gateway_stats)
@@ -0,0 +1,118 @@
+# core/utils/images.py
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_PICTURE = 'profile_pictures/default.png'
+
+# Square variants generated for every profile picture, in pixels
+PROFILE_PICTURE_SIZES = {
+    'thumb': 96,
+    'card': 240,
+    'profile': 480,
+}
+
+# Longest edge kept for the re-encoded original
+MAX_ORIGINAL_EDGE = 1024
+
+# Leading bytes of the formats we accept, checked without decoding the upload
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+
+
+def validate_image_upload(upload):
+    """Cheap request-time check: size limit and file signature only, no decoding"""
+    if upload.size > settings.PROFILE_PICTURE_MAX_UPLOAD_BYTES:
+        limit = settings.PROFILE_PICTURE_MAX_UPLOAD_BYTES // (1024 * 1024)
+        raise ValidationError(f"Profile picture must be smaller than {limit} MB.")
+
+    head = upload.read(12)
+    upload.seek(0)
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return
+    if not any(head.startswith(signature) for signature, _ in _SIGNATURES):
+        raise ValidationError("Upload a valid JPEG, PNG, GIF or WebP image.")
+
+
+def _encode_jpeg(image, quality=85):
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _save_if_missing(path, content):
+    # Content-addressed names make an existing file with the same name identical
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content))
+    return path
+
+
+def process_profile_picture(user_id, upload):
+    """
+    Validate and re-encode an uploaded profile picture, then write its size variants.
+
+    All generated files are named after a hash of the re-encoded image, so they never
+    change once written and can be served with long-lived cache headers. `upload` is
+    the storage path the request saved; if the user has uploaded again since, this
+    run leaves the newer picture alone.
+    """
+    from core.models import User
+
+    try:
+        with default_storage.open(upload, 'rb') as fh:
+            image = Image.open(fh)
+            image.verify()
+        with default_storage.open(upload, 'rb') as fh:
+            image = Image.open(fh)
+            image.load()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, ValueError) as e:
+        logger.warning(f"Rejected profile picture {upload} for user {user_id}: {str(e)}")
+        User.objects.filter(pk=user_id, profile_picture=upload).update(
+            profile_picture=DEFAULT_PROFILE_PICTURE, profile_picture_variants={}
+        )
+        default_storage.delete(upload)
+        return None
+
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    image.thumbnail((MAX_ORIGINAL_EDGE, MAX_ORIGINAL_EDGE), Image.LANCZOS)
+    original = _encode_jpeg(image)
+    digest = hashlib.sha256(original).hexdigest()[:16]
+
+    original_path = _save_if_missing(f"profile_pictures/{digest}.jpg", original)
+    variants = {}
+    for name, size in PROFILE_PICTURE_SIZES.items():
+        variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        variants[name] = _save_if_missing(f"profile_pictures/thumbs/{digest}_{size}.jpg", _encode_jpeg(variant, quality=80))
+
+    updated = User.objects.filter(pk=user_id, profile_picture=upload).update(
+        profile_picture=original_path, profile_picture_variants=variants
+    )
+    if upload != original_path:
+        default_storage.delete(upload)
+    return variants if updated else None
+
+
+def profile_picture_url(user, size=None, request=None):
+    """URL of `user`'s picture in the requested variant, falling back to the original"""
+    return picture_url(user.profile_picture.name, user.profile_picture_variants, size, request)
+
+
+def picture_url(name, variants, size=None, request=None):
+    """profile_picture_url() from the stored picture name and variants, as from .values()"""
+    if not name:
+        return None
+    path = (variants or {}).get(size) if size else None
+    url = default_storage.url(path or name)
+    return request.build_absolute_uri(url) if request else url
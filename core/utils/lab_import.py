@@ -0,0 +1,273 @@
+# core/utils/lab_import.py
+import codecs
+import csv
+import json
+import math
+import uuid
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import BloodTest, ChatRoom, DonorHospitalAssignment
+from core.tasks import PRIORITY_BULK, enqueue
+from core.utils.ai_prediction import ANALYTE_FIELDS
+from core.utils.eligibility import record_blood_tests
+
+# Header spellings seen in lab exports, mapped to BloodTest fields
+COLUMN_ALIASES = {
+    'assignment': 'assignment_id',
+    'assignment_id': 'assignment_id',
+    'donation': 'donation_id',
+    'donation_id': 'donation_id',
+    'sugar': 'sugar_level',
+    'sugar_level': 'sugar_level',
+    'glucose': 'sugar_level',
+    'blood_sugar': 'sugar_level',
+    'hemoglobin': 'hemoglobin',
+    'haemoglobin': 'hemoglobin',
+    'hb': 'hemoglobin',
+    'hgb': 'hemoglobin',
+    'uric_acid': 'uric_acid_level',
+    'uric_acid_level': 'uric_acid_level',
+    'wbc': 'wbc_count',
+    'wbc_count': 'wbc_count',
+    'rbc': 'rbc_count',
+    'rbc_count': 'rbc_count',
+    'platelets': 'platelet_count',
+    'platelet_count': 'platelet_count',
+    'plt': 'platelet_count',
+}
+
+# Values outside these bounds are rejected as data entry or unit errors
+PLAUSIBLE_RANGES = {
+    'sugar_level': (10, 1500),          # mg/dL
+    'hemoglobin': (2, 25),              # g/dL
+    'uric_acid_level': (0.5, 25),       # mg/dL
+    'wbc_count': (500, 200000),         # cells/mcL
+    'rbc_count': (1, 10),               # million cells/mcL
+    'platelet_count': (5000, 2000000),  # platelets/mcL
+}
+
+# Counts that lab exports commonly report in thousands per mcL (e.g. WBC 7.2, PLT 250)
+THOUSANDS_BELOW = {
+    'wbc_count': 500,
+    'platelet_count': 5000,
+}
+
+# Cap on rows listed in a report; the failed count is always complete
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = ['csv', 'jsonl']
+
+
+class LabImportError(ValueError):
+    pass
+
+
+def normalize_analytes(data, thousands=False):
+    """
+    Validate and normalize the six analyte fields present in `data`.
+
+    Returns {field: float} for the fields that carry a value; blank cells are
+    treated as not measured. With `thousands`, counts below THOUSANDS_BELOW are
+    read as thousands per mcL; only lab exports report them that way. Raises
+    LabImportError listing every invalid field.
+    """
+    values = {}
+    errors = []
+    for field in ANALYTE_FIELDS:
+        if field not in data:
+            continue
+        raw = data[field]
+        if raw is None or (isinstance(raw, str) and not raw.strip()):
+            continue
+        try:
+            value = float(str(raw).strip().replace(',', '')) if isinstance(raw, str) else float(raw)
+        except (TypeError, ValueError):
+            errors.append(f"{field}: '{raw}' is not a number")
+            continue
+        if not math.isfinite(value):
+            errors.append(f"{field}: '{raw}' is not a number")
+            continue
+        if thousands and field in THOUSANDS_BELOW and 0 < value < THOUSANDS_BELOW[field]:
+            value *= 1000
+        low, high = PLAUSIBLE_RANGES[field]
+        if not low <= value <= high:
+            errors.append(f"{field}: {raw} is outside {low}-{high}")
+            continue
+        values[field] = round(value, 3)
+    if errors:
+        raise LabImportError('; '.join(errors))
+    return values
+
+
+def _canonical(record):
+    row = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        field = COLUMN_ALIASES.get(str(key).strip().lower().replace(' ', '_').replace('-', '_'))
+        if field:
+            row[field] = value.strip() if isinstance(value, str) else value
+    return row
+
+
+def read_records(stream, fmt):
+    """Yield (line number, record) from a binary CSV or JSONL stream, one row at a time"""
+    text = codecs.iterdecode(stream, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, LabImportError(f"invalid JSON: {e}")
+                continue
+            yield line_no, record if isinstance(record, dict) else LabImportError('expected a JSON object')
+    else:
+        raise LabImportError(f"Unsupported format '{fmt}', expected one of {', '.join(IMPORT_FORMATS)}")
+
+
+def guess_format(filename, default='csv'):
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return default
+
+
+class LabResultImporter:
+    """
+    Import a lab export for one hospital.
+
+    Rows are parsed lazily and handled `chunk_size` at a time: each chunk is
+    validated, matched to the hospital's assignments with one query, and upserted
+    into BloodTest with INSERT ... ON CONFLICT inside its own transaction, so a
+    bad chunk never rolls back the ones before it. Predictions are queued as
+    background tasks once a chunk commits.
+    """
+
+    def __init__(self, hospital, chunk_size=500, dry_run=False, progress=None):
+        self.hospital = hospital
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.progress = progress or (lambda report: None)
+        self.report = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    def error(self, line, message):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'line': line, 'error': message})
+
+    def run(self, stream, fmt='csv'):
+        records = read_records(stream, fmt)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+            self.progress(self.report)
+        self.report['errors'].sort(key=lambda error: error['line'])
+        return self.report
+
+    def _validate(self, chunk):
+        rows = []
+        for line, record in chunk:
+            self.report['rows'] += 1
+            if isinstance(record, Exception):
+                self.error(line, str(record))
+                continue
+            row = _canonical(record)
+            key = 'assignment_id' if row.get('assignment_id') else 'donation_id'
+            if not row.get(key):
+                self.error(line, 'missing assignment_id or donation_id')
+                continue
+            try:
+                row[key] = uuid.UUID(str(row[key]))
+            except ValueError:
+                self.error(line, f"{key}: '{row[key]}' is not a valid id")
+                continue
+            try:
+                values = normalize_analytes(row, thousands=True)
+            except LabImportError as e:
+                self.error(line, str(e))
+                continue
+            if not values:
+                self.error(line, 'no analyte values')
+                continue
+            rows.append((line, row, values))
+        return rows
+
+    def _match(self, rows):
+        """Map each row to a donation of this hospital, by assignment or donation id"""
+        assignment_ids = [row['assignment_id'] for _, row, _ in rows if row.get('assignment_id')]
+        donation_ids = [row['donation_id'] for _, row, _ in rows if not row.get('assignment_id')]
+        by_assignment = {}
+        donations = set()
+        assignments = DonorHospitalAssignment.objects.filter(hospital=self.hospital).filter(
+            Q(id__in=assignment_ids) | Q(donation_id__in=donation_ids)
+        )
+        for assignment_id, donation_id in assignments.values_list('id', 'donation_id'):
+            by_assignment[assignment_id] = donation_id
+            donations.add(donation_id)
+
+        matched = {}
+        for line, row, values in rows:
+            if row.get('assignment_id'):
+                donation_id = by_assignment.get(row['assignment_id'])
+            else:
+                donation_id = row['donation_id'] if row['donation_id'] in donations else None
+            if donation_id is None:
+                self.error(line, 'no matching assignment for this hospital')
+                continue
+            # A later row for the same donation wins
+            matched[donation_id] = (line, values)
+        return matched
+
+    def import_chunk(self, chunk):
+        matched = self._match(self._validate(chunk))
+        if not matched:
+            return
+
+        existing = set(
+            BloodTest.objects.filter(donation_id__in=list(matched)).values_list('donation_id', flat=True)
+        )
+        self.report['created'] += len(matched) - len(existing)
+        self.report['updated'] += len(existing)
+        if self.dry_run:
+            return
+
+        # Rows only overwrite the analytes they carry, so upsert each column set separately
+        groups = {}
+        now = timezone.now()
+        for donation_id, (_, values) in matched.items():
+            groups.setdefault(tuple(sorted(values)), []).append(
+                BloodTest(donation_id=donation_id, tested_by=self.hospital, created_at=now, updated_at=now, **values)
+            )
+        tests = [test for group in groups.values() for test in group]
+        with transaction.atomic():
+            for fields, group in groups.items():
+                BloodTest.objects.bulk_create(
+                    group,
+                    update_conflicts=True,
+                    unique_fields=['donation'],
+                    update_fields=list(fields) + ['tested_by', 'updated_at'],
+                )
+            ChatRoom.objects.filter(donation_id__in=list(matched), is_active=True).update(is_active=False)
+            record_blood_tests(tests)
+            transaction.on_commit(lambda: self._queue_predictions(list(matched)))
+
+    def _queue_predictions(self, donation_ids):
+        for blood_test_id in BloodTest.objects.filter(donation_id__in=donation_ids).values_list('id', flat=True):
+            enqueue(
+                'predict_blood_test',
+                {'blood_test_id': str(blood_test_id)},
+                priority=PRIORITY_BULK,
+                dedupe_key=f'predict_blood_test:{blood_test_id}',
+            )
+
@@ -0,0 +1,97 @@
+# core/utils/map_layer.py
+import gzip
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import cache_version
+from .geo import cell_for, cell_key
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MAP_LAYER_NAMESPACE = 'map_layer'
+
+# Superseded layers are never read again; let them age out
+MAP_LAYER_TIMEOUT = 24 * 60 * 60
+
+
+def _artifact(payload):
+    """Encode a GeoJSON object once, in every encoding we serve"""
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    artifact = {
+        'etag': hashlib.sha256(body).hexdigest()[:32],
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        artifact['br'] = brotli.compress(body, quality=11)
+    return artifact
+
+
+def _feature(hospital):
+    return {
+        'type': 'Feature',
+        'id': str(hospital['id']),
+        'geometry': {
+            'type': 'Point',
+            'coordinates': [hospital['location_long'], hospital['location_lat']],
+        },
+        'properties': {
+            'name': hospital['name'],
+            'address': hospital['address'],
+            'phone_number': hospital['phone_number'],
+        },
+    }
+
+
+def build_hospital_layer():
+    """
+    Precompute the hospital map layer: one GeoJSON FeatureCollection for the whole
+    country plus one per MAP_TILE_SIZE-degree grid cell that contains hospitals.
+    """
+    from core.models import Hospital
+
+    size = settings.MAP_TILE_SIZE
+    features = []
+    tiles = {}
+    hospitals = Hospital.objects.order_by('name').values(
+        'id', 'name', 'address', 'phone_number', 'location_lat', 'location_long'
+    )
+    for hospital in hospitals.iterator(chunk_size=2000):
+        feature = _feature(hospital)
+        features.append(feature)
+        key = cell_key(*cell_for(hospital['location_lat'], hospital['location_long'], size))
+        tiles.setdefault(key, []).append(feature)
+
+    layer = {
+        'tile_size': size,
+        'full': _artifact({'type': 'FeatureCollection', 'features': features}),
+        'tiles': {
+            key: _artifact({'type': 'FeatureCollection', 'features': tile_features})
+            for key, tile_features in tiles.items()
+        },
+    }
+    layer['index'] = {
+        key: {'etag': artifact['etag'], 'count': len(tiles[key])}
+        for key, artifact in layer['tiles'].items()
+    }
+    logger.info(f"Built hospital map layer: {len(features)} hospitals in {len(tiles)} tiles")
+    return layer
+
+
+def get_hospital_layer():
+    """The current layer, rebuilt on first use after a Hospital change"""
+    key = f'{MAP_LAYER_NAMESPACE}:{cache_version(MAP_LAYER_NAMESPACE)}:hospitals'
+    layer = cache.get(key)
+    if layer is None:
+        layer = build_hospital_layer()
+        cache.set(key, layer, MAP_LAYER_TIMEOUT)
+    return layer
@@ -0,0 +1,27 @@
+# core/utils/metrics.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+_providers = {}
+
+
+def register_metrics(name, provider):
+    """
+    Publish `provider()` under `name` in the ops metrics endpoint.
+
+    Providers return a JSON-serializable dict and must be cheap: they run on every
+    scrape. Values are per process.
+    """
+    _providers[name] = provider
+
+
+def collect_metrics():
+    metrics = {}
+    for name, provider in sorted(_providers.items()):
+        try:
+            metrics[name] = provider()
+        except Exception as e:
+            logger.error(f"Metrics provider {name} failed: {str(e)}")
+            metrics[name] = {'error': str(e)}
+    return metrics
@@ -0,0 +1,114 @@
+# core/utils/notify_waves.py
+"""
+Blood request fan-out in waves.
+
+Instead of notifying every donor in range at once, a request notifies its
+closest donors, waits, and only reaches further out when nobody has come
+forward. Each wave is one notify_blood_request_donors task that schedules the
+next one; the chain ends when the pledged donations cover units_required, the
+request is closed, the donor pool within range is exhausted or the wave limit is
+reached. Waves grow with the units still needed and with every wave that goes
+unanswered, and urgent requests wait less between waves.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import BloodRequest, Donation, Notification
+from .donor_search import nearest_donor_ids
+from .urgency import PRIORITY_NAMES, search_radius_km
+
+logger = logging.getLogger(__name__)
+
+# Requests in these states are still looking for donors
+OPEN_STATUSES = ['pending', 'donating']
+
+
+def units_pledged(blood_request):
+    """Donations for the request that have not been cancelled"""
+    return Donation.objects.filter(blood_request=blood_request).exclude(status='cancelled').count()
+
+
+def wave_size(units_missing, wave):
+    """Donors to notify in wave `wave` (0-based) for `units_missing` units"""
+    return settings.DONOR_NOTIFY_WAVE_SIZE * units_missing * settings.DONOR_NOTIFY_WAVE_GROWTH ** wave
+
+
+def wave_interval(priority):
+    """How long to wait for responses before the next wave"""
+    intervals = settings.DONOR_NOTIFY_WAVE_INTERVAL
+    return timedelta(seconds=intervals.get(PRIORITY_NAMES.get(priority), intervals['medium']))
+
+
+def notify_wave(blood_request, notified, wave, units_missing):
+    """Notify the next closest donors not in `notified`; returns their ids"""
+    size = min(wave_size(units_missing, wave), settings.DONOR_NOTIFY_COUNT - len(notified))
+    if size <= 0:
+        return []
+
+    radius = search_radius_km(blood_request.priority, settings.DONOR_NOTIFY_RADIUS_KM)
+    # Ask for the already notified donors too, since they are the closest ones
+    nearest = nearest_donor_ids(
+        blood_request.location_lat, blood_request.location_long, k=len(notified) + size,
+        max_radius_km=radius, blood_group=blood_request.blood_group, exclude=[blood_request.patient_id]
+    )
+    already = set(notified)
+    donor_ids = [str(donor_id) for _, donor_id in nearest if str(donor_id) not in already][:size]
+
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=donor_id,
+            notification_type='blood_request',
+            title='Blood Request Nearby',
+            message=f'A patient nearby needs {blood_request.blood_group} blood. Can you help?',
+            related_id=blood_request.id
+        )
+        for donor_id in donor_ids
+    ], batch_size=1000)
+    if donor_ids:
+        BloodRequest.objects.filter(pk=blood_request.pk, first_notified_at__isnull=True).update(
+            first_notified_at=timezone.now()
+        )
+    return donor_ids
+
+
+def dispatch(payload):
+    """
+    Run one step of the wave chain for payload['blood_request_id'].
+
+    Returns (blood_request, payload for the next step); the payload is None when
+    the chain is finished. The payload carries the wave number, the donors
+    notified so far and the pledge count seen at the previous step.
+    """
+    blood_request = BloodRequest.objects.filter(
+        pk=payload['blood_request_id'], status__in=OPEN_STATUSES
+    ).first()
+    if blood_request is None:
+        return None, None
+
+    wave = payload.get('wave', 0)
+    notified = payload.get('notified', [])
+    pledged = units_pledged(blood_request)
+    if pledged >= blood_request.units_required:
+        logger.info(f"Blood request {blood_request.id} covered after {wave} waves "
+                    f"({len(notified)} donors notified)")
+        return blood_request, None
+
+    if wave and pledged > payload.get('pledged', 0):
+        # Donors from the last wave are responding; give them another interval
+        # before reaching further out
+        return blood_request, dict(payload, pledged=pledged)
+
+    if wave >= settings.DONOR_NOTIFY_MAX_WAVES:
+        logger.info(f"Blood request {blood_request.id} reached the last wave "
+                    f"({len(notified)} donors notified, {pledged}/{blood_request.units_required} units)")
+        return blood_request, None
+
+    donor_ids = notify_wave(blood_request, notified, wave, blood_request.units_required - pledged)
+    logger.info(f"Wave {wave + 1} for blood request {blood_request.id}: {len(donor_ids)} donors notified "
+                f"({blood_request.get_priority_display()})")
+    if not donor_ids:
+        return blood_request, None
+    return blood_request, dict(payload, wave=wave + 1, notified=notified + donor_ids, pledged=pledged)
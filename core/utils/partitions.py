@@ -0,0 +1,225 @@
+# core/utils/partitions.py
+"""
+Monthly range partitions for the fastest-growing tables.
+
+core_message (by timestamp) and core_notification (by created_at) can be
+converted in place into tables partitioned by calendar month (UTC), named
+<table>_pYYYY_MM, plus a <table>_default partition that catches rows outside
+every monthly range so inserts never fail. After conversion:
+
+- ensure_partitions() creates the months ahead, moving in any rows the
+  default partition caught for them; the worker runs it daily.
+- detach_partitions() removes whole months older than a cutoff with a
+  metadata-only DETACH instead of a bulk DELETE, optionally dropping them.
+
+PostgreSQL requires the partition key in the primary key, so a converted
+table's primary key is (id, <column>). The Django models keep id as their
+primary key; UUID ids stay unique in practice but the database no longer
+enforces it across partitions.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Table -> partition key column
+PARTITIONED_TABLES = {
+    'core_message': 'timestamp',
+    'core_notification': 'created_at',
+}
+
+PARTITIONS_SQL = """
+SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = %s
+ORDER BY child.relname
+"""
+
+INDEXES_SQL = """
+SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+FROM pg_index
+WHERE indrelid = %s::regclass AND NOT indisprimary
+"""
+
+FOREIGN_KEYS_SQL = """
+SELECT conname, pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = %s::regclass AND contype = 'f'
+"""
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(cursor, table):
+    """[(partition name, bound expression)] of a partitioned table"""
+    cursor.execute(PARTITIONS_SQL, [table])
+    return cursor.fetchall()
+
+
+def _create_partition(cursor, table, month, parent=None):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {_quote(partition_name(table, month))} PARTITION OF {_quote(parent or table)} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [month, add_months(month, 1)],
+    )
+
+
+def _create_partition_from_default(cursor, table, month):
+    """
+    Create a monthly partition of `table`, moving rows the default partition
+    already holds for that month into it. PostgreSQL refuses to create a
+    partition whose range has rows in the default, so the default is detached
+    for the move and re-attached afterwards, all in one transaction.
+    """
+    default = table + '_default'
+    bounds = [month, add_months(month, 1)]
+    column = _quote(PARTITIONED_TABLES[table])
+    with transaction.atomic():
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {_quote(default)} WHERE {column} >= %s AND {column} < %s)", bounds
+        )
+        if not cursor.fetchone()[0]:
+            _create_partition(cursor, table, month)
+            return 0
+        cursor.execute(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(default)}")
+        _create_partition(cursor, table, month)
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {_quote(default)} WHERE {column} >= %s AND {column} < %s RETURNING *) "
+            f"INSERT INTO {_quote(table)} SELECT * FROM moved",
+            bounds,
+        )
+        moved = cursor.rowcount
+        cursor.execute(f"ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(default)} DEFAULT")
+    logger.info(f"Moved {moved} rows of {default} into {partition_name(table, month)}")
+    return moved
+
+
+def ensure_partitions(months_ahead=None, tables=None):
+    """Create monthly partitions from this month through `months_ahead` months ahead"""
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    this_month = month_start(timezone.now())
+    created = []
+    with connection.cursor() as cursor:
+        for table in tables or PARTITIONED_TABLES:
+            if not is_partitioned(cursor, table):
+                continue
+            existing = {name for name, _ in list_partitions(cursor, table)}
+            for offset in range(months_ahead + 1):
+                month = add_months(this_month, offset)
+                if partition_name(table, month) in existing:
+                    continue
+                if table + '_default' in existing:
+                    _create_partition_from_default(cursor, table, month)
+                else:
+                    _create_partition(cursor, table, month)
+                created.append(partition_name(table, month))
+    if created:
+        logger.info(f"Created partitions {', '.join(created)}")
+    return created
+
+
+def convert_to_partitioned(table, months_ahead=None):
+    """
+    Rebuild `table` as a monthly partitioned table, copying its rows, in one
+    transaction. Writers block on the table lock until it commits.
+    """
+    column = PARTITIONED_TABLES[table]
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    new_table = f'{table}_partitioned'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            return 0
+        cursor.execute(f"LOCK TABLE {_quote(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("SELECT COUNT(*) FROM pg_constraint WHERE confrelid = %s::regclass", [table])
+        if cursor.fetchone()[0]:
+            raise ValueError(f"{table} is referenced by foreign keys and cannot be partitioned")
+
+        cursor.execute(INDEXES_SQL, [table])
+        indexes = cursor.fetchall()
+        cursor.execute(FOREIGN_KEYS_SQL, [table])
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT MIN({_quote(column)}) FROM {_quote(table)}")
+        oldest = cursor.fetchone()[0] or timezone.now()
+
+        cursor.execute(
+            f"CREATE TABLE {_quote(new_table)} (LIKE {_quote(table)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({_quote(column)})"
+        )
+        month, last = month_start(oldest), add_months(month_start(timezone.now()), months_ahead)
+        while month <= last:
+            _create_partition(cursor, table, month, parent=new_table)
+            month = add_months(month, 1)
+        cursor.execute(f"CREATE TABLE {_quote(table + '_default')} PARTITION OF {_quote(new_table)} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {_quote(new_table)} SELECT * FROM {_quote(table)}")
+        copied = cursor.rowcount
+        cursor.execute(f"DROP TABLE {_quote(table)}")
+        cursor.execute(f"ALTER TABLE {_quote(new_table)} RENAME TO {_quote(table)}")
+
+        # Recreate the primary key, indexes and foreign keys under their old names
+        cursor.execute(
+            f"ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(table + '_pkey')} "
+            f"PRIMARY KEY (id, {_quote(column)})"
+        )
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(name)} {definition}")
+
+    logger.info(f"Partitioned {table} by month on {column}, {copied} rows copied")
+    return copied
+
+
+def detach_partitions(table, before, drop=False):
+    """
+    Detach (and optionally drop) the monthly partitions of `table` that end on or
+    before the month containing `before`. Detached tables keep their rows and can
+    be archived or re-attached.
+    """
+    cutoff = month_start(before)
+    detached = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return detached
+        for name, _ in list_partitions(cursor, table):
+            prefix = f'{table}_p'
+            if not name.startswith(prefix):
+                continue
+            month = datetime.strptime(name[len(prefix):], '%Y_%m').replace(tzinfo=dt_timezone.utc)
+            if add_months(month, 1) > cutoff:
+                continue
+            cursor.execute(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}")
+            if drop:
+                cursor.execute(f"DROP TABLE {_quote(name)}")
+            detached.append(name)
+    if detached:
+        logger.info(f"{'Dropped' if drop else 'Detached'} partitions {', '.join(detached)}")
+    return detached
@@ -0,0 +1,346 @@
+# core/utils/rate_limit.py
+"""
+Cluster-wide token buckets for outbound API calls.
+
+Bucket state lives in a RateLimitBucket row and is refilled and debited in a
+single locked statement, so every worker process draws on the same budget.
+Bucket statements run on a connection of their own that commits straight
+away, so the row lock is never held for the length of the caller's
+transaction (and so of the outbound call that follows).
+Callers are split into traffic classes: interactive calls (a user waiting on
+an accept or a submit) may use the whole budget, while bulk calls (task
+backfills) must also pass their own smaller bucket and may never take the last
+`interactive_reserve` tokens. Inside a process, waiting callers queue by
+traffic class and only the head of the queue polls the database.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+TRAFFIC_CLASSES = [INTERACTIVE, BULK]
+
+# Queue order inside a process; lower goes first
+_QUEUE_PRIORITY = {INTERACTIVE: 0, BULK: 1}
+
+# Longest a queued caller sleeps before asking the database again
+MAX_POLL_SECONDS = 0.25
+
+# Metrics report bucket levels read at most this long ago
+LEVEL_SNAPSHOT_SECONDS = 15
+
+_traffic = ContextVar('outbound_traffic_class', default=INTERACTIVE)
+
+# Refill and debit in one statement; always returns the level before the debit
+TAKE_SQL = """
+WITH bucket AS (
+    SELECT name, LEAST(%(capacity)s, tokens + %(rate)s * EXTRACT(EPOCH FROM clock_timestamp() - updated_at)) AS available
+    FROM core_ratelimitbucket
+    WHERE name = %(name)s
+    FOR UPDATE
+), taken AS (
+    UPDATE core_ratelimitbucket AS b
+    SET tokens = bucket.available - %(cost)s, updated_at = clock_timestamp()
+    FROM bucket
+    WHERE b.name = bucket.name AND bucket.available - %(cost)s >= %(floor)s
+    RETURNING b.name
+)
+SELECT bucket.available, EXISTS (SELECT 1 FROM taken) FROM bucket
+"""
+
+CREATE_SQL = """
+INSERT INTO core_ratelimitbucket (name, tokens, updated_at)
+VALUES (%(name)s, %(capacity)s, clock_timestamp())
+ON CONFLICT (name) DO NOTHING
+"""
+
+PENALIZE_SQL = """
+UPDATE core_ratelimitbucket
+SET tokens = LEAST(tokens, %(tokens)s), updated_at = clock_timestamp()
+WHERE name = %(name)s
+"""
+
+LEVEL_SQL = """
+SELECT name, LEAST(%(capacity)s, tokens + %(rate)s * EXTRACT(EPOCH FROM clock_timestamp() - updated_at))
+FROM core_ratelimitbucket
+WHERE name = %(name)s
+"""
+
+
+_local = threading.local()
+
+
+class Throttled(Exception):
+    pass
+
+
+class _Denied(Exception):
+    # Rolls back a multi-bucket take when one of the buckets is short
+    def __init__(self, wait):
+        self.wait = wait
+
+
+def _bucket_connection():
+    """This thread's connection for bucket statements, kept open between takes"""
+    wrapper = getattr(_local, 'connection', None)
+    if wrapper is None:
+        wrapper = _local.connection = connections.create_connection(DEFAULT_DB_ALIAS)
+    elif wrapper.errors_occurred:
+        if not wrapper.is_usable():
+            wrapper.close()
+        wrapper.errors_occurred = False
+    return wrapper
+
+
+def close_bucket_connection():
+    wrapper = getattr(_local, 'connection', None)
+    if wrapper is not None:
+        wrapper.close()
+        _local.connection = None
+
+
+@contextmanager
+def bucket_cursor():
+    """
+    A cursor on the bucket connection whose statements commit when the block
+    exits and roll back if it raises, independent of any transaction the caller
+    has open on the default connection
+    """
+    wrapper = _bucket_connection()
+    wrapper.set_autocommit(False)
+    try:
+        with wrapper.cursor() as cursor:
+            yield cursor
+    except BaseException:
+        wrapper.rollback()
+        raise
+    else:
+        wrapper.commit()
+    finally:
+        wrapper.set_autocommit(True)
+
+
+@contextmanager
+def traffic_class(name):
+    """Mark outbound calls made inside the block as `name` traffic"""
+    token = _traffic.set(name)
+    try:
+        yield
+    finally:
+        _traffic.reset(token)
+
+
+def current_traffic_class():
+    return _traffic.get()
+
+
+class SharedTokenBucket:
+    def __init__(self, name, per_minute, capacity):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity)
+        self._created = False
+
+    def _params(self, **extra):
+        return dict(name=self.name, rate=self.rate, capacity=self.capacity, **extra)
+
+    def _ensure(self, cursor):
+        if not self._created:
+            cursor.execute(CREATE_SQL, self._params())
+            self._created = True
+
+    def take(self, cursor, cost=1.0, floor=0.0):
+        """Debit `cost` tokens, leaving at least `floor`; returns None or seconds until possible"""
+        self._ensure(cursor)
+        cursor.execute(TAKE_SQL, self._params(cost=cost, floor=floor))
+        row = cursor.fetchone()
+        if row is None:
+            # The row was deleted (e.g. a flushed database); start a full bucket again
+            self._created = False
+            return self.take(cursor, cost, floor)
+        available, taken = row
+        if taken:
+            return None
+        return max((cost + floor - available) / self.rate, 0.001)
+
+    def penalize(self, cursor, seconds):
+        """Empty the bucket so that no caller anywhere gets a token for `seconds`"""
+        self._ensure(cursor)
+        cursor.execute(PENALIZE_SQL, self._params(tokens=-self.rate * seconds))
+
+    def level(self, cursor):
+        cursor.execute(LEVEL_SQL, self._params())
+        row = cursor.fetchone()
+        return row[1] if row else self.capacity
+
+
+class RateLimiter:
+    """
+    Admission control for one upstream, configured by a settings dict:
+    requests_per_minute and burst for the shared bucket, bulk_requests_per_minute
+    and bulk_burst for bulk traffic, interactive_reserve, and max_wait per traffic
+    class. A requests_per_minute of 0 turns the limiter off.
+    """
+
+    def __init__(self, name, settings_name):
+        self.name = name
+        self.settings_name = settings_name
+        self._lock = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._buckets = None
+        self._levels = None  # (read at, {traffic class: tokens})
+        self._stats = {
+            'granted': dict.fromkeys(TRAFFIC_CLASSES, 0),
+            'throttled': dict.fromkeys(TRAFFIC_CLASSES, 0),
+            'waited': 0,
+            'wait_time_total': 0.0,
+            'max_queue_depth': 0,
+            'penalties': 0,
+        }
+
+    @property
+    def config(self):
+        return getattr(settings, self.settings_name, None) or {}
+
+    @property
+    def enabled(self):
+        return bool(self.config.get('requests_per_minute'))
+
+    def buckets(self):
+        config = self.config
+        key = (config.get('requests_per_minute'), config.get('burst'),
+               config.get('bulk_requests_per_minute'), config.get('bulk_burst'))
+        if self._buckets is None or self._buckets[0] != key:
+            self._buckets = (key, {
+                INTERACTIVE: SharedTokenBucket(self.name, config['requests_per_minute'], config.get('burst', 1)),
+                BULK: SharedTokenBucket(f'{self.name}:bulk', config.get('bulk_requests_per_minute') or config['requests_per_minute'],
+                                        config.get('bulk_burst', 1)),
+            })
+        return self._buckets[1]
+
+    def _try_take(self, traffic):
+        buckets = self.buckets()
+        shared = buckets[INTERACTIVE]
+        try:
+            with bucket_cursor() as cursor:
+                if traffic == BULK:
+                    wait = buckets[BULK].take(cursor)
+                    if wait is not None:
+                        raise _Denied(wait)
+                    wait = shared.take(cursor, floor=self.config.get('interactive_reserve', 0))
+                else:
+                    wait = shared.take(cursor)
+                if wait is not None:
+                    raise _Denied(wait)
+        except _Denied as denied:
+            return denied.wait
+        return None
+
+    def acquire(self, traffic=None, max_wait=None):
+        """
+        Block until a token is granted for `traffic`, or raise Throttled when that
+        cannot happen within `max_wait` seconds (default: the configured max_wait).
+        """
+        if not self.enabled:
+            return
+        traffic = traffic or current_traffic_class()
+        if max_wait is None:
+            max_wait = self.config.get('max_wait', {}).get(traffic, 5.0)
+        started = time.monotonic()
+        deadline = started + max_wait
+        entry = (_QUEUE_PRIORITY[traffic], next(self._seq))
+        waited = False
+
+        with self._lock:
+            heapq.heappush(self._queue, entry)
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], len(self._queue))
+        try:
+            while True:
+                with self._lock:
+                    while self._queue[0] != entry:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise Throttled(f"{self.name} {traffic} queue wait exceeded {max_wait:.1f}s")
+                        waited = True
+                        self._lock.wait(remaining)
+
+                wait = self._try_take(traffic)
+                if wait is None:
+                    break
+                remaining = deadline - time.monotonic()
+                if wait > remaining:
+                    # Not worth queueing for: fail now instead of after the wait
+                    raise Throttled(f"{self.name} {traffic} budget exhausted for {wait:.1f}s")
+                waited = True
+                time.sleep(min(wait, MAX_POLL_SECONDS))
+        except Throttled:
+            with self._lock:
+                self._stats['throttled'][traffic] += 1
+            raise
+        finally:
+            with self._lock:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._lock.notify_all()
+
+        with self._lock:
+            self._stats['granted'][traffic] += 1
+            if waited:
+                self._stats['waited'] += 1
+                self._stats['wait_time_total'] += time.monotonic() - started
+
+    def penalize(self, seconds):
+        """Called on an upstream 429 so that every worker backs off, not just this one"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stats['penalties'] += 1
+        try:
+            with bucket_cursor() as cursor:
+                self.buckets()[INTERACTIVE].penalize(cursor, seconds)
+        except Exception as e:
+            logger.warning(f"Could not penalize {self.name} bucket: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'granted': dict(self._stats['granted']),
+                'throttled': dict(self._stats['throttled']),
+                'waited': self._stats['waited'],
+                'wait_time_mean': self._stats['wait_time_total'] / self._stats['waited'] if self._stats['waited'] else 0.0,
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self._stats['max_queue_depth'],
+                'penalties': self._stats['penalties'],
+                'enabled': self.enabled,
+            }
+        if self.enabled:
+            read_at, stats['tokens'] = self._level_snapshot()
+            stats['tokens_age'] = time.monotonic() - read_at
+        return stats
+
+    def _level_snapshot(self):
+        """Bucket levels for metrics, read from the database at most every LEVEL_SNAPSHOT_SECONDS"""
+        snapshot = self._levels
+        if snapshot is None or time.monotonic() - snapshot[0] > LEVEL_SNAPSHOT_SECONDS:
+            with bucket_cursor() as cursor:
+                levels = {traffic: bucket.level(cursor) for traffic, bucket in self.buckets().items()}
+            snapshot = self._levels = (time.monotonic(), levels)
+        return snapshot
+
+
+openai_limiter = RateLimiter('openai', 'OPENAI_RATE_LIMIT')
+
+register_metrics('openai_rate_limit', openai_limiter.stats)
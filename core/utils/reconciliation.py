@@ -0,0 +1,159 @@
+# core/utils/reconciliation.py
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from core.models import Donation, DonorHospitalAssignment
+
+# Kinds of drift between Donation.hospital and DonorHospitalAssignment
+MISSING = 'missing'        # Donation has a hospital but no assignment for it
+STALE = 'stale'            # Assignment for the current hospital disagrees with the donation
+ORPHANED = 'orphaned'      # Open assignment for a hospital the donation no longer uses
+UNASSIGNED = 'unassigned'  # Scheduled or completed donation without any hospital
+
+DRIFT_KINDS = [MISSING, STALE, ORPHANED, UNASSIGNED]
+
+CLOSED_STATUSES = ['completed', 'cancelled']
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class AssignmentReconciler:
+    """
+    Compute and repair drift between donations and hospital assignments.
+
+    Every kind of drift is a single anti-join or join query; fixes stream the
+    affected rows with iterator(chunk_size) and write each chunk with one
+    bulk_create or bulk_update in its own transaction. With dry_run nothing is
+    written and the fix methods return how many rows they would have touched.
+    `progress(label, done, total)` is called after every chunk.
+    """
+
+    def __init__(self, chunk_size=2000, dry_run=False, progress=None):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.progress = progress or (lambda label, done, total: None)
+
+    # ------------------------------------------------------------------
+    # Drift queries
+    # ------------------------------------------------------------------
+    def missing(self):
+        current = DonorHospitalAssignment.objects.filter(
+            donation=OuterRef('pk'), hospital=OuterRef('hospital')
+        )
+        return Donation.objects.filter(hospital__isnull=False).filter(~Exists(current))
+
+    def stale(self):
+        return DonorHospitalAssignment.objects.filter(
+            hospital_id=F('donation__hospital_id')
+        ).filter(
+            ~Q(status=F('donation__status'))
+            | ~Q(ai_recommended=F('donation__ai_recommended_hospital'))
+            | Q(donation__status='completed', completed_at__isnull=True)
+        )
+
+    def orphaned(self):
+        return DonorHospitalAssignment.objects.exclude(status__in=CLOSED_STATUSES).filter(
+            Q(donation__hospital__isnull=True) | ~Q(hospital_id=F('donation__hospital_id'))
+        )
+
+    def unassigned(self):
+        return Donation.objects.filter(hospital__isnull=True, status__in=['scheduled', 'completed'])
+
+    def queryset(self, kind):
+        return getattr(self, kind)()
+
+    def counts(self):
+        return {kind: self.queryset(kind).count() for kind in DRIFT_KINDS}
+
+    # ------------------------------------------------------------------
+    # Fixes
+    # ------------------------------------------------------------------
+    def _apply(self, label, rows, total, write):
+        done = 0
+        for chunk in chunked(rows, self.chunk_size):
+            if not self.dry_run:
+                with transaction.atomic():
+                    write(chunk)
+            done += len(chunk)
+            self.progress(label, done, total)
+        return done
+
+    def create_missing(self):
+        """Create the assignment every hospital-assigned donation should have"""
+        rows = self.missing().values(
+            'id', 'donor_id', 'hospital_id', 'status', 'ai_recommended_hospital', 'donation_date'
+        ).order_by().iterator(chunk_size=self.chunk_size)
+
+        def write(chunk):
+            DonorHospitalAssignment.objects.bulk_create([
+                DonorHospitalAssignment(
+                    donor_id=row['donor_id'],
+                    hospital_id=row['hospital_id'],
+                    donation_id=row['id'],
+                    status=row['status'],
+                    ai_recommended=row['ai_recommended_hospital'],
+                    completed_at=row['donation_date'] if row['status'] == 'completed' else None,
+                )
+                for row in chunk
+            ], ignore_conflicts=True)
+
+        return self._apply(MISSING, rows, self.missing().count(), write)
+
+    def sync_stale(self):
+        """Copy status and AI flag from the donation onto its current assignment"""
+        rows = self.stale().values(
+            'id', 'completed_at', 'donation__status', 'donation__ai_recommended_hospital',
+            'donation__donation_date',
+        ).order_by().iterator(chunk_size=self.chunk_size)
+
+        def write(chunk):
+            DonorHospitalAssignment.objects.bulk_update([
+                DonorHospitalAssignment(
+                    id=row['id'],
+                    status=row['donation__status'],
+                    ai_recommended=row['donation__ai_recommended_hospital'],
+                    completed_at=(row['completed_at'] or row['donation__donation_date'])
+                    if row['donation__status'] == 'completed' else None,
+                )
+                for row in chunk
+            ], ['status', 'ai_recommended', 'completed_at'])
+
+        return self._apply(STALE, rows, self.stale().count(), write)
+
+    def cancel_orphaned(self):
+        """Close open assignments left behind when a donation moved or lost its hospital"""
+        rows = self.orphaned().values_list('id', flat=True).order_by().iterator(chunk_size=self.chunk_size)
+
+        def write(chunk):
+            DonorHospitalAssignment.objects.filter(id__in=chunk).update(status='cancelled')
+
+        return self._apply(ORPHANED, rows, self.orphaned().count(), write)
+
+    def assign_unassigned(self, hospital, statuses=('scheduled',)):
+        """Point donations without a hospital at `hospital`"""
+        rows = self.unassigned().filter(status__in=statuses).values_list('id', flat=True).order_by()
+        total = rows.count()
+
+        def write(chunk):
+            Donation.objects.filter(id__in=chunk, hospital__isnull=True).update(
+                hospital=hospital, ai_recommended_hospital=True
+            )
+
+        return self._apply(UNASSIGNED, rows.iterator(chunk_size=self.chunk_size), total, write)
+
+    def reconcile(self):
+        """Apply every fix, returning rows touched per kind of drift"""
+        return {
+            MISSING: self.create_missing(),
+            STALE: self.sync_stale(),
+            ORPHANED: self.cancel_orphaned(),
+        }
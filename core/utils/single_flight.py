@@ -0,0 +1,140 @@
+# core/utils/single_flight.py
+"""
+Coalesce concurrent calls that would compute the same thing.
+
+The first caller for a key runs the function; callers that arrive while it is in
+flight wait and receive its result instead of starting their own. Within a
+process this is a plain lock and event. Across processes a short lease in the
+Django cache plays the same role, so with a shared cache backend workers
+coalesce with each other too; with the default local-memory cache it simply
+never finds another process's lease.
+
+Waiters never wait past the caller's request budget (REQUEST_BUDGET_SECONDS
+outside a request); a waiter whose leader is still busy by then runs the call
+itself rather than holding its thread for the rest of the lease.
+"""
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .http_gateway import remaining_budget
+from .metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# How long a leader may hold a key across processes; waiters give up sooner (see _wait_seconds)
+LEASE_SECONDS = 60
+
+# How long a finished result stays readable for waiters in other processes
+RESULT_SECONDS = 30
+
+POLL_SECONDS = 0.1
+
+_NOTHING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_lock = threading.Lock()
+_stats = {'leaders': 0, 'shared': 0, 'expired_waits': 0}
+
+
+def _wait_seconds(lease):
+    """How long a waiter may wait for a leader: the lease, cut to the caller's request budget"""
+    left = remaining_budget()
+    budget = settings.REQUEST_BUDGET_SECONDS if left is None else left
+    return max(min(lease, budget), 0)
+
+
+def _run_after_expired_wait(key, func):
+    logger.warning(f"In-flight call {key} did not finish within the wait budget; running it here")
+    with _lock:
+        _stats['expired_waits'] += 1
+    return func(), False
+
+
+def single_flight(key, func, lease=LEASE_SECONDS):
+    """
+    Run func() once for all concurrent callers of `key`.
+
+    Returns (result, shared): shared is False for the caller that actually ran
+    func and True for callers handed someone else's result, so side effects such
+    as saving and notifying can be left to the leader. Exceptions raised by func
+    reach every caller that was waiting on it. A waiter that runs out of wait
+    budget runs func itself and also gets shared False.
+    """
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        if not call.done.wait(_wait_seconds(lease)):
+            return _run_after_expired_wait(key, func)
+        with _lock:
+            _stats['shared'] += 1
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    try:
+        call.result, shared = _run_across_processes(key, func, lease)
+        with _lock:
+            _stats['shared' if shared else 'leaders'] += 1
+        return call.result, shared
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _calls.pop(key, None)
+        call.done.set()
+
+
+def _run_across_processes(key, func, lease):
+    lease_key = f'single-flight:{key}:lease'
+    result_key = f'single-flight:{key}:result'
+    token = uuid.uuid4().hex
+
+    give_up_at = time.monotonic() + _wait_seconds(lease)
+    waited = False
+    while not cache.add(lease_key, token, lease):
+        waited = True
+        result = cache.get(result_key, _NOTHING)
+        if result is not _NOTHING:
+            return result, True
+        if time.monotonic() >= give_up_at:
+            return _run_after_expired_wait(key, func)
+        time.sleep(POLL_SECONDS)
+
+    try:
+        if waited:
+            # The leader we waited for may have finished between our last two polls
+            result = cache.get(result_key, _NOTHING)
+            if result is not _NOTHING:
+                return result, True
+        result = func()
+        cache.set(result_key, result, RESULT_SECONDS)
+        return result, False
+    finally:
+        if cache.get(lease_key) == token:
+            cache.delete(lease_key)
+
+
+def single_flight_stats():
+    with _lock:
+        return dict(_stats, in_flight=len(_calls))
+
+
+register_metrics('single_flight', single_flight_stats)
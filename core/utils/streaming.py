@@ -0,0 +1,54 @@
+# core/utils/streaming.py
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+
+async def async_iter(iterator):
+    """
+    Pull from a sync generator in the thread that owns the DB connection, so ASGI
+    servers stream it instead of buffering the whole response.
+    """
+    sentinel = object()
+    pull = sync_to_async(next, thread_sensitive=True)
+    while True:
+        piece = await pull(iterator, sentinel)
+        if piece is sentinel:
+            break
+        yield piece
+
+
+def for_server(request, pieces):
+    """Wrap `pieces` so the running server (WSGI or ASGI) streams them as produced"""
+    django_request = getattr(request, '_request', request)
+    if isinstance(django_request, ASGIRequest):
+        return async_iter(iter(pieces))
+    return pieces
+
+
+def sse_event(event, data):
+    """One Server-Sent Events frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n".encode('utf-8')
+
+
+def event_stream_response(request, events):
+    """A text/event-stream response for an iterator of encoded SSE frames"""
+    response = StreamingHttpResponse(for_server(request, events), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets SSE endpoints accept `Accept: text/event-stream`; plain responses become an error frame"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event('error', data)
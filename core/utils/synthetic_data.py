@@ -0,0 +1,499 @@
+# core/utils/synthetic_data.py
+import math
+import random
+import uuid
+import zlib
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from core.utils.cache import bump_cache_version
+from core.utils.eligibility import rebuild_donor_eligibility
+from core.utils.geo import donor_cell
+from core.utils.map_layer import MAP_LAYER_NAMESPACE
+from core.utils.urgency import urgency_priority
+from core.models import (
+    User, Hospital, HospitalUser, BloodRequest, Donation, BloodTest, ChatRoom,
+    Message, Notification, DonorHospitalAssignment
+)
+
+# Population centres used for geographic clustering: (name, lat, lng, weight, spread in km)
+CITY_CLUSTERS = [
+    ('Kathmandu', 27.7172, 85.3240, 30, 5.0),
+    ('Lalitpur', 27.6644, 85.3188, 8, 3.0),
+    ('Bhaktapur', 27.6710, 85.4298, 4, 2.5),
+    ('Pokhara', 28.2096, 83.9856, 8, 4.0),
+    ('Biratnagar', 26.4525, 87.2718, 6, 4.0),
+    ('Bharatpur', 27.6766, 84.4337, 5, 4.0),
+    ('Birgunj', 27.0104, 84.8770, 5, 3.5),
+    ('Dharan', 26.8127, 87.2834, 3, 3.0),
+    ('Butwal', 27.7006, 83.4484, 3, 3.0),
+    ('Hetauda', 27.4287, 85.0320, 3, 3.0),
+    ('Janakpur', 26.7288, 85.9263, 3, 3.0),
+    ('Nepalgunj', 28.0500, 81.6167, 2, 3.0),
+    ('Dhangadhi', 28.6852, 80.6216, 3, 3.5),
+]
+
+# Share of people living outside any cluster, spread uniformly over the country
+RURAL_WEIGHT = 10
+COUNTRY_BOUNDS = (26.35, 80.06, 30.45, 88.20)
+
+BLOOD_GROUP_WEIGHTS = [
+    ('O+', 35.0), ('B+', 28.0), ('A+', 27.0), ('AB+', 7.0),
+    ('O-', 1.2), ('A-', 0.8), ('B-', 0.7), ('AB-', 0.3),
+]
+
+URGENCY_WEIGHTS = [('Critical', 10), ('High', 25), ('Medium', 40), ('Low', 25)]
+
+REQUEST_STATUS_WEIGHTS = [
+    ('pending', 20), ('donating', 8), ('accepted', 7), ('completed', 55), ('cancelled', 10),
+]
+
+NOTIFICATION_TYPE_WEIGHTS = [
+    ('blood_request', 55), ('donation_accepted', 15), ('hospital_assigned', 10),
+    ('donation_completed', 8), ('health_alert', 8), ('life_saved', 4),
+]
+
+NOTIFICATION_TITLES = {
+    'blood_request': 'Blood Request Nearby',
+    'donation_accepted': 'Blood Request Accepted',
+    'hospital_assigned': 'Hospital Assigned',
+    'donation_completed': 'Donation Completed',
+    'health_alert': 'Blood Test Results Ready',
+    'life_saved': 'You Saved a Life!',
+}
+
+FIRST_NAMES = [
+    'Aarav', 'Aayush', 'Anish', 'Bibek', 'Bikash', 'Dipesh', 'Ganesh', 'Hari', 'Kiran', 'Manish',
+    'Nabin', 'Prakash', 'Rajesh', 'Ramesh', 'Sagar', 'Sandeep', 'Suman', 'Sunil', 'Ujjwal', 'Yogesh',
+    'Aasha', 'Anjali', 'Bina', 'Deepa', 'Gita', 'Kabita', 'Laxmi', 'Manisha', 'Nisha', 'Pooja',
+    'Priya', 'Rachana', 'Sabina', 'Sarita', 'Shristi', 'Sita', 'Sunita', 'Sushma', 'Srijana', 'Usha',
+]
+
+LAST_NAMES = [
+    'Adhikari', 'Basnet', 'Bhandari', 'Bhattarai', 'Chaudhary', 'Dahal', 'Gurung', 'Joshi', 'Karki',
+    'KC', 'Khadka', 'Lama', 'Magar', 'Maharjan', 'Poudel', 'Rai', 'Shah', 'Sharma', 'Shrestha',
+    'Tamang', 'Thapa', 'Yadav',
+]
+
+MESSAGE_LINES = [
+    'Hi, I accepted your request.',
+    'Thank you so much for helping!',
+    'Which hospital should I go to?',
+    'I will be there in about 30 minutes.',
+    'Please bring a valid ID with you.',
+    'I have reached the hospital.',
+    'The blood test is done, waiting for results.',
+    'Thank you again, you are a life saver.',
+]
+
+KM_PER_DEGREE = 111.32
+
+
+@contextmanager
+def historical_timestamps(*models):
+    """Temporarily let bulk_create keep explicit values for auto_now/auto_now_add fields"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = False
+                field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class SyntheticDataGenerator:
+    """
+    Generate a reproducible, production-sized dataset with bulk inserts.
+
+    Everything is driven by one seeded RNG, so the same arguments always produce
+    the same rows (including primary keys). Only compact per-user arrays are kept
+    in memory; model instances are built and inserted one batch at a time.
+    """
+
+    def __init__(self, seed=42, batch_size=5000, prefix='synth', days=365,
+                 password='password123', log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.days = days
+        self.password_hash = make_password(password)
+        self.log = log or (lambda message: None)
+        self.now = timezone.now().replace(microsecond=0)
+        self.phone_prefix = f"+9{zlib.crc32(prefix.encode()) % 100:02d}"
+
+        self._cluster_weights = [c[3] for c in CITY_CLUSTERS] + [RURAL_WEIGHT]
+        self._blood_groups = [bg for bg, _ in BLOOD_GROUP_WEIGHTS]
+        self._blood_group_weights = [w for _, w in BLOOD_GROUP_WEIGHTS]
+
+        # Compact per-user state used to wire up foreign keys later on
+        self.user_ids = []
+        self.user_blood_group = array('B')
+        self.user_cluster = array('h')
+        self.user_lat = array('d')
+        self.user_lng = array('d')
+        self.user_gender = bytearray()
+        self.donors_by_cluster_group = {}
+        self.donors_by_group = {}
+
+        self.hospital_ids = []
+        self.hospitals_by_cluster = {}
+
+        self.counts = {}
+
+    # ------------------------------------------------------------------
+    # Random helpers
+    # ------------------------------------------------------------------
+    def _uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _weighted(self, choices):
+        values = [c for c, _ in choices]
+        weights = [w for _, w in choices]
+        return self.rng.choices(values, weights)[0]
+
+    def _pick_cluster(self):
+        return self.rng.choices(range(len(self._cluster_weights)), self._cluster_weights)[0]
+
+    def _point_in_cluster(self, cluster):
+        if cluster == len(CITY_CLUSTERS):
+            min_lat, min_lng, max_lat, max_lng = COUNTRY_BOUNDS
+            return self.rng.uniform(min_lat, max_lat), self.rng.uniform(min_lng, max_lng)
+        _, lat, lng, _, spread_km = CITY_CLUSTERS[cluster]
+        d_lat = self.rng.gauss(0, spread_km) / KM_PER_DEGREE
+        d_lng = self.rng.gauss(0, spread_km) / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+        return round(lat + d_lat, 6), round(lng + d_lng, 6)
+
+    def _near(self, lat, lng, km):
+        d_lat = self.rng.gauss(0, km) / KM_PER_DEGREE
+        d_lng = self.rng.gauss(0, km) / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+        return round(lat + d_lat, 6), round(lng + d_lng, 6)
+
+    def _past_datetime(self, not_before=None):
+        start = not_before or (self.now - timedelta(days=self.days))
+        span = max((self.now - start).total_seconds(), 1)
+        # Skew towards recent activity, as a growing platform would see
+        offset = span * (1 - self.rng.random() ** 2)
+        return start + timedelta(seconds=offset)
+
+    def _later(self, moment, max_hours):
+        later = moment + timedelta(seconds=self.rng.uniform(60, max_hours * 3600))
+        return min(later, self.now)
+
+    def _insert(self, model, objs, label):
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.counts[label] = self.counts.get(label, 0) + len(objs)
+
+    def _batched(self, model, total, label, build):
+        """Build and insert `total` rows, `batch_size` at a time"""
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            self._insert(model, [build(done + offset) for offset in range(size)], label)
+            done += size
+            self.log(f"  {label}: {done}/{total}")
+
+    # ------------------------------------------------------------------
+    # Generation steps
+    # ------------------------------------------------------------------
+    def generate(self, users=10000, hospitals=100, requests=None, messages=None, notifications=None):
+        if requests is None:
+            requests = max(users // 20, 1)
+        if messages is None:
+            messages = requests * 3
+        if notifications is None:
+            notifications = users * 2
+
+        with historical_timestamps(User, Hospital, HospitalUser, BloodRequest, Donation,
+                                   BloodTest, ChatRoom, Message, Notification,
+                                   DonorHospitalAssignment):
+            self.log(f"Generating {hospitals} hospitals")
+            self.create_hospitals(hospitals)
+            self.log(f"Generating {users} users")
+            self.create_users(users)
+            self.log(f"Generating {requests} blood requests with donations")
+            chat_rooms = self.create_requests(requests)
+            self.log(f"Generating {messages} chat messages")
+            self.create_messages(messages, chat_rooms)
+            self.log(f"Generating {notifications} notifications")
+            self.create_notifications(notifications)
+        # Bulk inserts skip the save hooks that maintain donor eligibility
+        self.log("Rebuilding donor eligibility")
+        rebuild_donor_eligibility()
+        return self.counts
+
+    def create_hospitals(self, total):
+        kinds = ['General', 'Teaching', 'Community', 'Memorial', 'City', 'Medical College']
+
+        def build(i):
+            cluster = self._pick_cluster()
+            lat, lng = self._point_in_cluster(cluster)
+            city = CITY_CLUSTERS[cluster][0] if cluster < len(CITY_CLUSTERS) else 'District'
+            hospital = Hospital(
+                id=self._uuid(),
+                name=f"{self.prefix} {city} {self.rng.choice(kinds)} Hospital {i}",
+                address=f"Ward {self.rng.randint(1, 32)}, {city}",
+                phone_number=f"{self.phone_prefix}1{i:09d}",
+                location_lat=lat,
+                location_long=lng,
+                created_at=self._past_datetime(),
+            )
+            self.hospital_ids.append(hospital.id)
+            self.hospitals_by_cluster.setdefault(cluster, []).append(hospital.id)
+            return hospital
+
+        self._batched(Hospital, total, 'hospitals', build)
+
+        def build_account(i):
+            return HospitalUser(
+                hospital_id=self.hospital_ids[i],
+                username=f"{self.prefix}_h{i}",
+                email=f"{self.prefix}_h{i}@hospital.example.com",
+                password=self.password_hash,
+                created_at=self.now,
+            )
+
+        self._batched(HospitalUser, total, 'hospital_users', build_account)
+        # bulk_create skips the post_save signal that normally retires the map layer
+        bump_cache_version(MAP_LAYER_NAMESPACE)
+
+    def create_users(self, total):
+        def build(i):
+            cluster = self._pick_cluster()
+            gender = self.rng.choice('MF')
+            blood_group = self.rng.choices(range(len(self._blood_groups)), self._blood_group_weights)[0]
+            is_donor = self.rng.random() < 0.8
+            has_location = self.rng.random() < 0.95
+            lat, lng = self._point_in_cluster(cluster) if has_location else (None, None)
+            user_id = self._uuid()
+            created_at = self._past_datetime()
+
+            self.user_ids.append(user_id)
+            self.user_blood_group.append(blood_group)
+            self.user_cluster.append(cluster)
+            self.user_lat.append(lat if lat is not None else math.nan)
+            self.user_lng.append(lng if lng is not None else math.nan)
+            self.user_gender.append(gender == 'F')
+            if is_donor and has_location:
+                self.donors_by_cluster_group.setdefault((cluster, blood_group), []).append(i)
+                self.donors_by_group.setdefault(blood_group, []).append(i)
+
+            return User(
+                id=user_id,
+                username=f"{self.prefix}_u{i}",
+                email=f"{self.prefix}_u{i}@example.com",
+                password=self.password_hash,
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                blood_group=self._blood_groups[blood_group],
+                age=self.rng.randint(18, 65),
+                gender=gender,
+                address=CITY_CLUSTERS[cluster][0] if cluster < len(CITY_CLUSTERS) else 'Rural Municipality',
+                phone_number=f"{self.phone_prefix}{i:010d}",
+                is_donor=is_donor,
+                is_recipient=True,
+                location_lat=lat,
+                location_long=lng,
+                geo_cell=donor_cell(lat, lng),
+                profile_picture='profile_pictures/default.png',
+                date_joined=created_at,
+                created_at=created_at,
+            )
+
+        self._batched(User, total, 'users', build)
+
+    def _donor_for(self, cluster, blood_group, exclude):
+        candidates = self.donors_by_cluster_group.get((cluster, blood_group))
+        if not candidates:
+            # Fall back to the rural pool, then to anyone of the same group
+            candidates = self.donors_by_cluster_group.get((len(CITY_CLUSTERS), blood_group))
+        if not candidates:
+            candidates = self.donors_by_group.get(blood_group)
+        if not candidates:
+            return None
+        for _ in range(5):
+            index = self.rng.choice(candidates)
+            if index != exclude:
+                return index
+        return None
+
+    def _hospital_for(self, cluster):
+        candidates = self.hospitals_by_cluster.get(cluster) or self.hospital_ids
+        return self.rng.choice(candidates) if candidates else None
+
+    def _blood_test_values(self, gender):
+        low_hb = self.rng.random() < 0.08
+        hb_mean = 15.0 if gender == 'M' else 13.5
+        return {
+            'sugar_level': round(self.rng.gauss(92, 14), 1),
+            'uric_acid_level': round(self.rng.gauss(5.2 if gender == 'M' else 4.3, 1.0), 1),
+            'wbc_count': round(self.rng.gauss(7500, 1600)),
+            'rbc_count': round(self.rng.gauss(5.3 if gender == 'M' else 4.7, 0.4), 2),
+            'hemoglobin': round(self.rng.gauss(11.2 if low_hb else hb_mean, 0.8), 1),
+            'platelet_count': round(self.rng.gauss(260000, 55000)),
+        }
+
+    def create_requests(self, total):
+        """Create blood requests plus the donations, assignments, tests and chat rooms they lead to"""
+        chat_rooms = []
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            requests, donations, assignments, tests, rooms = [], [], [], [], []
+
+            for _ in range(size):
+                patient = self.rng.randrange(len(self.user_ids))
+                cluster = self.user_cluster[patient]
+                blood_group = self.user_blood_group[patient]
+                if math.isnan(self.user_lat[patient]):
+                    lat, lng = self._point_in_cluster(cluster)
+                else:
+                    lat, lng = self._near(self.user_lat[patient], self.user_lng[patient], 1.0)
+                status = self._weighted(REQUEST_STATUS_WEIGHTS)
+                created_at = self._past_datetime()
+                request = BloodRequest(
+                    id=self._uuid(),
+                    patient_id=self.user_ids[patient],
+                    blood_group=self._blood_groups[blood_group],
+                    units_required=self.rng.choices([1, 2, 3, 4], [60, 25, 10, 5])[0],
+                    urgency=self._weighted(URGENCY_WEIGHTS),
+                    reason=self.rng.choice(['Surgery', 'Accident', 'Thalassemia', 'Childbirth', 'Dengue', 'Anemia']),
+                    location_lat=lat,
+                    location_long=lng,
+                    status=status,
+                    created_at=created_at,
+                )
+                # bulk_create skips BloodRequest.save, which normally sets this
+                request.priority = urgency_priority(request.urgency)
+                requests.append(request)
+
+                if status == 'pending':
+                    donation_count = 1 if self.rng.random() < 0.3 else 0
+                else:
+                    donation_count = request.units_required
+                donation_status = {
+                    'pending': 'pending', 'donating': 'scheduled', 'accepted': 'scheduled',
+                    'completed': 'completed', 'cancelled': 'cancelled',
+                }[status]
+
+                for _ in range(donation_count):
+                    donor = self._donor_for(cluster, blood_group, exclude=patient)
+                    if donor is None:
+                        continue
+                    hospital_id = self._hospital_for(cluster) if donation_status != 'pending' else None
+                    donated_at = self._later(created_at, 72)
+                    donation = Donation(
+                        id=self._uuid(),
+                        donor_id=self.user_ids[donor],
+                        blood_request_id=request.id,
+                        hospital_id=hospital_id,
+                        status=donation_status,
+                        donation_date=donated_at if donation_status == 'completed' else None,
+                        ai_recommended_hospital=hospital_id is not None and self.rng.random() < 0.7,
+                        created_at=self._later(created_at, 6),
+                    )
+                    donations.append(donation)
+
+                    if hospital_id is None:
+                        continue
+                    assignments.append(DonorHospitalAssignment(
+                        id=self._uuid(),
+                        donor_id=donation.donor_id,
+                        hospital_id=hospital_id,
+                        donation_id=donation.id,
+                        status=donation_status,
+                        ai_recommended=donation.ai_recommended_hospital,
+                        assigned_at=donation.created_at,
+                        completed_at=donated_at if donation_status == 'completed' else None,
+                    ))
+                    rooms.append(ChatRoom(
+                        id=self._uuid(),
+                        donor_id=donation.donor_id,
+                        patient_id=request.patient_id,
+                        donation_id=donation.id,
+                        is_active=donation_status == 'scheduled',
+                        created_at=donation.created_at,
+                    ))
+                    chat_rooms.append((rooms[-1].id, donor, patient, donation.created_at))
+
+                    if donation_status == 'completed':
+                        tests.append(BloodTest(
+                            id=self._uuid(),
+                            donation_id=donation.id,
+                            tested_by_id=hospital_id,
+                            life_saved=self.rng.random() < 0.6,
+                            created_at=donated_at,
+                            updated_at=donated_at,
+                            **self._blood_test_values('F' if self.user_gender[donor] else 'M'),
+                        ))
+
+            self._insert(BloodRequest, requests, 'blood_requests')
+            self._insert(Donation, donations, 'donations')
+            self._insert(DonorHospitalAssignment, assignments, 'hospital_assignments')
+            self._insert(ChatRoom, rooms, 'chat_rooms')
+            self._insert(BloodTest, tests, 'blood_tests')
+            done += size
+            self.log(f"  blood_requests: {done}/{total}")
+        return chat_rooms
+
+    def create_messages(self, total, chat_rooms):
+        if not chat_rooms:
+            return
+
+        def build(i):
+            room_id, donor, patient, opened_at = self.rng.choice(chat_rooms)
+            sender = donor if self.rng.random() < 0.5 else patient
+            return Message(
+                id=self._uuid(),
+                chat_room_id=room_id,
+                sender_id=self.user_ids[sender],
+                content=self.rng.choice(MESSAGE_LINES),
+                timestamp=self._later(opened_at, 48),
+            )
+
+        self._batched(Message, total, 'messages', build)
+
+    def create_notifications(self, total):
+        def build(i):
+            user = self.rng.randrange(len(self.user_ids))
+            notification_type = self._weighted(NOTIFICATION_TYPE_WEIGHTS)
+            created_at = self._past_datetime()
+            return Notification(
+                id=self._uuid(),
+                user_id=self.user_ids[user],
+                notification_type=notification_type,
+                title=NOTIFICATION_TITLES[notification_type],
+                message=f"{NOTIFICATION_TITLES[notification_type]}. Please check the app for details.",
+                is_read=created_at < self.now - timedelta(days=3) or self.rng.random() < 0.3,
+                related_id=self._uuid(),
+                created_at=created_at,
+            )
+
+        self._batched(Notification, total, 'notifications', build)
+
+
+def flush_synthetic_data(prefix='synth'):
+    """Delete everything a previous run created with `prefix`, leaf tables first"""
+    users = User.objects.filter(username__startswith=f"{prefix}_u")
+    hospitals = Hospital.objects.filter(name__startswith=f"{prefix} ")
+    deleted = {}
+    deleted['messages'] = Message.objects.filter(chat_room__donor__in=users).delete()[0]
+    deleted['notifications'] = Notification.objects.filter(user__in=users).delete()[0]
+    deleted['blood_tests'] = BloodTest.objects.filter(tested_by__in=hospitals).delete()[0]
+    deleted['hospital_assignments'] = DonorHospitalAssignment.objects.filter(hospital__in=hospitals).delete()[0]
+    deleted['chat_rooms'] = ChatRoom.objects.filter(donor__in=users).delete()[0]
+    deleted['donations'] = Donation.objects.filter(donor__in=users).delete()[0]
+    deleted['blood_requests'] = BloodRequest.objects.filter(patient__in=users).delete()[0]
+    deleted['hospital_users'] = HospitalUser.objects.filter(hospital__in=hospitals).delete()[0]
+    deleted['users'] = users.delete()[0]
+    deleted['hospitals'] = hospitals.delete()[0]
+    return deleted
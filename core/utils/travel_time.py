@@ -0,0 +1,274 @@
+# core/utils/travel_time.py
+"""
+Road travel times between grid cells, for ranking hospitals and donors.
+
+Travel times come from a pluggable provider (TRAVEL_TIME['provider']) and are
+stored per pair of TRAVEL_TIME['cell_degrees'] grid cells in the TravelTime
+table. Request handlers only ever read that table: pairs that are missing or
+older than the TTL are answered with the local estimate and queued for the
+warm_travel_times task, which fetches them in bulk with matrix calls. The
+warm_travel_times management command fills the table ahead of time.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .geo import cell_for, cell_key, haversine_km, parse_cell_key
+from .http_gateway import get_json
+
+logger = logging.getLogger(__name__)
+
+# Pairs sent to one warm_travel_times task
+WARM_TASK_PAIRS = 500
+
+
+class TravelTimeProvider:
+    """Travel times in seconds between points; None where there is no route"""
+
+    name = None
+    # Largest matrix a single call may ask for
+    max_origins = 25
+    max_destinations = 25
+    max_elements = 100
+
+    def matrix(self, origins, destinations):
+        """[[seconds or None for each destination] for each origin]; points are (lat, lng)"""
+        raise NotImplementedError
+
+
+class EstimatedTravelTime(TravelTimeProvider):
+    """
+    Deterministic stand-in: straight-line distance stretched by a detour factor at
+    a fixed average speed. Used for tests, development and pairs not cached yet.
+    """
+
+    name = 'estimate'
+    max_origins = max_destinations = 1000
+    max_elements = 100000
+
+    def __init__(self, speed_kmh=None, detour_factor=None):
+        self.speed_kmh = speed_kmh or settings.TRAVEL_TIME['speed_kmh']
+        self.detour_factor = detour_factor or settings.TRAVEL_TIME['detour_factor']
+
+    def seconds(self, origin, destination):
+        return haversine_km(*origin, *destination) * self.detour_factor / self.speed_kmh * 3600
+
+    def matrix(self, origins, destinations):
+        return [[self.seconds(origin, destination) for destination in destinations] for origin in origins]
+
+
+class GoogleDistanceMatrix(TravelTimeProvider):
+    """Google Distance Matrix API, through the google_maps upstream"""
+
+    name = 'google'
+    url = 'https://maps.googleapis.com/maps/api/distancematrix/json'
+
+    def matrix(self, origins, destinations):
+        data = get_json('google_maps', self.url, params={
+            'origins': '|'.join(f'{lat},{lng}' for lat, lng in origins),
+            'destinations': '|'.join(f'{lat},{lng}' for lat, lng in destinations),
+            'mode': 'driving',
+            'key': settings.GOOGLE_MAPS_API_KEY,
+        })
+        if data.get('status') != 'OK':
+            raise ValueError(f"Distance Matrix returned {data.get('status')}: {data.get('error_message', '')}")
+        return [
+            [element['duration']['value'] if element.get('status') == 'OK' else None
+             for element in row['elements']]
+            for row in data['rows']
+        ]
+
+
+_provider = None
+
+
+def travel_time_provider():
+    """The configured provider, one instance per process"""
+    global _provider
+    if _provider is None:
+        _provider = import_string(settings.TRAVEL_TIME['provider'])()
+    return _provider
+
+
+def travel_cell(lat, lng):
+    return cell_key(*cell_for(lat, lng, settings.TRAVEL_TIME['cell_degrees']))
+
+
+def cell_center(key):
+    size = settings.TRAVEL_TIME['cell_degrees']
+    row, col = parse_cell_key(key)
+    return (row + 0.5) * size - 90, (col + 0.5) * size - 180
+
+
+def _cached(pairs):
+    """{(origin_cell, destination_cell): seconds or None} for fresh cached pairs among `pairs`"""
+    from core.models import TravelTime
+
+    if not pairs:
+        return {}
+    fresh_after = timezone.now() - timedelta(seconds=settings.TRAVEL_TIME['ttl_seconds'])
+    origins = {origin for origin, _ in pairs}
+    destinations = {destination for _, destination in pairs}
+    rows = TravelTime.objects.filter(
+        origin_cell__in=origins, destination_cell__in=destinations, updated_at__gte=fresh_after
+    ).values_list('origin_cell', 'destination_cell', 'seconds')
+    return {(origin, destination): seconds for origin, destination, seconds in rows}
+
+
+def travel_times(origins, destinations):
+    """
+    [[seconds for each destination] for each origin] from the cache, without
+    calling out. Uncached pairs get the local estimate and are queued for warming;
+    pairs the provider found no route for come back as None.
+    """
+    origin_cells = [travel_cell(*point) for point in origins]
+    destination_cells = [travel_cell(*point) for point in destinations]
+    pairs = {(o, d) for o in origin_cells for d in destination_cells}
+    cached = _cached(pairs)
+
+    estimate = EstimatedTravelTime()
+    missing = set()
+    result = []
+    for origin, o in zip(origins, origin_cells):
+        row = []
+        for destination, d in zip(destinations, destination_cells):
+            if (o, d) in cached:
+                row.append(cached[(o, d)])
+            else:
+                missing.add((o, d))
+                row.append(estimate.seconds(origin, destination))
+        result.append(row)
+
+    if missing and not isinstance(travel_time_provider(), EstimatedTravelTime):
+        queue_warm(missing)
+    return result
+
+
+def rank_hospitals(donor, patient, limit=None, radius_km=None):
+    """
+    [(hospital, donor_km, patient_km, donor_seconds, patient_seconds)] for the
+    hospitals best placed between `donor` and `patient`, quickest first.
+
+    Hospitals are narrowed by straight-line distance before travel times are read,
+    so only a short list inside the warmed radius is looked up and queued for
+    warming. Hospitals without a route, and every hospital when none is inside
+    the radius, are ranked by straight-line distance instead.
+    """
+    from core.models import Hospital
+
+    limit = settings.TRAVEL_TIME['hospital_candidates'] if limit is None else limit
+    radius_km = settings.TRAVEL_TIME['warm_radius_km'] if radius_km is None else radius_km
+    by_distance = sorted(
+        (
+            (hospital,
+             haversine_km(*donor, hospital.location_lat, hospital.location_long),
+             haversine_km(*patient, hospital.location_lat, hospital.location_long))
+            for hospital in Hospital.objects.all()
+        ),
+        key=lambda x: x[1] + x[2]
+    )
+    shortlist = [x for x in by_distance if x[1] <= radius_km and x[2] <= radius_km][:limit]
+    if not shortlist:
+        return [(hospital, donor_km, patient_km, None, None) for hospital, donor_km, patient_km in by_distance[:limit]]
+
+    donor_times, patient_times = travel_times(
+        [donor, patient], [(hospital.location_lat, hospital.location_long) for hospital, _, _ in shortlist]
+    )
+    ranked = [x + times for x, times in zip(shortlist, zip(donor_times, patient_times))]
+
+    def quickest(x):
+        routed = x[3] is not None and x[4] is not None
+        return (not routed, x[3] + x[4] if routed else x[1] + x[2])
+
+    return sorted(ranked, key=quickest)
+
+
+def queue_warm(pairs):
+    """Fetch `pairs` of cells in the background"""
+    from core.tasks import PRIORITY_BULK, enqueue
+
+    pairs = sorted(pairs)
+    for start in range(0, len(pairs), WARM_TASK_PAIRS):
+        chunk = pairs[start:start + WARM_TASK_PAIRS]
+        digest = hashlib.sha1(repr(chunk).encode()).hexdigest()
+        enqueue('warm_travel_times', {'pairs': chunk}, priority=PRIORITY_BULK,
+                dedupe_key=f'travel-times:{digest}')
+
+
+def hospital_pairs(origins, radius_km=None):
+    """(origin cell, hospital cell) pairs for the hospitals within `radius_km` of each origin cell"""
+    from core.models import Hospital
+
+    radius_km = settings.TRAVEL_TIME['warm_radius_km'] if radius_km is None else radius_km
+    hospitals = sorted({travel_cell(lat, lng) for lat, lng in
+                        Hospital.objects.values_list('location_lat', 'location_long')})
+    hospital_centers = [(cell, cell_center(cell)) for cell in hospitals]
+    pairs = []
+    for origin in sorted(origins):
+        center = cell_center(origin)
+        pairs.extend(
+            (origin, cell) for cell, hospital_center in hospital_centers
+            if haversine_km(*center, *hospital_center) <= radius_km
+        )
+    return pairs
+
+
+def stale_pairs(pairs):
+    """The pairs that are missing from the cache or past the TTL"""
+    cached = _cached(set(pairs))
+    return [pair for pair in pairs if pair not in cached]
+
+
+def _blocks(pairs, provider):
+    """Group cell pairs into (origins, destinations) blocks within the provider's matrix limits"""
+    by_origin = {}
+    for origin, destination in pairs:
+        by_origin.setdefault(origin, set()).add(destination)
+    # Origins that need the same destinations share a block
+    origins = sorted(by_origin, key=lambda origin: sorted(by_origin[origin]))
+    per_block = max(min(provider.max_origins, provider.max_elements), 1)
+    for start in range(0, len(origins), per_block):
+        block = origins[start:start + per_block]
+        destinations = sorted(set().union(*(by_origin[origin] for origin in block)))
+        step = max(min(provider.max_destinations, provider.max_elements // len(block)), 1)
+        for d_start in range(0, len(destinations), step):
+            yield block, destinations[d_start:d_start + step]
+
+
+def warm(pairs, provider=None):
+    """Fetch and store travel times for (origin_cell, destination_cell) pairs; returns rows written"""
+    from core.models import TravelTime
+
+    provider = provider or travel_time_provider()
+    written = 0
+    for origins, destinations in _blocks(pairs, provider):
+        try:
+            matrix = provider.matrix([cell_center(o) for o in origins], [cell_center(d) for d in destinations])
+        except Exception as e:
+            logger.warning(f"Travel time matrix {len(origins)}x{len(destinations)} failed: {str(e)}")
+            continue
+        now = timezone.now()
+        rows = [
+            TravelTime(origin_cell=o, destination_cell=d, seconds=seconds, provider=provider.name, updated_at=now)
+            for o, row in zip(origins, matrix)
+            for d, seconds in zip(destinations, row)
+        ]
+        TravelTime.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['origin_cell', 'destination_cell'],
+            update_fields=['seconds', 'provider', 'updated_at'], batch_size=1000,
+        )
+        written += len(rows)
+    return written
+
+
+def purge_expired():
+    """Delete cached pairs past the TTL"""
+    from core.models import TravelTime
+
+    fresh_after = timezone.now() - timedelta(seconds=settings.TRAVEL_TIME['ttl_seconds'])
+    deleted, _ = TravelTime.objects.filter(updated_at__lt=fresh_after).delete()
+    return deleted
@@ -0,0 +1,94 @@
+# core/utils/urgency.py
+"""
+Blood request urgency as an ordered priority.
+
+BloodRequest.urgency is free text from several clients ("Critical", "High",
+"Medium", "Low", and whatever older clients sent). It is normalized into
+BloodRequest.priority, where a lower number is more urgent, and that priority
+decides the order of fan-out work, the initial search radius and the order
+donors see requests in.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import register_metrics
+
+CRITICAL = 0
+HIGH = 1
+MEDIUM = 2
+LOW = 3
+
+PRIORITY_CHOICES = [(CRITICAL, 'Critical'), (HIGH, 'High'), (MEDIUM, 'Medium'), (LOW, 'Low')]
+PRIORITY_NAMES = {level: label.lower() for level, label in PRIORITY_CHOICES}
+
+# Words that place free-text urgency on the scale; checked most urgent first
+URGENCY_KEYWORDS = [
+    (CRITICAL, ['critical', 'emergency', 'immediate', 'immediately', 'life threatening', 'stat', 'asap']),
+    (HIGH, ['high', 'urgent', 'soon', 'today']),
+    (LOW, ['low', 'routine', 'scheduled', 'planned', 'whenever']),
+    (MEDIUM, ['medium', 'normal', 'moderate']),
+]
+
+
+def urgency_priority(urgency):
+    """Priority level for a free-text urgency; unrecognised text counts as medium"""
+    words = ' '.join(re.findall(r'[a-z]+', (urgency or '').lower()))
+    for level, keywords in URGENCY_KEYWORDS:
+        if any(re.search(rf'\b{keyword}\b', words) for keyword in keywords):
+            return level
+    return MEDIUM
+
+
+def search_radius_km(priority, base_km):
+    """Initial search radius for a request; urgent requests look further from the start"""
+    factor = settings.URGENCY_SEARCH_RADIUS_FACTOR.get(PRIORITY_NAMES.get(priority), 1.0)
+    return base_km * factor
+
+
+def task_priority(priority):
+    """Background task priority for work done on behalf of a request"""
+    # Imported here because core.models imports this module
+    from core.tasks import PRIORITY_CRITICAL, PRIORITY_INTERACTIVE, PRIORITY_LOW, PRIORITY_NORMAL
+
+    return {
+        CRITICAL: PRIORITY_CRITICAL,
+        HIGH: PRIORITY_INTERACTIVE,
+        MEDIUM: PRIORITY_NORMAL,
+        LOW: PRIORITY_LOW,
+    }.get(priority, PRIORITY_NORMAL)
+
+
+FIRST_NOTIFICATION_SQL = """
+SELECT priority,
+       COUNT(*) AS requests,
+       COUNT(first_notified_at) AS notified,
+       AVG(EXTRACT(EPOCH FROM first_notified_at - created_at))::float AS mean_seconds,
+       PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM first_notified_at - created_at)) AS p50_seconds,
+       PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM first_notified_at - created_at)) AS p95_seconds
+FROM core_bloodrequest
+WHERE created_at >= NOW() - make_interval(hours => %s)
+GROUP BY priority
+ORDER BY priority
+"""
+
+
+def first_notification_stats(hours=24):
+    """Time from request creation to the first donor notification, per priority"""
+    with connection.cursor() as cursor:
+        cursor.execute(FIRST_NOTIFICATION_SQL, [hours])
+        rows = cursor.fetchall()
+    return {
+        PRIORITY_NAMES.get(priority, str(priority)): {
+            'requests': requests,
+            'notified': notified,
+            'mean_seconds': mean,
+            'p50_seconds': p50,
+            'p95_seconds': p95,
+        }
+        for priority, requests, notified, mean, p50, p95 in rows
+    }
+
+
+register_metrics('time_to_first_notification', first_notification_stats)
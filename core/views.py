@@ -1,20 +1,27 @@
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.views.static import serve
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.core.mail import send_mail
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
 from django.urls import reverse
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import login, logout
 from django.shortcuts import get_object_or_404
 from django.middleware.csrf import get_token
-from django.db.models import Q
+from django.db.models import Q, Count
+import csv
 import traceback
+from datetime import timedelta
 from .utils.tokens import hospital_user_token_generator
 from django.utils import timezone
 from .models import User, Hospital, BloodRequest, Donation, BloodTest, ChatRoom, Message, Notification, HospitalUser, DonorHospitalAssignment, News, DonationStats
@@ -26,12 +33,14 @@ from .serializers import (
     HospitalLoginSerializer, HospitalUserSerializer, DonorHospitalAssignmentSerializer,
     PasswordResetConfirmSerializer, PasswordResetRequestSerializer,
     HospitalPasswordResetConfirmSerializer, HospitalPasswordResetRequestSerializer,
-    UserUpdateSerializer, NewsSerializer, DonationStatsSerializer, DashboardStatsSerializer
+    UserUpdateSerializer, NewsSerializer, DonationStatsSerializer, DashboardStatsSerializer,
+    CompiledUserSerializer, CompiledHospitalSerializer, CompiledBloodRequestSerializer
 )
-import requests
 from django.conf import settings
 import json
-from math import radians, sin, cos, sqrt, atan2
+from itertools import chain
+from urllib.parse import urlencode
+from math import radians, sin, cos, sqrt, atan2, isfinite
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
@@ -39,7 +48,22 @@ from rest_framework import authentication
 from rest_framework_simplejwt.exceptions import InvalidToken
 from .authentication import HospitalUserAuthentication
 from .permissions import IsHospitalUserAuthenticated
-from .utils.ai_prediction import HealthPredictor
+from .utils.ai_prediction import HealthPredictor, predict_for_blood_test, prediction_input, save_prediction
+from .utils.cache import versioned_payload, conditional_response
+from .utils.http_gateway import UpstreamError, openai_available, openai_chat
+from .utils.geo import parse_bbox, cells_in_bbox, cell_key, cell_bounds
+from .utils.donor_search import nearest_donor_values
+from .utils.donor_location import COALESCED, parse_location, record_location, write_location
+from .utils.travel_time import rank_hospitals, travel_times
+from .utils.exports import ExportError, streaming_export
+from .utils.lab_import import IMPORT_FORMATS, LabImportError, LabResultImporter, guess_format, normalize_analytes
+from .utils.map_layer import get_hospital_layer
+from .utils.metrics import collect_metrics
+from .utils.urgency import search_radius_km, task_priority
+from .tasks import enqueue
+from .utils.streaming import EventStreamRenderer, event_stream_response, sse_event
+from .signals import NEWS_CACHE_NAMESPACE
+from .db.router import PRIMARY
 import logging
 
 logger = logging.getLogger(__name__)
@@ -309,12 +333,29 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = UserSerializer(request.user, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def location(self, request):
+        """Location ping; throttled and coalesced per user (core/utils/donor_location.py)"""
+        if not request.user.is_donor:
+            return Response({'error': 'Only donors can report their location'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            lat, lng = parse_location(request.data.get('lat'), request.data.get('lng'))
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = record_location(request.user, lat, lng)
+        return Response(
+            {'status': result},
+            status=status.HTTP_202_ACCEPTED if result == COALESCED else status.HTTP_200_OK
+        )
+
     @action(detail=False, methods=['get'])
     def nearby_donors(self, request):
         user_lat = request.query_params.get('lat')
         user_lng = request.query_params.get('lng')
         blood_group = request.query_params.get('blood_group')
         max_distance = request.query_params.get('max_distance', 50)
+        limit = request.query_params.get('limit', settings.DONOR_SEARCH_LIMIT)
 
         if not user_lat or not user_lng:
             return Response(
@@ -323,34 +364,31 @@ class UserViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            user_lat = float(user_lat)
-            user_lng = float(user_lng)
+            user_lat, user_lng = parse_location(user_lat, user_lng)
             max_distance = float(max_distance)
+            limit = min(max(int(limit), 1), settings.DONOR_SEARCH_MAX_LIMIT)
         except ValueError:
             return Response(
                 {'error': 'Invalid coordinate values'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if not isfinite(max_distance) or max_distance <= 0:
+            return Response(
+                {'error': 'max_distance must be a positive number of kilometres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Ring scans grow with the radius, so it is capped like the limit
+        max_distance = min(max_distance, settings.DONOR_MATCH_RADIUS_KM)
 
-        donors = User.objects.filter(
-            is_donor=True,
-            location_lat__isnull=False,
-            location_long__isnull=False
-        )
-        if blood_group:
-            donors = donors.filter(blood_group=blood_group)
-
-        donors = donors.exclude(id=request.user.id)
-
+        serializer = CompiledUserSerializer(context={'request': request, 'picture_size': 'thumb'})
         nearby_donors = []
-        for donor in donors:
-            distance = self.calculate_distance(
-                user_lat, user_lng, donor.location_lat, donor.location_long
-            )
-            if distance <= max_distance:
-                donor_data = UserSerializer(donor, context={'request': request}).data
-                donor_data['distance'] = round(distance, 2)
-                nearby_donors.append(donor_data)
+        for row, distance in nearest_donor_values(
+            user_lat, user_lng, k=limit, columns=serializer.columns, max_radius_km=max_distance,
+            blood_group=blood_group, exclude=[request.user.id]
+        ):
+            donor_data = serializer.to_representation(row)
+            donor_data['distance'] = round(distance, 2)
+            nearby_donors.append(donor_data)
 
         return Response(nearby_donors)
 
@@ -394,15 +432,15 @@ class HospitalViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Invalid coordinate values'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        hospitals = Hospital.objects.all()
+        serializer = CompiledHospitalSerializer()
         nearby_hospitals = []
         
-        for hospital in hospitals:
+        for hospital in serializer.values(Hospital.objects.all()):
             distance = self.calculate_distance(
-                user_lat, user_lng, hospital.location_lat, hospital.location_long
+                user_lat, user_lng, hospital['location_lat'], hospital['location_long']
             )
             if distance <= max_distance:
-                hospital_data = HospitalSerializer(hospital).data
+                hospital_data = serializer.to_representation(hospital)
                 hospital_data['distance'] = round(distance, 2)
                 nearby_hospitals.append(hospital_data)
         
@@ -428,11 +466,11 @@ class BloodRequestViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         if self.request.user.is_staff:
-            return BloodRequest.objects.all()
+            return BloodRequest.objects.select_related('patient')
         return BloodRequest.objects.filter(
             Q(patient=self.request.user) | 
             Q(donations__donor=self.request.user)
-        ).distinct()
+        ).distinct().select_related('patient')
     
     def create(self, request, *args, **kwargs):
         try:
@@ -446,30 +484,13 @@ class BloodRequestViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         blood_request = serializer.save(patient=self.request.user)
-        donors = User.objects.filter(
-            is_donor=True,
-            blood_group=blood_request.blood_group,
-            location_lat__isnull=False,
-            location_long__isnull=False
-        ).exclude(id=self.request.user.id)
-        
-        notification_count = 0
-        for donor in donors:
-            if donor.location_lat and donor.location_long:
-                distance = self.calculate_distance(
-                    blood_request.location_lat, blood_request.location_long,
-                    donor.location_lat, donor.location_long
-                )
-                if distance <= 50:
-                    Notification.objects.create(
-                        user=donor,
-                        notification_type='blood_request',
-                        title='Blood Request Nearby',
-                        message=f'A patient nearby needs {blood_request.blood_group} blood. Can you help?',
-                        related_id=blood_request.id
-                    )
-                    notification_count += 1
-        print(f"Created {notification_count} notifications for blood request {blood_request.id}")
+        # Fan-out runs in waves in the worker, where critical requests are claimed first
+        enqueue(
+            'notify_blood_request_donors',
+            {'blood_request_id': str(blood_request.id)},
+            priority=task_priority(blood_request.priority),
+            dedupe_key=f'notify-request:{blood_request.id}',
+        )
     
     def calculate_distance(self, lat1, lng1, lat2, lng2):
         R = 6371
@@ -486,25 +507,35 @@ class BloodRequestViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def find_best_donors(self, request, pk=None):
         blood_request = self.get_object()
-        potential_donors = User.objects.filter(
-            is_donor=True,
-            blood_group=blood_request.blood_group,
-            location_lat__isnull=False,
-            location_long__isnull=False
-        ).exclude(id=blood_request.patient.id)
-        
+        radius = search_radius_km(blood_request.priority, settings.DONOR_MATCH_RADIUS_KM)
+        try:
+            limit = min(max(int(request.query_params.get('limit', settings.DONOR_MATCH_COUNT)), 1),
+                        settings.DONOR_SEARCH_MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = CompiledUserSerializer(context={'picture_size': 'thumb'})
+        nearest = nearest_donor_values(
+            blood_request.location_lat, blood_request.location_long, k=limit, columns=serializer.columns,
+            max_radius_km=radius, blood_group=blood_request.blood_group, exclude=[blood_request.patient_id]
+        )
+        times = travel_times(
+            [(donor['location_lat'], donor['location_long']) for donor, _ in nearest],
+            [(blood_request.location_lat, blood_request.location_long)]
+        )
+
+        # Closest by road first; donors with no route last
+        ranked = sorted(
+            zip(nearest, (row[0] for row in times)),
+            key=lambda x: (x[1] is None, x[1] or 0, x[0][1])
+        )
         donors_with_distance = []
-        for donor in potential_donors:
-            distance = self.calculate_distance(
-                blood_request.location_lat, blood_request.location_long,
-                donor.location_lat, donor.location_long
-            )
-            if distance <= 100:
-                donor_data = UserSerializer(donor).data
-                donor_data['distance'] = round(distance, 2)
-                donors_with_distance.append(donor_data)
-        
-        donors_with_distance.sort(key=lambda x: x['distance'])
+        for (donor, distance), seconds in ranked:
+            donor_data = serializer.to_representation(donor)
+            donor_data['distance'] = round(distance, 2)
+            donor_data['travel_minutes'] = round(seconds / 60) if seconds is not None else None
+            donors_with_distance.append(donor_data)
+
         return Response(donors_with_distance)
 
 class DonationViewSet(viewsets.ModelViewSet):
@@ -517,7 +548,7 @@ class DonationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         if self.request.user.is_authenticated:
             return Donation.objects.filter(donor=self.request.user).select_related(
-                'blood_request', 'blood_request__patient', 'hospital'
+                'donor', 'blood_request', 'blood_request__patient', 'hospital', 'blood_test', 'blood_test__tested_by'
             )
         return Donation.objects.none()
 
@@ -530,10 +561,7 @@ class DonationViewSet(viewsets.ModelViewSet):
         location_long = self.request.data.get('location_long')
 
         if location_lat and location_long:
-            donor = self.request.user
-            donor.location_lat = float(location_lat)
-            donor.location_long = float(location_long)
-            donor.save()
+            write_location(self.request.user, float(location_lat), float(location_long))
 
         serializer.save(donor=self.request.user, status='scheduled')
 
@@ -584,9 +612,7 @@ class DonationViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Real-time location coordinates are required'},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            donation.donor.location_lat = float(donor_lat)
-            donation.donor.location_lng = float(donor_lng)
-            donation.donor.save()
+            write_location(donation.donor, float(donor_lat), float(donor_lng))
 
             best_hospital = self.find_best_hospital_with_ai(
                 float(donor_lat), float(donor_lng),
@@ -655,44 +681,32 @@ class DonationViewSet(viewsets.ModelViewSet):
     # Hospital selection helpers
     # -------------------------------
     def find_best_hospital(self, donor_lat, donor_lng, patient_lat, patient_lng):
-        hospitals = Hospital.objects.all()
-        best_hospital = None
-        min_total_distance = float('inf')
-        for hospital in hospitals:
-            donor_distance = self.calculate_distance(donor_lat, donor_lng, hospital.location_lat, hospital.location_long)
-            patient_distance = self.calculate_distance(patient_lat, patient_lng, hospital.location_lat, hospital.location_long)
-            total_distance = donor_distance + patient_distance
-            if total_distance < min_total_distance:
-                min_total_distance = total_distance
-                best_hospital = hospital
-        return best_hospital
+        ranked = rank_hospitals((donor_lat, donor_lng), (patient_lat, patient_lng))
+        return ranked[0][0] if ranked else None
 
     def find_best_hospital_with_ai(self, donor_lat, donor_lng, patient_lat, patient_lng):
         try:
-            hospitals = Hospital.objects.all()
-            if not hospitals:
+            ranked = rank_hospitals((donor_lat, donor_lng), (patient_lat, patient_lng))
+            if not ranked:
                 return None
 
             hospital_data = []
-            for hospital in hospitals:
-                donor_distance = self.calculate_distance(donor_lat, donor_lng, hospital.location_lat, hospital.location_long)
-                patient_distance = self.calculate_distance(patient_lat, patient_lng, hospital.location_lat, hospital.location_long)
+            for hospital, donor_distance, patient_distance, donor_time, patient_time in ranked:
+                routed = donor_time is not None and patient_time is not None
                 hospital_data.append({
                     'id': str(hospital.id),
                     'name': hospital.name,
                     'address': hospital.address,
                     'donor_distance': round(donor_distance, 2),
                     'patient_distance': round(patient_distance, 2),
-                    'total_distance': round(donor_distance + patient_distance, 2)
+                    'donor_travel_minutes': round(donor_time / 60) if donor_time is not None else None,
+                    'patient_travel_minutes': round(patient_time / 60) if patient_time is not None else None,
+                    'total_travel_minutes': round((donor_time + patient_time) / 60) if routed else None
                 })
 
-            hospital_data.sort(key=lambda x: x['total_distance'])
+            if not openai_available():
+                return ranked[0][0]
 
-            api_key = settings.OPENAI_API_KEY
-            if not api_key:
-                return Hospital.objects.get(id=hospital_data[0]['id'])
-
-            headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
             prompt = f"""
 Analyze these hospitals and select the best one for a blood donation scenario:
 Donor: {donor_lat}, {donor_lng}
@@ -700,17 +714,15 @@ Patient: {patient_lat}, {patient_lng}
 Hospitals: {json.dumps(hospital_data, indent=2)}
 Return ONLY the hospital ID of the best choice.
 """
-            data = {'model': 'gpt-3.5-turbo', 'messages': [{'role': 'user', 'content': prompt}], 'max_tokens': 50, 'temperature': 0.1}
-
-            response = requests.post('https://api.openai.com/v1/chat/completions', headers=headers, data=json.dumps(data), timeout=10)
-            if response.status_code == 200:
-                hospital_id = response.json()['choices'][0]['message']['content'].strip()
-                try:
-                    return Hospital.objects.get(id=hospital_id)
-                except (Hospital.DoesNotExist, ValueError):
-                    return Hospital.objects.get(id=hospital_data[0]['id'])
-            else:
-                return Hospital.objects.get(id=hospital_data[0]['id'])
+            try:
+                hospital_id = openai_chat([{'role': 'user', 'content': prompt}], max_tokens=50, temperature=0.1)
+            except UpstreamError as e:
+                logger.warning(f"AI hospital selection unavailable, using closest hospital: {str(e)}")
+                return ranked[0][0]
+            try:
+                return Hospital.objects.get(id=hospital_id)
+            except (Hospital.DoesNotExist, ValueError, ValidationError):
+                return ranked[0][0]
 
         except Exception as e:
             print(f"AI hospital selection failed: {str(e)}")
@@ -728,81 +740,23 @@ Return ONLY the hospital ID of the best choice.
     
     
 class BloodTestViewSet(viewsets.ModelViewSet):
-    queryset = BloodTest.objects.all()
+    queryset = BloodTest.objects.select_related('donation__donor', 'tested_by')
     serializer_class = BloodTestSerializer
     permission_classes = [IsAuthenticated]
     
     def perform_create(self, serializer):
         blood_test = serializer.save()
-        health_risk = self.predict_health_risk(blood_test)
-        blood_test.health_risk_prediction = health_risk
-        blood_test.save()
+        donor = blood_test.donation.donor
+        prediction, owner = predict_for_blood_test(blood_test, donor)
         
-        Notification.objects.create(
-            user=blood_test.donation.donor,
-            notification_type='health_alert',
-            title='Blood Test Results',
-            message=f'Your blood test results are ready. {health_risk}',
-            related_id=blood_test.id
-        )
-    
-    def predict_health_risk(self, blood_test):
-        try:
-            api_key = settings.OPENAI_API_KEY
-            if not api_key:
-                print("OpenAI API key not found")
-                return "Could not analyze blood test results at this time. Please consult a doctor."
-            
-            headers = {
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            prompt = f"""
-            Analyze these blood test results and provide a health risk assessment:
-            - Sugar Level: {blood_test.sugar_level} mg/dL (Normal: 70-100 mg/dL)
-            - Uric Acid Level: {blood_test.uric_acid_level} mg/dL (Normal: 3.4-7.0 mg/dL for men, 2.4-6.0 mg/dL for women)
-            - WBC Count: {blood_test.wbc_count} cells/mcL (Normal: 4,500-11,000 cells/mcL)
-            - RBC Count: {blood_test.rbc_count} million cells/mcL (Normal: 4.7-6.1 million cells/mcL for men, 4.2-5.4 million cells/mcL for women)
-            - Hemoglobin: {blood_test.hemoglobin} g/dL (Normal: 13.5-17.5 g/dL for men, 12.0-15.5 g/dL for women)
-            - Platelet Count: {blood_test.platelet_count} platelets/mcL (Normal: 150,000-450,000 platelets/mcL)
-            
-            Provide a concise assessment of any potential health risks or abnormalities.
-            Focus on actionable insights and recommendations.
-            """
-            
-            print(f"Sending request to OpenAI API with prompt: {prompt[:100]}...")
-            
-            data = {
-                'model': 'gpt-3.5-turbo',
-                'messages': [{'role': 'user', 'content': prompt}],
-                'max_tokens': 300,
-                'temperature': 0.3
-            }
-            
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers=headers,
-                data=json.dumps(data),
-                timeout=15
+        if owner:
+            Notification.objects.create(
+                user=donor,
+                notification_type='health_alert',
+                title='Blood Test Results',
+                message=f'Your blood test results are ready. {prediction["notification_message"]}',
+                related_id=blood_test.id
             )
-            
-            print(f"OpenAI API response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                prediction = result['choices'][0]['message']['content'].strip()
-                print(f"AI prediction generated: {prediction[:100]}...")
-                return prediction
-            else:
-                print(f"OpenAI API error: {response.status_code} - {response.text}")
-                return "Could not analyze blood test results at this time. Please consult a doctor."
-                
-        except Exception as e:
-            print(f"Error in predict_health_risk: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return f"Error analyzing blood test: {str(e)}"
 
 class ChatRoomViewSet(viewsets.ModelViewSet):
     queryset = ChatRoom.objects.all()
@@ -812,7 +766,7 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return ChatRoom.objects.filter(
             Q(donor=self.request.user) | Q(patient=self.request.user)
-        )
+        ).select_related('donor', 'patient', 'donation__blood_request')
     
     @action(detail=True, methods=['get'])
     def messages(self, request, pk=None):
@@ -821,7 +775,10 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
             return Response({'error': 'You are not part of this chat room'}, 
                            status=status.HTTP_403_FORBIDDEN)
         
-        messages = Message.objects.filter(chat_room=chat_room).order_by('timestamp')
+        # No message predates its room; the bound lets partitioned tables skip older months
+        messages = Message.objects.filter(
+            chat_room=chat_room, timestamp__gte=chat_room.created_at
+        ).select_related('sender').order_by('timestamp')
         serializer = MessageSerializer(messages, many=True)
         return Response(serializer.data)
     
@@ -851,12 +808,12 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        print(f"Fetching notifications for user: {self.request.user.username}")
-        notifications = Notification.objects.filter(user=self.request.user).order_by('-created_at')
-        print(f"Found {notifications.count()} notifications")
-        for notification in notifications:
-            print(f"Notification: {notification.id}, Type: {notification.notification_type}, Message: {notification.message[:50]}...")
-        return notifications
+        queryset = Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        if self.action == 'list':
+            # Lists only read recent partitions; single notifications stay reachable by id
+            since = timezone.now() - timedelta(days=settings.NOTIFICATION_LIST_DAYS)
+            queryset = queryset.filter(created_at__gte=since)
+        return queryset
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
@@ -883,7 +840,7 @@ class HospitalDashboardViewSet(viewsets.ViewSet):
         
         assignments = DonorHospitalAssignment.objects.filter(
             hospital=hospital
-        ).select_related('donor', 'donation', 'donation__blood_test')
+        ).select_related('donor', 'donation', 'donation__donor', 'donation__blood_test__tested_by')
         
         donors_data = []
         for assignment in assignments:
@@ -932,17 +889,22 @@ class HospitalDashboardViewSet(viewsets.ViewSet):
             
             donation = assignment.donation
             donor = donation.donor
+
+            try:
+                analytes = normalize_analytes(request.data)
+            except LabImportError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
             blood_test, created = BloodTest.objects.get_or_create(
                 donation=donation,
                 defaults={
                     'tested_by': hospital,
-                    **request.data
+                    **analytes
                 }
             )
             
             if not created:
-                for attr, value in request.data.items():
+                for attr, value in analytes.items():
                     setattr(blood_test, attr, value)
                 blood_test.save()
             
@@ -950,41 +912,20 @@ class HospitalDashboardViewSet(viewsets.ViewSet):
             
             # GENERATE AI PREDICTION USING OPENAI
             try:
-                print(f"Using OpenAI API key: {settings.OPENAI_API_KEY[:10]}...")
-                
-                predictor = HealthPredictor()
-                prediction_data = {
-                    'donor_name': f"{donor.first_name} {donor.last_name}",
-                    'donor_age': donor.age,
-                    'donor_gender': donor.gender,
-                    'sugar_level': blood_test.sugar_level,
-                    'hemoglobin': blood_test.hemoglobin,
-                    'uric_acid_level': blood_test.uric_acid_level,
-                    'wbc_count': blood_test.wbc_count,
-                    'rbc_count': blood_test.rbc_count,
-                    'platelet_count': blood_test.platelet_count
-                }
-                
-                print(f"Generating AI prediction with data: {prediction_data}")
-                
-                prediction = predictor.predict_health_risks(prediction_data)
-                
-                # Save the prediction
-                blood_test.health_risk_prediction = prediction['full_prediction']
-                blood_test.disease_prediction = prediction['summary']
-                blood_test.prediction_confidence = prediction['confidence']
-                blood_test.save()
+                # Shares the result with any prediction already running for these values
+                prediction, owner = predict_for_blood_test(blood_test, donor)
                 
                 print(f"AI prediction generated successfully: {prediction['summary']}")
                 
                 # Send notification to donor
-                Notification.objects.create(
-                    user=donor,
-                    notification_type='health_alert',
-                    title='Blood Test Analysis Complete',
-                    message=prediction['notification_message'],
-                    related_id=blood_test.id
-                )
+                if owner:
+                    Notification.objects.create(
+                        user=donor,
+                        notification_type='health_alert',
+                        title='Blood Test Analysis Complete',
+                        message=prediction['notification_message'],
+                        related_id=blood_test.id
+                    )
                 
             except Exception as e:
                 print(f"Error in AI prediction: {str(e)}")
@@ -1025,6 +966,41 @@ class HospitalDashboardViewSet(viewsets.ViewSet):
             traceback.print_exc()
             return Response({'error': 'Internal server error'}, status=500)
 
+    @action(detail=False, methods=['post'])
+    def import_lab_results(self, request):
+        """Bulk upsert blood tests from an uploaded CSV or JSONL lab export"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the lab export as "file"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get('format') or guess_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            return Response({'error': f"format must be one of {', '.join(IMPORT_FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        importer = LabResultImporter(request.user.hospital, dry_run=request.data.get('dry_run') in ('1', 'true', True))
+        try:
+            report = importer.run(upload, fmt)
+        except (LabImportError, UnicodeDecodeError, csv.Error) as e:
+            report = dict(importer.report, error=f'Import stopped: {str(e)}')
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream this hospital's donations or blood tests as CSV or JSONL"""
+        try:
+            return streaming_export(
+                request,
+                request.query_params.get('dataset', 'donations'),
+                fmt=request.query_params.get('fmt', 'csv'),
+                hospital=request.user.hospital,
+                date_from=request.query_params.get('from'),
+                date_to=request.query_params.get('to'),
+            )
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=True, methods=['put'])
     def update_blood_test(self, request, pk=None):
         try:
@@ -1052,25 +1028,7 @@ class HospitalDashboardViewSet(viewsets.ViewSet):
                 )
             
             if self._should_regenerate_prediction(blood_test, request.data):
-                predictor = HealthPredictor()
-                prediction_data = {
-                    'donor_name': f"{donor.first_name} {donor.last_name}",
-                    'donor_age': donor.age,
-                    'donor_gender': donor.gender,
-                    'sugar_level': blood_test.sugar_level,
-                    'hemoglobin': blood_test.hemoglobin,
-                    'uric_acid_level': blood_test.uric_acid_level,
-                    'wbc_count': blood_test.wbc_count,
-                    'rbc_count': blood_test.rbc_count,
-                    'platelet_count': blood_test.platelet_count
-                }
-                
-                prediction = predictor.predict_health_risks(prediction_data)
-                if prediction:
-                    blood_test.health_risk_prediction = prediction['full_prediction']
-                    blood_test.disease_prediction = prediction['summary']
-                    blood_test.prediction_confidence = prediction['confidence']
-                    blood_test.save()
+                predict_for_blood_test(blood_test, donor)
             
             return Response(BloodTestSerializer(blood_test).data)
             
@@ -1092,35 +1050,18 @@ class HospitalDashboardViewSet(viewsets.ViewSet):
             
             print(f"Generating AI prediction for donation: {donation.id}, donor: {donor.username}")
             
-            predictor = HealthPredictor()
-            prediction_data = {
-                'donor_name': f"{donor.first_name} {donor.last_name}",
-                'donor_age': donor.age,
-                'donor_gender': donor.gender,
-                'sugar_level': blood_test.sugar_level or 0,
-                'hemoglobin': blood_test.hemoglobin or 0,
-                'uric_acid_level': blood_test.uric_acid_level or 0,
-                'wbc_count': blood_test.wbc_count or 0,
-                'rbc_count': blood_test.rbc_count or 0,
-                'platelet_count': blood_test.platelet_count or 0
-            }
-            
-            prediction = predictor.predict_health_risks(prediction_data)
+            prediction, owner = predict_for_blood_test(blood_test, donor)
             
             print(f"Prediction generated: {prediction['summary'][:100]}...")
             
-            blood_test.health_risk_prediction = prediction['full_prediction']
-            blood_test.disease_prediction = prediction['summary']
-            blood_test.prediction_confidence = prediction['confidence']
-            blood_test.save()
-            
-            Notification.objects.create(
-                user=donor,
-                notification_type='health_alert',
-                title='AI Health Analysis Complete',
-                message=f'AI health analysis completed: {prediction["summary"]}',
-                related_id=blood_test.id
-            )
+            if owner:
+                Notification.objects.create(
+                    user=donor,
+                    notification_type='health_alert',
+                    title='AI Health Analysis Complete',
+                    message=f'AI health analysis completed: {prediction["summary"]}',
+                    related_id=blood_test.id
+                )
             
             return Response({
                 'message': 'AI prediction generated successfully',
@@ -1135,6 +1076,61 @@ class HospitalDashboardViewSet(viewsets.ViewSet):
             return Response({'error': f'Failed to generate prediction: {str(e)}'}, 
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+    @action(detail=True, methods=['post'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def stream_prediction(self, request, pk=None):
+        """Generate and save the AI analysis for a blood test, streaming it as Server-Sent Events"""
+        try:
+            assignment = DonorHospitalAssignment.objects.select_related(
+                'donation__donor', 'donation__blood_test'
+            ).get(id=pk, hospital=request.user.hospital)
+        except DonorHospitalAssignment.DoesNotExist:
+            return Response({'error': 'Assignment not found'}, status=status.HTTP_404_NOT_FOUND)
+        donation = assignment.donation
+        if not hasattr(donation, 'blood_test'):
+            return Response({'error': 'No blood test found for this donation'}, status=status.HTTP_404_NOT_FOUND)
+
+        blood_test = donation.blood_test
+        donor = donation.donor
+        data = prediction_input(donor, blood_test)
+        # Open the model stream here, under the request's deadline; the rest of the
+        # events are produced after the view returns
+        stream = HealthPredictor().stream_health_risks(data)
+        first = next(stream)
+
+        def events():
+            try:
+                for kind, value in chain([first], stream):
+                    if kind == 'delta':
+                        yield sse_event('token', {'text': value})
+                    elif kind == 'reset':
+                        yield sse_event('reset', {})
+                    else:
+                        prediction = value
+                # Persisted only once the full text is in, and only if the values are
+                # unchanged; written on the primary since this runs outside the request
+                if save_prediction(blood_test, data, prediction, using=PRIMARY):
+                    Notification.objects.using(PRIMARY).create(
+                        user=donor,
+                        notification_type='health_alert',
+                        title='AI Health Analysis Complete',
+                        message=f'AI health analysis completed: {prediction["summary"]}',
+                        related_id=blood_test.id
+                    )
+                yield sse_event('done', {
+                    'blood_test_id': blood_test.id,
+                    'summary': prediction['summary'],
+                    'findings': prediction['findings'],
+                    'conditions': prediction['conditions'],
+                    'recommendations': prediction['recommendations'],
+                    'confidence': prediction['confidence'],
+                    'has_abnormalities': prediction['has_abnormalities'],
+                })
+            except Exception as e:
+                logger.error(f"Error streaming prediction: {str(e)}")
+                yield sse_event('error', {'error': f'Failed to generate prediction: {str(e)}'})
+
+        return event_stream_response(request, events())
+
     def _should_regenerate_prediction(self, blood_test, new_data):
         important_fields = ['sugar_level', 'hemoglobin', 'uric_acid_level', 'wbc_count', 'rbc_count', 'platelet_count']
         for field in important_fields:
@@ -1229,10 +1225,11 @@ class DonorHospitalAssignmentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
+        assignments = DonorHospitalAssignment.objects.select_related('donor', 'hospital', 'donation')
         if hasattr(self.request.user, 'hospital'):
-            return DonorHospitalAssignment.objects.filter(hospital=self.request.user.hospital)
+            return assignments.filter(hospital=self.request.user.hospital)
         elif hasattr(self.request.user, 'blood_group'):
-            return DonorHospitalAssignment.objects.filter(donor=self.request.user)
+            return assignments.filter(donor=self.request.user)
         return DonorHospitalAssignment.objects.none()
     
     def perform_create(self, serializer):
@@ -1294,25 +1291,27 @@ def available_blood_requests(request):
         return Response({'error': 'Please update your location first'}, 
                        status=status.HTTP_400_BAD_REQUEST)
     
-    blood_requests = BloodRequest.objects.filter(
+    serializer = CompiledBloodRequestSerializer()
+    blood_requests = serializer.values(BloodRequest.objects.filter(
         blood_group=donor.blood_group,
         status='pending'
-    )
+    ))
     
     available_requests = []
     for blood_request in blood_requests:
-        if blood_request.location_lat and blood_request.location_long:
+        if blood_request['location_lat'] and blood_request['location_long']:
             distance = calculate_distance(
                 donor.location_lat, donor.location_long,
-                blood_request.location_lat, blood_request.location_long
+                blood_request['location_lat'], blood_request['location_long']
             )
             
-            if distance <= 20:
-                request_data = BloodRequestSerializer(blood_request).data
+            if distance <= search_radius_km(blood_request['priority'], settings.REQUEST_VISIBLE_RADIUS_KM):
+                request_data = serializer.to_representation(blood_request)
                 request_data['distance'] = round(distance, 2)
                 available_requests.append(request_data)
     
-    available_requests.sort(key=lambda x: x['distance'])
+    # Most urgent first, then closest
+    available_requests.sort(key=lambda x: (x['priority'], x['distance']))
     
     return Response(available_requests)
 
@@ -1353,6 +1352,110 @@ def hospital_coordinates(request):
     hospitals = Hospital.objects.all().values('id', 'name', 'address', 'location_lat', 'location_long')
     return Response(list(hospitals))
 
+def _map_layer_response(request, artifact, max_age):
+    """Serve a precomputed map artifact in the best encoding the client accepts"""
+    etag = artifact['etag']
+    known = {f'"{etag}"', f'"{etag}-gzip"', f'"{etag}-br"'}
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+    if 'br' in accepted and 'br' in artifact:
+        encoding, body, tag = 'br', artifact['br'], f'"{etag}-br"'
+    elif 'gzip' in accepted:
+        encoding, body, tag = 'gzip', artifact['gzip'], f'"{etag}-gzip"'
+    else:
+        encoding, body, tag = None, artifact['identity'], f'"{etag}"'
+
+    if any(candidate.strip() in known for candidate in if_none_match.split(',')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/geo+json')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = tag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_data(request, dataset):
+    """Staff export of donations or blood tests across hospitals, or for ?hospital=<id>"""
+    if not request.user.is_staff:
+        return Response({'error': 'Only staff can export data'}, status=status.HTTP_403_FORBIDDEN)
+
+    hospital = None
+    if request.query_params.get('hospital'):
+        try:
+            hospital = Hospital.objects.get(id=request.query_params['hospital'])
+        except (Hospital.DoesNotExist, ValidationError):
+            return Response({'error': 'Hospital not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        return streaming_export(
+            request,
+            dataset,
+            fmt=request.query_params.get('fmt', 'csv'),
+            hospital=hospital,
+            date_from=request.query_params.get('from'),
+            date_to=request.query_params.get('to'),
+        )
+    except ExportError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ops_metrics(request):
+    """Runtime metrics of this process (connection pool, queues, limiters)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Only staff can view metrics'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(collect_metrics())
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def hospital_map_layer(request):
+    """
+    Whole-country hospital GeoJSON, or with ?bbox=min_lng,min_lat,max_lng,max_lat
+    the list of tiles covering that viewport so clients fetch only what is visible
+    """
+    layer = get_hospital_layer()
+    bbox = request.query_params.get('bbox')
+    if not bbox:
+        return _map_layer_response(request, layer['full'], max_age=60)
+
+    try:
+        min_lat, min_lng, max_lat, max_lng = parse_bbox(bbox)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    size = layer['tile_size']
+    tiles = []
+    for row, col in cells_in_bbox(min_lat, min_lng, max_lat, max_lng, size):
+        key = cell_key(row, col)
+        if key in layer['index']:
+            south, west, north, east = cell_bounds(row, col, size)
+            tiles.append({
+                'key': key,
+                'bbox': [west, south, east, north],
+                'url': reverse('hospital-map-tile', args=[key]),
+                **layer['index'][key],
+            })
+    return Response({'tile_size': size, 'tiles': tiles})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def hospital_map_tile(request, key):
+    """One precomputed tile of the hospital map layer"""
+    artifact = get_hospital_layer()['tiles'].get(key)
+    if artifact is None:
+        return Response({'error': 'Tile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return _map_layer_response(request, artifact, max_age=300)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_chatroom_for_donation(request, donation_id):
@@ -1385,52 +1488,91 @@ def create_chatroom_for_donation(request, donation_id):
         )
 
 
+class NewsPagination(PageNumberPagination):
+    """`limit` sets the page size instead of slicing the queryset"""
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
 class NewsViewSet(viewsets.ModelViewSet):
     """ViewSet for managing news and announcements"""
     queryset = News.objects.filter(is_active=True)
     serializer_class = NewsSerializer
     permission_classes = [AllowAny]
+    pagination_class = NewsPagination
 
     def get_queryset(self):
         queryset = News.objects.filter(is_active=True)
         category = self.request.query_params.get('category', None)
         featured = self.request.query_params.get('featured', None)
-        limit = self.request.query_params.get('limit', None)
 
         if category:
             queryset = queryset.filter(category=category)
         if featured:
             queryset = queryset.filter(is_featured=True)
-        if limit:
-            queryset = queryset[:int(limit)]
 
         return queryset
 
+    def _cached(self, key, build):
+        entry = versioned_payload(NEWS_CACHE_NAMESPACE, key, build, timeout=settings.NEWS_CACHE_TIMEOUT)
+        return conditional_response(self.request, entry)
+
+    def list(self, request, *args, **kwargs):
+        params = sorted(
+            (name, value) for name, value in request.query_params.items()
+            if name in ('category', 'featured', 'limit', 'page')
+        )
+
+        def build():
+            queryset = self.get_queryset()
+            page = self.paginate_queryset(queryset)
+            data = self.get_paginated_response(self.get_serializer(page, many=True).data).data
+            return data, max((news.updated_at for news in page), default=None)
+
+        return self._cached(f"list:{request.get_host()}:{urlencode(params)}", build)
+
+    def retrieve(self, request, *args, **kwargs):
+        def build():
+            news = self.get_object()
+            return self.get_serializer(news).data, news.updated_at
+
+        return self._cached(f"detail:{kwargs.get('pk')}", build)
+
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured news articles"""
-        featured = News.objects.filter(is_active=True, is_featured=True)[:5]
-        serializer = self.get_serializer(featured, many=True)
-        return Response(serializer.data)
+        def build():
+            featured = list(News.objects.filter(is_active=True, is_featured=True)[:5])
+            data = self.get_serializer(featured, many=True).data
+            return data, max((news.updated_at for news in featured), default=None)
+
+        return self._cached('featured', build)
 
     @action(detail=False, methods=['get'])
     def categories(self, request):
         """Get all available categories with counts"""
-        categories = {}
-        for choice in News.CATEGORY_CHOICES:
-            count = News.objects.filter(category=choice[0], is_active=True).count()
-            categories[choice[0]] = {
-                'label': choice[1],
-                'count': count
-            }
-        return Response(categories)
+        def build():
+            counts = dict(
+                News.objects.filter(is_active=True)
+                .values_list('category')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            categories = {}
+            for choice in News.CATEGORY_CHOICES:
+                categories[choice[0]] = {
+                    'label': choice[1],
+                    'count': counts.get(choice[0], 0)
+                }
+            return categories, None
+
+        return self._cached('categories', build)
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def dashboard_stats(request):
     """Get aggregated statistics for the dashboard"""
-    from django.db.models import Count
     from datetime import date, timedelta
 
     # Calculate stats
@@ -1467,4 +1609,11 @@ def dashboard_stats(request):
             'donations': recent_donations,
             'requests': recent_requests
         }
-    })
\ No newline at end of file
+    })
+
+
+def serve_immutable_media(request, path):
+    """Development media server for content-addressed files, with far-future caching"""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -37,6 +37,26 @@ CHANNEL_LAYERS = {
 }
 
 
+# Cache versions, location throttle windows and pending donor locations must be
+# visible to every web and worker process: use a shared backend (Redis, Memcached)
+# in production. locmem is only suitable for a single development process.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='project-red'),
+    }
+}
+
+# Seconds a cached news response may be served before it is rebuilt
+NEWS_CACHE_TIMEOUT = config('NEWS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Grid cell size, in degrees, of the precomputed hospital map tiles
+MAP_TILE_SIZE = config('MAP_TILE_SIZE', default=0.5, cast=float)
+
+# Whole-blood donation interval, and how long a low-hemoglobin result defers a donor
+DONATION_INTERVAL_DAYS = config('DONATION_INTERVAL_DAYS', default=56, cast=int)
+HEMOGLOBIN_DEFERRAL_DAYS = config('HEMOGLOBIN_DEFERRAL_DAYS', default=90, cast=int)
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -46,6 +66,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.utils.http_gateway.RequestDeadlineMiddleware',
+    'core.db.router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'project_red.urls'
@@ -68,17 +90,54 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'project_red.wsgi.application'
 
+# With DB_POOL, connections are borrowed from a bounded per-process pool and
+# returned at the end of each request instead of being closed
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql_pool' if DB_POOL else 'django.db.backends.postgresql',
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'POOL': {
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=20, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+            'MAX_IDLE': config('DB_POOL_MAX_IDLE', default=300.0, cast=float),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=3600.0, cast=float),
+            'CHECK_AFTER': config('DB_POOL_CHECK_AFTER', default=30.0, cast=float),
+        },
     }
 }
 
+# Read replicas (core/db/router.py): DB_REPLICAS is a comma-separated list of
+# host:port streaming replicas of the primary, with the same name and credentials.
+# Safe requests read from a healthy replica unless their client wrote in the last
+# READ_YOUR_WRITES_SECONDS (a signed cookie, so it holds across processes).
+DATABASE_REPLICAS = []
+for number, replica in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    host, _, port = replica.partition(':')
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host, PORT=port or DATABASES['default']['PORT'],
+        OPTIONS={'connect_timeout': 2}, TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+READ_YOUR_WRITES_SECONDS = config('READ_YOUR_WRITES_SECONDS', default=5.0, cast=float)
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=10.0, cast=float)
+REPLICA_CHECK_SECONDS = 5.0
+
+# Monthly partitions of core_message and core_notification (core/utils/partitions.py,
+# manage.py partition_tables --convert). The worker keeps PARTITION_MONTHS_AHEAD
+# months ready; notification lists only read NOTIFICATION_LIST_DAYS back so that
+# they touch recent partitions only.
+PARTITION_MONTHS_AHEAD = 3
+NOTIFICATION_LIST_DAYS = config('NOTIFICATION_LIST_DAYS', default=180, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,6 +164,55 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+PROFILE_PICTURE_MAX_UPLOAD_BYTES = config('PROFILE_PICTURE_MAX_UPLOAD_BYTES', default=5 * 1024 * 1024, cast=int)
+
+# Run background tasks inline (after commit) instead of through the process_tasks worker
+TASKS_ALWAYS_EAGER = config('TASKS_ALWAYS_EAGER', default=False, cast=bool)
+
+# Donor search for blood requests (core/utils/donor_search.py): the K nearest
+# eligible donors, searching outward up to the radius (km). Urgent requests may
+# search further (core/utils/urgency.py)
+DONOR_NOTIFY_COUNT = 200  # Most donors notified for one request, over all waves
+DONOR_NOTIFY_RADIUS_KM = 100
+DONOR_MATCH_COUNT = 20
+DONOR_MATCH_RADIUS_KM = 150
+DONOR_SEARCH_LIMIT = 100
+DONOR_SEARCH_MAX_LIMIT = 500
+REQUEST_VISIBLE_RADIUS_KM = 20
+URGENCY_SEARCH_RADIUS_FACTOR = {'critical': 2.0, 'high': 1.5}
+
+# Request fan-out in waves (core/utils/notify_waves.py): the first wave notifies
+# WAVE_SIZE donors per unit needed, each unanswered wave is GROWTH times larger,
+# and the wait between waves (seconds) depends on urgency
+DONOR_NOTIFY_WAVE_SIZE = 5
+DONOR_NOTIFY_WAVE_GROWTH = 2
+DONOR_NOTIFY_MAX_WAVES = 5
+DONOR_NOTIFY_WAVE_INTERVAL = {'critical': 120, 'high': 300, 'medium': 900, 'low': 1800}
+
+# Donor location pings (core/utils/donor_location.py): at most one write per
+# donor every min_interval seconds, later pings coalesce into one trailing
+# write, and moves shorter than min_distance_m are not written
+DONOR_LOCATION = {
+    'min_interval': config('DONOR_LOCATION_MIN_INTERVAL', default=30, cast=int),
+    'min_distance_m': 25,
+}
+
+# Travel times for hospital and donor ranking (core/utils/travel_time.py), cached
+# per pair of `cell_degrees` grid cells for `ttl_seconds`. The estimate provider
+# (distance * detour_factor at speed_kmh) also answers pairs not cached yet;
+# set TRAVEL_TIME_PROVIDER=core.utils.travel_time.GoogleDistanceMatrix for road times.
+TRAVEL_TIME = {
+    'provider': config('TRAVEL_TIME_PROVIDER', default='core.utils.travel_time.EstimatedTravelTime'),
+    'cell_degrees': 0.02,
+    'ttl_seconds': 7 * 24 * 60 * 60,
+    'speed_kmh': 40.0,
+    'detour_factor': 1.3,
+    # Hospitals further than this from a donor cell are not warmed
+    'warm_radius_km': 60,
+    # Hospitals closest in a straight line that travel times are looked up for
+    'hospital_candidates': 10,
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
@@ -153,6 +261,38 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
 OPENAI_API_KEY = config('OPENAI_API_KEY')
 GOOGLE_MAPS_API_KEY = config('GOOGLE_MAPS_API_KEY')
 
+# Outbound HTTP gateway: total time a request may spend on upstream calls, and
+# per-upstream timeout / retry / circuit breaker settings
+REQUEST_BUDGET_SECONDS = config('REQUEST_BUDGET_SECONDS', default=20.0, cast=float)
+OUTBOUND_HTTP = {
+    'openai': {
+        'timeout': config('OPENAI_TIMEOUT', default=15.0, cast=float),
+        'retries': 1,
+        'failure_threshold': 5,
+        'reset_timeout': 30.0,
+    },
+    'google_maps': {
+        'timeout': 5.0,
+        'retries': 2,
+        'failure_threshold': 5,
+        'reset_timeout': 60.0,
+    },
+}
+
+# Cluster-wide OpenAI request budget shared by every worker (core/utils/rate_limit.py).
+# Interactive calls may use all of it; bulk calls also need a token from their own
+# smaller bucket and never take the last `interactive_reserve` tokens.
+# OPENAI_REQUESTS_PER_MINUTE=0 turns the limiter off.
+OPENAI_RATE_LIMIT = {
+    'requests_per_minute': config('OPENAI_REQUESTS_PER_MINUTE', default=300, cast=int),
+    'burst': config('OPENAI_BURST', default=20, cast=int),
+    'bulk_requests_per_minute': config('OPENAI_BULK_REQUESTS_PER_MINUTE', default=60, cast=int),
+    'bulk_burst': 5,
+    'interactive_reserve': 5,
+    # Seconds a call may queue for a token before it falls back instead
+    'max_wait': {'interactive': 5.0, 'bulk': 120.0},
+}
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Basic': {
@@ -5,6 +5,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from django.conf import settings
 from django.conf.urls.static import static
+from core.views import serve_immutable_media
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -29,4 +30,8 @@ urlpatterns = [
 
 # Serve media files in development
 if settings.DEBUG:
+    urlpatterns += [
+        # Content-hashed profile pictures never change, so let clients cache them for good
+        re_path(r'^media/(?P<path>profile_pictures/(?:thumbs/)?[0-9a-f]{16}(?:_\d+)?\.jpg)$', serve_immutable_media),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)